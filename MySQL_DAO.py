@@ -1,47 +1,339 @@
-import base64
+import datetime
+import functools
 import json
 import math
 import os
+import random
+import re
+import threading
+import time
 import mysql.connector
 from mysql.connector import errorcode
 import dateutil.parser
 
 import configparser
 
+from ais_stream import iter_ais_messages, AISStreamError
+from map_tiles import get_tile_resolver, TileTree
+from retention import scheduler_from_config
+from partitions import enable_partitioning, add_partitions, drop_expired_partitions
+from tile_store import TileCache, TileEntry, TILE_DIRECTORY
+from tile_bundle import get_tile_bundle
+from prepared_statements import PreparedCursor
+from instrumentation import get_instrumentation, configure_instrumentation
+from sqlite_backend import connect_sqlite
+from schema import ensure_schema, LATEST_POSITION_UPDATE, LATEST_STATIC_UPDATE
+
+_config_cache = {}
+_config_lock = threading.Lock()
+
+
+def read_connection_config(config_file='connection_data.conf'):
+    """
+    Reads the connection config file, parsing it only once per process.
+
+    :param config_file: Path of the config file
+    :type config_file: str
+    :return: The parsed config
+    :rtype: configparser.ConfigParser
+    """
+    config = _config_cache.get(config_file)
+    if config is None:
+        with _config_lock:
+            config = _config_cache.get(config_file)
+            if config is None:
+                config = configparser.ConfigParser()
+                config.read(config_file)
+                _config_cache[config_file] = config
+    return config
+
+
+def get_backend(config):
+    """
+    Reads the database backend from the [SQL] section of the connection config.
+
+    :param config: The parsed connection config
+    :type config: configparser.ConfigParser
+    :return: 'mysql', or 'sqlite' to run on an SQLite file instead of a MySQL server, see sqlite_backend.py
+    :rtype: str
+    """
+    return config.get('SQL', 'backend', fallback='mysql').strip().lower()
+
+
+def open_connection(config):
+    """
+    Opens a new connection to the database of the connection config.
+
+    :param config: The parsed connection config
+    :type config: configparser.ConfigParser
+    :raises [mysql.connector.Error]: If the connection fails
+    :return: An open connection
+    :rtype: mysql.connector.connection.MySQLConnection or SQLiteConnection
+    """
+    if get_backend(config) == 'sqlite':
+        return connect_sqlite(config)
+    return mysql.connector.connect(
+        user=config['SQL']['user'],
+        password=config['SQL']['password'],
+        database=config['SQL']['database'])
+
+
+_AIS_TIMESTAMP = re.compile(r'\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}(\.\d+)?(Z|[+-]([01]\d|2[0-3])(:?[0-5]\d)?)?$')
+
+
+@functools.lru_cache(maxsize=4096)
+def parse_ais_timestamp(value):
+    """
+    Converts an ISO 8601 timestamp such as `2020-11-18T00:00:00.000Z` into a MySQL DATETIME string, keeping the
+    wall-clock time as written. Timestamps of the usual fixed form are sliced directly, anything else goes through
+    dateutil. Results are cached, since the messages of a batch often share the same second.
+
+    :param value: The ISO 8601 timestamp
+    :type value: str
+    :raises [ValueError]: If the timestamp is not valid ISO 8601
+    :return: The timestamp formatted as YYYY-MM-DD HH:MM:SS
+    :rtype: str
+    """
+    if _AIS_TIMESTAMP.match(value):
+        try:
+            # Only used to check that the date and time values are in range
+            datetime.datetime.fromisoformat(value[:19])
+            return value[:10] + ' ' + value[11:19]
+        except ValueError:
+            pass
+    return dateutil.parser.isoparse(value).strftime("%Y-%m-%d %H:%M:%S")
+
+
+class MySQLConnectionPool:
+    """
+    Class MySQLConnectionPool
+    Keeps a bounded set of long-lived connections. A thread checks out one connection and keeps it for nested
+    checkouts until its outermost checkout is released.
+
+    :param config: The parsed connection config
+    :type config: configparser.ConfigParser
+    """
+
+    def __init__(self, config):
+        self.config = config
+        self.size = config.getint('POOL', 'size', fallback=5)
+        self.idle_timeout = config.getfloat('POOL', 'idle_timeout', fallback=300.0)
+        self.health_check_interval = config.getfloat('POOL', 'health_check_interval', fallback=30.0)
+        self.checkout_timeout = config.getfloat('POOL', 'checkout_timeout', fallback=30.0)
+        self.stats = {"created": 0, "reused": 0, "discarded": 0}
+        self._idle = []
+        self._open = 0
+        self._condition = threading.Condition()
+        self._local = threading.local()
+
+    def _connect(self):
+        cnx = open_connection(self.config)
+        with self._condition:
+            self.stats['created'] += 1
+        return cnx
+
+    def _discard(self, cnx):
+        with self._condition:
+            self.stats['discarded'] += 1
+        try:
+            cnx.close()
+        except mysql.connector.Error:
+            pass
+
+    def _expire_idle(self, now):
+        expired = [entry for entry in self._idle if now - entry[1] > self.idle_timeout]
+        if expired:
+            self._idle = [entry for entry in self._idle if now - entry[1] <= self.idle_timeout]
+            self._open -= len(expired)
+        return expired
+
+    def acquire(self):
+        """
+        Checks out a connection for the current thread, reusing the thread's connection if it already holds one.
+
+        :raises [PoolError]: If no connection frees up within the checkout timeout
+        :return: An open connection
+        :rtype: mysql.connector.connection.MySQLConnection
+        """
+        held = getattr(self._local, 'cnx', None)
+        if held is not None:
+            self._local.depth += 1
+            return held
+
+        deadline = time.monotonic() + self.checkout_timeout
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                expired = self._expire_idle(now)
+                if self._idle:
+                    cnx, last_used = self._idle.pop()
+                    break
+                if self._open < self.size:
+                    cnx, last_used = None, now
+                    self._open += 1
+                    break
+                if now >= deadline:
+                    raise mysql.connector.errors.PoolError("No connection available in the pool")
+                self._condition.wait(deadline - now)
+        for old in expired:
+            self._discard(old)
+
+        created = False
+        try:
+            if cnx is not None and now - last_used > self.health_check_interval and not cnx.is_connected():
+                self._discard(cnx)
+                cnx = None
+            if cnx is None:
+                cnx = self._connect()
+                created = True
+            else:
+                with self._condition:
+                    self.stats['reused'] += 1
+        except mysql.connector.Error:
+            with self._condition:
+                self._open -= 1
+                self._condition.notify()
+            raise
+
+        self._local.cnx = cnx
+        self._local.depth = 1
+        get_instrumentation().record_connection(created)
+        return cnx
+
+    def release(self, cnx):
+        """
+        Returns a connection checked out by the current thread. Any open transaction is rolled back so the next
+        checkout starts from a clean session.
+
+        :param cnx: The connection given by acquire()
+        :type cnx: mysql.connector.connection.MySQLConnection
+        """
+        self._local.depth -= 1
+        if self._local.depth > 0:
+            return
+        self._local.cnx = None
+
+        try:
+            cnx.rollback()
+            healthy = True
+        except mysql.connector.Error:
+            healthy = False
+        if not healthy:
+            self._discard(cnx)
+        with self._condition:
+            if healthy:
+                self._idle.append((cnx, time.monotonic()))
+            else:
+                self._open -= 1
+            self._condition.notify()
+
+    def close_all(self):
+        """
+        Closes every idle connection. Connections currently checked out are closed when they are released.
+        """
+        with self._condition:
+            idle = self._idle
+            self._idle = []
+            self._open -= len(idle)
+            self._condition.notify_all()
+        for cnx, _ in idle:
+            self._discard(cnx)
+
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def get_connection_pool():
+    """
+    Returns the process-wide connection pool, creating it on first use (and again after a fork).
+
+    :return: The connection pool
+    :rtype: MySQLConnectionPool
+    """
+    global _pool, _pool_pid
+    if _pool is None or _pool_pid != os.getpid():
+        with _pool_lock:
+            if _pool is None or _pool_pid != os.getpid():
+                _pool = MySQLConnectionPool(read_connection_config(MySQLConnectionManager.config_file))
+                _pool_pid = os.getpid()
+    return _pool
+
+
+_retention_scheduler = None
+_retention_pid = None
+_retention_lock = threading.Lock()
+
+
+def get_retention_scheduler(dao):
+    """
+    Returns the process-wide retention scheduler, creating it from the [RETENTION] section of the config on first
+    use (and again after a fork). It is not started here.
+
+    :param dao: The DAO the scheduler runs retention with, if it has to be created
+    :type dao: MySQL_DAO
+    :return: The retention scheduler
+    :rtype: RetentionScheduler
+    """
+    global _retention_scheduler, _retention_pid
+    if _retention_scheduler is None or _retention_pid != os.getpid():
+        with _retention_lock:
+            if _retention_scheduler is None or _retention_pid != os.getpid():
+                _retention_scheduler = scheduler_from_config(
+                    dao, read_connection_config(MySQLConnectionManager.config_file))
+                _retention_pid = os.getpid()
+    return _retention_scheduler
+
 
 class MySQLConnectionManager:
     """
     Class MySQLConnectionManager
-    Creates the connection based on a config file
+    Checks a connection out of the shared pool, or creates a dedicated one based on the config file. The connection
+    is to MySQL, or to an SQLite file with "backend = sqlite" in the [SQL] section, see sqlite_backend.py.
+
+    :param pooled: Optional, whether to use the shared connection pool
+    :type pooled: bool
     """
     config_file = 'connection_data.conf'
 
-    def __init__(self):
-        self.config = configparser.ConfigParser()
+    def __init__(self, pooled=True):
+        self.pooled = pooled
+        self.config = read_connection_config(self.config_file)
 
     def __enter__(self):
-        self.config.read(self.config_file)
-
-        self.cnx = mysql.connector.connect(
-            user=self.config['SQL']['user'],
-            password=self.config['SQL']['password'],
-            database=self.config['SQL']['database'])
+        if self.pooled:
+            self.cnx = get_connection_pool().acquire()
+        else:
+            self.cnx = open_connection(self.config)
+            get_instrumentation().record_connection(True)
         return self.cnx
 
     def __exit__(self, *ignore):
-        self.cnx.close()
+        if self.pooled:
+            get_connection_pool().release(self.cnx)
+        else:
+            self.cnx.close()
 
 
 class MySQLCursorManager:
     """
     Class MySQLCursorManager
-    Handles the connection's cursor
+    Handles the connection's cursor. Unless "prepared = no" is set in the [SQL] section of the config, queries and DML
+    run as server-side prepared statements, prepared once per connection, see prepared_statements.py. The SQLite
+    backend caches its compiled statements itself and never uses them. While the instrumentation is enabled, the
+    statements of the cursor are recorded, see instrumentation.py.
 
     :param cnx: The Connection
     :type cnx: MySQLConnectionManager
+    :param prepared: Optional, whether to use prepared statements, as configured by default
+    :type prepared: bool
     """
-    def __init__(self, cnx):
-        self.cursor = cnx.cursor(buffered=True)
+    def __init__(self, cnx, prepared=None):
+        if prepared is None:
+            config = read_connection_config(MySQLConnectionManager.config_file)
+            prepared = config.getboolean('SQL', 'prepared', fallback=True) and get_backend(config) == 'mysql'
+        self.cursor = get_instrumentation().cursor(PreparedCursor(cnx) if prepared else cnx.cursor(buffered=True))
 
     def __enter__(self):
         return self.cursor
@@ -63,9 +355,20 @@ class MySQL_DAO:
                               'Destination', 'DestinationId']
     position_report_parameters = ['RoT', 'SoG', 'CoG', 'Heading']
     position_parameters = ['type', 'coordinates']
+    bulk_chunk_size = 1000
+    retention_window = 300
+    retention_chunk_size = 1000
+    retention_pause = 0.05
+    tile_cache = TileCache()
+    tile_tree = None
+    schema_ready = False
+    auto_increment = None
 
     def __init__(self, stub=False):
         self.is_stub = stub
+        if not stub and read_connection_config(MySQLConnectionManager.config_file).getboolean(
+                'RETENTION', 'enabled', fallback=False):
+            get_retention_scheduler(self).start()
 
     def format_ais_message(self, msg):
         """
@@ -77,9 +380,7 @@ class MySQL_DAO:
         :rtype: dict
         """
         if "Timestamp" in msg:
-            date = dateutil.parser.isoparse(msg['Timestamp'])
-            timestamp = date.strftime("%Y-%m-%d %H:%M:%S")
-            msg['Timestamp'] = timestamp
+            msg['Timestamp'] = parse_ais_timestamp(msg['Timestamp'])
         else:
             msg['Timestamp'] = None
         if "IMO" not in msg or msg['IMO'] == 'Unknown':
@@ -127,8 +428,7 @@ class MySQL_DAO:
         :rtype: dict
         """
         if 'ETA' in msg:
-            date = dateutil.parser.isoparse(msg['ETA'])
-            msg['ETA'] = date.strftime("%Y-%m-%d %H:%M:%S")
+            msg['ETA'] = parse_ais_timestamp(msg['ETA'])
         else:
             msg['ETA'] = None
         for parameter in self.static_data_parameters:
@@ -136,18 +436,73 @@ class MySQL_DAO:
                 msg[parameter] = None
         return msg
 
-    def insert_ais_batch(self, json_data):
+    def ensure_schema(self, cursor):
+        """
+        Applies the pending schema migrations and checks the query indexes, see schema.ensure_schema().
+        Only checks the database once per process.
+
+        :param cursor: A cursor to run the statements with
+        :type cursor: MySQLCursorManager
+        :return: The versions applied and the indexes that were missing and have been created, or None if the database
+            was already checked
+        :rtype: tuple
+        """
+        if MySQL_DAO.schema_ready:
+            return None
+        report = ensure_schema(cursor)
+        partition_size = self.get_partition_size()
+        if partition_size is not None:
+            enable_partitioning(cursor, partition_size)
+            add_partitions(cursor, partition_size)
+        MySQL_DAO.schema_ready = True
+        return report
+
+    def get_tile_tree(self):
+        """
+        Returns the MAP_VIEW tile hierarchy, read from the database on first use only. MAP_VIEW does not change once
+        loaded, so the tile queries answer from the tree with no round-trip. An empty MAP_VIEW is read again next time.
+
+        :raises [mysql.connector.Error]: If the MAP_VIEW read fails
+        :return: The tile tree
+        :rtype: TileTree
+        """
+        tree = MySQL_DAO.tile_tree
+        if tree is None:
+            with MySQLConnectionManager() as con:
+                with MySQLCursorManager(con) as cursor:
+                    cursor.execute("""SELECT * FROM MAP_VIEW;""")
+                    tree = TileTree(cursor.fetchall())
+            if len(tree) > 0:
+                MySQL_DAO.tile_tree = tree
+        return tree
+
+    def get_partition_size(self):
+        """
+        Reads the storage mode from the [STORAGE] section of the connection config. With "partitioned = yes", the AIS
+        tables are range-partitioned by AIS message id and retention drops whole partitions, see partitions.py.
+        Partitioning is MySQL-only, so the setting is ignored on the SQLite backend.
+
+        :return: The number of AIS message ids per partition, or None if the AIS tables are not partitioned
+        :rtype: int
+        """
+        config = read_connection_config(MySQLConnectionManager.config_file)
+        if not config.getboolean('STORAGE', 'partitioned', fallback=False) or get_backend(config) != 'mysql':
+            return None
+        return config.getint('STORAGE', 'partition_size', fallback=100000)
+
+    def insert_ais_batch(self, json_data, bulk=True):
         """
         Query 1, Priority 1
         From a set of JSON data, inserts every AIS Message into the database and returns the number of insertions.
 
         :param msg: a json string
         :type msg: str
+        :param bulk: Optional, whether to write the whole batch with multi-row inserts in one transaction
+        :type bulk: bool
         :raises [BaseException]: If the JSON cannot be loaded correctly
         :return: JSON string containing {'inserts': ...} with the count of insertions
         :rtype: str
         """
-        count = 0
         try:
             data = json.loads(json_data)
         except Exception as e:
@@ -156,12 +511,323 @@ class MySQL_DAO:
             return -1
         if self.is_stub:
             return json.dumps({"inserts": len(data)})
-        for msg in data:
+        return json.dumps({"inserts": self.insert_ais_messages(data, bulk)})
+
+    def insert_ais_messages(self, messages, bulk=True, prepared=None):
+        """
+        Inserts a list of AIS message dictionaries and returns the number of insertions.
+
+        :param messages: A list of message dictionaries
+        :type messages: list
+        :param bulk: Optional, whether to write the whole list with multi-row inserts in one transaction
+        :type bulk: bool
+        :param prepared: Optional, the messages already formatted by prepare_ais_messages(), for the bulk insert
+        :type prepared: list
+        :return: The count of insertions
+        :rtype: int
+        """
+        if self.is_stub or len(messages) == 0:
+            return len(messages)
+        if bulk:
+            try:
+                return self.insert_ais_bulk(messages, prepared)
+            except mysql.connector.Error as err:
+                # The bulk transaction was rolled back, so insert message by message to keep the good ones
+                print(err)
+        count = 0
+        for msg in messages:
             result = self.insert_ais_message(msg)
             if json.loads(result)['success'] == 1:
                 count += 1
+        return count
+
+    def insert_ais_stream(self, source, chunk_size=None):
+        """
+        Inserts AIS messages read incrementally from NDJSON (one message per line) or from a JSON array, writing them
+        in chunks so that memory use does not depend on the size of the input.
+
+        :param source: A file object, or an iterable of NDJSON lines
+        :type source: file or iterable
+        :param chunk_size: Optional, the number of messages written at a time, bulk_chunk_size by default
+        :type chunk_size: int
+        :return: JSON string containing {'inserts': ...} with the count of insertions, or -1 if the input cannot be
+            parsed. Chunks written before a parse error stay inserted; errors raised while writing are not caught.
+        :rtype: str
+        """
+        if chunk_size is None:
+            chunk_size = self.bulk_chunk_size
+        count = 0
+        chunk = []
+        try:
+            for msg in iter_ais_messages(source):
+                chunk.append(msg)
+                if len(chunk) >= chunk_size:
+                    count += self.insert_ais_messages(chunk)
+                    chunk = []
+            count += self.insert_ais_messages(chunk)
+        except AISStreamError as e:
+            return -1
         return json.dumps({"inserts": count})
 
+    def insert_ais_bulk(self, messages, prepared=None):
+        """
+        Inserts a list of AIS messages with multi-row inserts inside a single transaction.
+        The AIS_MESSAGE ids given by the server are linked to the POSITION_REPORT and STATIC_DATA rows client-side.
+
+        :param messages: A list of message dictionaries
+        :type messages: list
+        :param prepared: Optional, the messages already formatted by prepare_ais_messages()
+        :type prepared: list
+        :raises [mysql.connector.Error]: If any insert fails, in which case nothing is written
+        :return: The number of messages inserted, counted the same way as insert_ais_message() successes
+        :rtype: int
+        """
+        if prepared is None:
+            prepared = self.prepare_ais_messages(messages)
+        with MySQLConnectionManager() as con:
+            with MySQLCursorManager(con) as cursor:
+                count = self.write_prepared_messages(cursor, prepared)
+                con.commit()
+                return count
+
+    def prepare_ais_messages(self, messages):
+        """
+        Formats a list of AIS messages into the values written by write_prepared_messages().
+        This is the CPU-bound part of an insert and does not use the database.
+
+        :param messages: A list of message dictionaries
+        :type messages: list
+        :return: List of objects {'MMSI': ..., 'MsgType': ..., 'ais': (...), ...}, one per message
+        :rtype: list
+        """
+        prepared = []
+        located = []
+        for msg in messages:
+            msg = self.format_ais_message(dict(msg))
+            record = {
+                "MMSI": msg['MMSI'],
+                "MsgType": msg.get('MsgType'),
+                "typed": "MsgType" in msg,
+                "IMO": msg['IMO'],
+                "ais": (msg['Timestamp'], msg['MMSI'], msg['Class'])
+            }
+            if record['MsgType'] == 'position_report':
+                msg = self.format_position_report(msg)
+                lat, long = None, None
+                if msg['Position'] is not None:
+                    lat, long = msg['Position']['coordinates'][0], msg['Position']['coordinates'][1]
+                record['position'] = (msg['Status'], long, lat, msg['RoT'], msg['SoG'], msg['CoG'], msg['Heading'])
+                record['tiles'] = (None, None, None)
+                if lat is not None:
+                    located.append((record, lat, long))
+            elif record['MsgType'] == 'static_data':
+                msg = self.format_static_data(msg)
+                record['static'] = (msg['IMO'], msg['CallSign'], msg['Name'], msg['VesselType'], msg['CargoType'],
+                                    msg['Length'], msg['Breadth'], msg['Draught'], msg['Destination'], msg['ETA'],
+                                    msg['DestinationId'])
+            prepared.append(record)
+        if located:
+            tiles = get_tile_resolver().resolve_all([entry[1] for entry in located], [entry[2] for entry in located])
+            for entry, map_views in zip(located, tiles):
+                entry[0]['tiles'] = map_views
+        return prepared
+
+    def write_prepared_messages(self, cursor, prepared):
+        """
+        Writes messages made by prepare_ais_messages() with one multi-row insert per table (and chunk).
+        The caller owns the transaction and must commit. The latest static data of the vessels is read from
+        VESSEL_LAST_STATIC in the same transaction, so retention can never leave a position report linked to static
+        data it has deleted.
+
+        :param cursor: A cursor on the connection to write with
+        :type cursor: MySQLCursorManager
+        :param prepared: The prepared messages
+        :type prepared: list
+        :raises [mysql.connector.Error]: If an insert fails
+        :return: The number of messages inserted, counted the same way as insert_ais_message() successes
+        :rtype: int
+        """
+        if len(prepared) == 0:
+            return 0
+
+        imos = {record['IMO'] for record in prepared
+                if record['MsgType'] == 'static_data' and record['IMO'] is not None}
+        known_imos = {str(row[0]) for row in
+                      self.select_in(cursor, """SELECT IMO FROM VESSEL WHERE IMO IN ({});""", imos)}
+
+        self.ensure_schema(cursor)
+        mmsis = {record['MMSI'] for record in prepared if record['MsgType'] == 'position_report'}
+        last_static = dict(self.select_in(
+            cursor, """SELECT MMSI, AISMessage_Id FROM VESSEL_LAST_STATIC WHERE MMSI IN ({});""", mmsis))
+
+        ais_rows = []
+        for record in prepared:
+            vessel_imo = None
+            if record['MsgType'] == 'static_data' and record['IMO'] is not None and str(record['IMO']) in known_imos:
+                vessel_imo = record['IMO']
+            ais_rows.append(record['ais'] + (vessel_imo,))
+        ids = self.insert_many(cursor, """INSERT INTO AIS_MESSAGE(Timestamp, MMSI, Class, Vessel_IMO, Batch)
+                                          VALUES(%s, %s, %s, %s, %s);""", ais_rows, auto_ids=True)
+
+        static_rows = []
+        position_rows = []
+        latest_static = {}
+        for record, ais_id in zip(prepared, ids):
+            if record['MsgType'] == 'static_data':
+                static_rows.append((ais_id,) + record['static'])
+                last_static[record['MMSI']] = ais_id
+                latest_static[record['MMSI']] = ais_id
+            elif record['MsgType'] == 'position_report':
+                position_rows.append((ais_id,) + record['position'] + (last_static.get(record['MMSI']),) +
+                                     record['tiles'])
+
+        self.insert_many(cursor, """INSERT INTO STATIC_DATA(AISMessage_ID, AISIMO, CallSign, Name, VesselType, CargoType, Length, Breadth, Draught, AISDestination, ETA, DestinationPort_Id)
+                                    VALUES(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s);""", static_rows)
+        self.insert_many(cursor, """INSERT INTO POSITION_REPORT(AISMessage_Id, NavigationalStatus, Longitude, Latitude, RoT, SoG, CoG, Heading, LastStaticData_Id, MapView1_Id, MapView2_Id, MapView3_Id)
+                                    VALUES(%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s);""", position_rows)
+        self.insert_many(cursor, """INSERT INTO VESSEL_LAST_STATIC(MMSI, AISMessage_Id) VALUES(%s, %s)
+                                    ON DUPLICATE KEY UPDATE AISMessage_Id = GREATEST(AISMessage_Id, VALUES(AISMessage_Id));""",
+                         list(latest_static.items()))
+
+        latest_positions = {}
+        latest_static_rows = []
+        for record, ais_row, ais_id in zip(prepared, ais_rows, ids):
+            timestamp = record['ais'][0]
+            if record['MsgType'] == 'position_report' and record['position'][2] is not None:
+                current = latest_positions.get(record['MMSI'])
+                if current is None or timestamp >= current[2]:
+                    latest_positions[record['MMSI']] = (record['MMSI'], ais_id, timestamp, record['position'][2],
+                                                        record['position'][1]) + record['tiles']
+            elif record['MsgType'] == 'static_data':
+                latest_static_rows.append((record['MMSI'], ais_id, timestamp, record['static'][2], record['static'][0],
+                                           ais_row[3], record['static'][10]))
+        self.upsert_latest_positions(cursor, list(latest_positions.values()))
+        self.upsert_latest_static(cursor, sorted(latest_static_rows, key=lambda row: row[2]))
+
+        return sum(1 for record in prepared if record['typed'])
+
+    def get_auto_increment(self, cursor):
+        """
+        Reads the server's auto-increment step, and whether its InnoDB lock mode guarantees every multi-row INSERT a
+        consecutive block of ids. The "traditional" (0) and "consecutive" (1) modes do for an INSERT ... VALUES, whose
+        row count is known in advance; in the "interleaved" mode (2) the ids of concurrent inserts may be mixed. Only
+        reads the server once per process.
+
+        :param cursor: A cursor to run the statement with
+        :type cursor: MySQLCursorManager
+        :return: Tuple (increment, consecutive)
+        :rtype: tuple
+        """
+        if MySQL_DAO.auto_increment is None:
+            cursor.execute("""SELECT @@auto_increment_increment, @@innodb_autoinc_lock_mode;""")
+            increment, lock_mode = cursor.fetchone()
+            MySQL_DAO.auto_increment = (increment, int(lock_mode) in (0, 1))
+        return MySQL_DAO.auto_increment
+
+    def insert_many(self, cursor, stmt, rows, auto_ids=False):
+        """
+        Runs a multi-row INSERT in chunks of bulk_chunk_size rows.
+        With auto_ids, the ids given to the rows are found without a round trip per row, depending on the lock mode
+        read by get_auto_increment():
+
+        - in modes 0 and 1, each INSERT gets a consecutive block of ids, so the id of row i of a chunk is
+          LAST_INSERT_ID() + i * @@auto_increment_increment;
+        - in mode 2, the ids of a statement still increase from LAST_INSERT_ID(), but other inserts may take ids in
+          between. The rows are then tagged with a random marker of the call in the table's Batch column, and the ids
+          of each chunk are read back in order from the rows holding the marker from LAST_INSERT_ID() on. Rows of
+          other transactions never hold the marker, whatever the isolation level.
+
+        The statement of an auto_ids insert must end with the Batch column, which insert_many() fills itself: with
+        the marker in mode 2, and with NULL otherwise.
+
+        :param cursor: A cursor on the connection to write with
+        :type cursor: MySQLCursorManager
+        :param stmt: An INSERT ... VALUES(%s, ...) statement
+        :type stmt: str
+        :param rows: The parameters of every row, without the Batch column
+        :type rows: list
+        :param auto_ids: Optional, whether to return the auto-increment id given to every row
+        :type auto_ids: bool
+        :raises [mysql.connector.Error]: If an insert fails, or fewer ids than rows are read back in mode 2
+        :return: The id given to every row, in order, if auto_ids is set, or else an empty list
+        :rtype: list
+        """
+        ids = []
+        if len(rows) == 0:
+            return ids
+        increment, consecutive = 1, True
+        batch = None
+        if auto_ids:
+            increment, consecutive = self.get_auto_increment(cursor)
+            if not consecutive:
+                batch = random.getrandbits(63)
+            rows = [row + (batch,) for row in rows]
+        for start in range(0, len(rows), self.bulk_chunk_size):
+            chunk = rows[start:start + self.bulk_chunk_size]
+            cursor.executemany(stmt, chunk)
+            if not auto_ids:
+                continue
+            first_id = cursor.lastrowid
+            if consecutive:
+                ids.extend(range(first_id, first_id + len(chunk) * increment, increment))
+                continue
+            table = re.match(r'\s*INSERT\s+INTO\s+(\w+)', stmt, re.IGNORECASE).group(1)
+            cursor.execute("""SELECT Id FROM {} WHERE Id >= %s AND Batch = %s ORDER BY Id LIMIT %s;""".format(table),
+                           (first_id, batch, len(chunk)))
+            chunk_ids = [row[0] for row in cursor.fetchall()]
+            if len(chunk_ids) != len(chunk):
+                raise mysql.connector.Error("Read back %d ids for the %d rows inserted into %s"
+                                            % (len(chunk_ids), len(chunk), table))
+            ids.extend(chunk_ids)
+        return ids
+
+    def select_in(self, cursor, stmt, values):
+        """
+        Runs a SELECT whose IN list is filled with the given values, in chunks of bulk_chunk_size values.
+
+        :param cursor: A cursor on the connection to read with
+        :type cursor: MySQLCursorManager
+        :param stmt: A SELECT statement with one "IN ({})" placeholder
+        :type stmt: str
+        :param values: The values for the IN list
+        :type values: iterable
+        :return: The rows of every chunk
+        :rtype: list
+        """
+        values = list(values)
+        rows = []
+        for start in range(0, len(values), self.bulk_chunk_size):
+            chunk = values[start:start + self.bulk_chunk_size]
+            cursor.execute(stmt.format(", ".join(["%s"] * len(chunk))), tuple(chunk))
+            rows.extend(cursor.fetchall())
+        return rows
+
+    def upsert_latest_positions(self, cursor, rows):
+        """
+        Records positions in VESSEL_LATEST, keeping the most recent one of every vessel.
+
+        :param cursor: A cursor on the connection to write with
+        :type cursor: MySQLCursorManager
+        :param rows: Tuples (MMSI, AIS message id, Timestamp, Latitude, Longitude, MapView1_Id, MapView2_Id,
+            MapView3_Id)
+        :type rows: list
+        """
+        self.insert_many(cursor, """INSERT INTO VESSEL_LATEST(MMSI, PositionMessage_Id, PositionTimestamp, Latitude, Longitude, MapView1_Id, MapView2_Id, MapView3_Id)
+                                    VALUES(%s, %s, %s, %s, %s, %s, %s, %s) """ + LATEST_POSITION_UPDATE, rows)
+
+    def upsert_latest_static(self, cursor, rows):
+        """
+        Records static data in VESSEL_LATEST, keeping the most recent destination and non-null Name and IMO of every
+        vessel.
+
+        :param cursor: A cursor on the connection to write with
+        :type cursor: MySQLCursorManager
+        :param rows: Tuples (MMSI, AIS message id, Timestamp, Name, AISIMO, Vessel_IMO, DestinationPort_Id)
+        :type rows: list
+        """
+        self.insert_many(cursor, """INSERT INTO VESSEL_LATEST(MMSI, StaticMessage_Id, StaticTimestamp, Name, AISIMO, Vessel_IMO, DestinationPort_Id)
+                                    VALUES(%s, %s, %s, %s, %s, %s, %s) """ + LATEST_STATIC_UPDATE, rows)
+
     def insert_ais_message(self, msg):
         """
         Query 2, Priority 2
@@ -182,8 +848,15 @@ class MySQL_DAO:
                             return 'pos'
                         else:
                             return 'stat'
-                    stmt = """INSERT INTO AIS_MESSAGE(Timestamp, MMSI, Class) VALUES(%s, %s, %s);"""
-                    cursor.execute(stmt, (msg['Timestamp'], msg['MMSI'], msg['Class']))
+                    self.ensure_schema(cursor)
+                    vessel_imo = None
+                    if msg.get('MsgType') == 'static_data' and msg['IMO'] is not None:
+                        cursor.execute("""SELECT IMO FROM VESSEL WHERE IMO = %s;""", (msg['IMO'],))
+                        if cursor.fetchone() is not None:
+                            vessel_imo = msg['IMO']
+                    stmt = """INSERT INTO AIS_MESSAGE(Timestamp, MMSI, Class, Vessel_IMO) VALUES(%s, %s, %s, %s);"""
+                    cursor.execute(stmt, (msg['Timestamp'], msg['MMSI'], msg['Class'], vessel_imo))
+                    ais_id = cursor.lastrowid
                     con.commit()
                     if cursor.rowcount == 0:
                         return json.dumps({"success": 0})
@@ -195,47 +868,37 @@ class MySQL_DAO:
                         msg = self.format_position_report(msg)
                         map_views = [None, None, None]
                         if msg['Position'] is not None:
-                            for i in range(len(map_views)):
-                                map_view_dict = self.get_tile(i + 1, msg['Position']['coordinates'][1],
-                                                              msg['Position']['coordinates'][0])
-                                cursor.execute(
-                                    """SELECT * from MAP_VIEW WHERE LongitudeW = %s AND LongitudeE = %s AND LatitudeN = %s AND LatitudeS = %s;""",
-                                    (map_view_dict['west'], map_view_dict['east'], map_view_dict['north'],
-                                     map_view_dict['south']))
-                                rs = cursor.fetchone()
-
-                                if rs is None:
-                                    continue
-                                else:
-                                    map_views[i] = rs[0]
+                            map_views = get_tile_resolver().resolve(msg['Position']['coordinates'][0],
+                                                                    msg['Position']['coordinates'][1])
 
+                        # The latest static data is looked up by the insert itself, so it is never out of date
                         stmt = """INSERT INTO POSITION_REPORT(AISMessage_Id, NavigationalStatus, Longitude, Latitude, RoT, SoG, CoG, Heading, LastStaticData_Id, MapView1_Id, MapView2_Id, MapView3_Id)
-                                  VALUES(LAST_INSERT_ID(), %s, %s, %s, %s, %s, %s, %s, (SELECT MAX(STATIC_DATA.AISMessage_ID) FROM STATIC_DATA, AIS_MESSAGE WHERE STATIC_DATA.AISMessage_Id = AIS_MESSAGE.Id AND AIS_MESSAGE.MMSI = %s), %s, %s, %s);"""
+                                  VALUES(LAST_INSERT_ID(), %s, %s, %s, %s, %s, %s, %s, (SELECT AISMessage_Id FROM VESSEL_LAST_STATIC WHERE MMSI = %s), %s, %s, %s);"""
                         cursor.execute(stmt, (
                             msg['Status'], msg['Position']['coordinates'][1], msg['Position']['coordinates'][0],
                             msg['RoT'],
                             msg['SoG'], msg['CoG'], msg['Heading'], msg['MMSI'], map_views[0], map_views[1],
                             map_views[2]))
+                        if msg['Position'] is not None:
+                            self.upsert_latest_positions(cursor, [(
+                                msg['MMSI'], ais_id, msg['Timestamp'], msg['Position']['coordinates'][0],
+                                msg['Position']['coordinates'][1], map_views[0], map_views[1], map_views[2])])
                         con.commit()
 
                     elif msg['MsgType'] == 'static_data':
                         msg = self.format_static_data(msg)
 
-                        if msg['IMO'] is not None:
-                            stmt = """SELECT IMO FROM VESSEL WHERE IMO = %s;"""
-                            cursor.execute(stmt, (msg['IMO'],))
-                            rs = cursor.fetchone()
-                            if rs is not None:
-                                stmt = """UPDATE AIS_MESSAGE SET Vessel_IMO = %s where Id = LAST_INSERT_ID();"""
-                                cursor.execute(stmt, (msg['IMO'],))
-                                con.commit()
-
                         stmt = """INSERT INTO STATIC_DATA(AISMessage_ID, AISIMO, CallSign, Name, VesselType, CargoType, Length, Breadth, Draught, AISDestination, ETA, DestinationPort_Id)
                                   VALUES(LAST_INSERT_ID(), %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s);"""
                         cursor.execute(stmt, (
                             msg['IMO'], msg['CallSign'], msg['Name'], msg['VesselType'], msg['CargoType'],
                             msg['Length'], msg['Breadth'], msg['Draught'], msg['Destination'],
                             msg['ETA'], msg['DestinationId']))
+                        cursor.execute("""INSERT INTO VESSEL_LAST_STATIC(MMSI, AISMessage_Id) VALUES(%s, %s)
+                                          ON DUPLICATE KEY UPDATE AISMessage_Id = GREATEST(AISMessage_Id, VALUES(AISMessage_Id));""",
+                                       (msg['MMSI'], ais_id))
+                        self.upsert_latest_static(cursor, [(msg['MMSI'], ais_id, msg['Timestamp'], msg['Name'],
+                                                            msg['IMO'], vessel_imo, msg['DestinationId'])])
                         con.commit()
 
                     return json.dumps({"success": 1})
@@ -261,12 +924,15 @@ class MySQL_DAO:
         try:
             with MySQLConnectionManager() as con:
                 with MySQLCursorManager(con) as cursor:
+                    self.ensure_schema(cursor)
                     cursor.execute(
                         """DELETE FROM POSITION_REPORT;""")
                     cursor.execute(
                         """DELETE FROM STATIC_DATA;""")
                     cursor.execute(
                         """DELETE FROM AIS_MESSAGE;""")
+                    cursor.execute("""DELETE FROM VESSEL_LAST_STATIC;""")
+                    cursor.execute("""DELETE FROM VESSEL_LATEST;""")
                     cursor.execute("""ALTER TABLE AIS_MESSAGE AUTO_INCREMENT = 1;""")
                     con.commit()
                     return json.dumps({"success": 1})
@@ -279,11 +945,21 @@ class MySQL_DAO:
             else:
                 print(err)
 
-    def delete_old_ais_messages(self):
+    def delete_old_ais_messages(self, chunk_size=None, pause=None, progress=None):
         """
         Query 3, Priority 1
-        Deletes all AIS Messages older than five minutes.
-
+        Deletes all AIS Messages older than five minutes (retention_window seconds).
+        Messages are deleted by primary key, a chunk at a time, each chunk in its own short transaction, so that the
+        locks taken never cover more than one chunk and ingest can go on in between. When the AIS tables are
+        partitioned, fully expired partitions are dropped first and only the rest is deleted row by row.
+
+        :param chunk_size: Optional, the number of AIS messages deleted per transaction, retention_chunk_size by
+            default
+        :type chunk_size: int
+        :param pause: Optional, seconds to wait between chunks, retention_pause by default
+        :type pause: float
+        :param progress: Optional, called with the running number of deletions after every chunk
+        :type progress: function
         :raises [BaseException]: If the connection fails
         :return: JSON string containing {'deletions': ...} with the number of deletions
         :rtype: str
@@ -291,17 +967,8 @@ class MySQL_DAO:
         if self.is_stub:
             return json.dumps({"deletions": 0})
         try:
-            with MySQLConnectionManager() as con:
-                with MySQLCursorManager(con) as cursor:
-                    cursor.execute(
-                        """DELETE POSITION_REPORT FROM POSITION_REPORT JOIN AIS_MESSAGE ON AISMessage_ID = AIS_MESSAGE.Id WHERE AIS_MESSAGE.Timestamp < (CURRENT_TIMESTAMP - INTERVAL 5 MINUTE);""")
-                    cursor.execute(
-                        """DELETE STATIC_DATA FROM STATIC_DATA JOIN AIS_MESSAGE ON AISMessage_ID = AIS_MESSAGE.Id WHERE AIS_MESSAGE.Timestamp < (CURRENT_TIMESTAMP - INTERVAL 5 MINUTE);""")
-                    cursor.execute(
-                        """DELETE FROM AIS_MESSAGE WHERE Timestamp < (CURRENT_TIMESTAMP - INTERVAL 5 MINUTE);""")
-                    deletions = cursor.rowcount
-                    con.commit()
-                    return json.dumps({"deletions": deletions})
+            deletions, complete = self.expire_ais_messages(chunk_size=chunk_size, pause=pause, progress=progress)
+            return json.dumps({"deletions": deletions})
 
         except mysql.connector.Error as err:
             if err.errno == errorcode.ER_ACCESS_DENIED_ERROR:
@@ -311,6 +978,103 @@ class MySQL_DAO:
             else:
                 print(err)
 
+    def expire_ais_messages(self, window=None, chunk_size=None, pause=None, progress=None, budget=None):
+        """
+        The retention engine behind delete_old_ais_messages(), which can also stop early to bound its running time.
+
+        :param window: Optional, the age in seconds past which messages are deleted, retention_window by default
+        :type window: float
+        :param chunk_size: Optional, the number of AIS messages deleted per transaction, retention_chunk_size by
+            default
+        :type chunk_size: int
+        :param pause: Optional, seconds to wait between chunks, retention_pause by default
+        :type pause: float
+        :param progress: Optional, called with the running number of deletions after every chunk
+        :type progress: function
+        :param budget: Optional, seconds after which no new chunk is started, unlimited by default
+        :type budget: float
+        :raises [mysql.connector.Error]: If a statement fails. The chunks committed before stay deleted.
+        :return: The number of deletions, and whether every expired message was deleted
+        :rtype: tuple
+        """
+        if window is None:
+            window = self.retention_window
+        if chunk_size is None:
+            chunk_size = self.retention_chunk_size
+        if pause is None:
+            pause = self.retention_pause
+        deadline = None if budget is None else time.monotonic() + budget
+        with MySQLConnectionManager() as con:
+            with MySQLCursorManager(con) as cursor:
+                self.ensure_schema(cursor)
+                # Fix the cutoff once, so messages that age during the run are left for the next one
+                cursor.execute("""SELECT CURRENT_TIMESTAMP - INTERVAL %s SECOND;""", (window,))
+                cutoff = cursor.fetchone()[0]
+                con.commit()
+                deletions = 0
+                partition_size = self.get_partition_size()
+                if partition_size is not None:
+                    deletions = drop_expired_partitions(cursor, cutoff, partition_size)
+                    if deletions > 0 and progress is not None:
+                        progress(deletions)
+                    add_partitions(cursor, partition_size)
+                while True:
+                    if deadline is not None and time.monotonic() >= deadline:
+                        return deletions, False
+                    cursor.execute("""SELECT Id, MMSI FROM AIS_MESSAGE WHERE Timestamp < %s LIMIT %s;""",
+                                   (cutoff, chunk_size))
+                    rows = cursor.fetchall()
+                    if len(rows) == 0:
+                        break
+                    deleted = self.delete_ais_message_chunk(cursor, rows)
+                    con.commit()
+                    if deleted == 0:
+                        break
+                    deletions += deleted
+                    if progress is not None:
+                        progress(deletions)
+                    if len(rows) < chunk_size:
+                        break
+                    if pause > 0:
+                        time.sleep(pause)
+                return deletions, True
+
+    def delete_ais_message_chunk(self, cursor, rows):
+        """
+        Deletes AIS messages and everything that refers to them. The caller owns the transaction and must commit.
+        Position reports left behind lose their link to a deleted static data message, and the side tables forget it.
+
+        :param cursor: A cursor on the connection to write with
+        :type cursor: MySQLCursorManager
+        :param rows: The (Id, MMSI) of the AIS messages to delete
+        :type rows: list
+        :return: The number of AIS messages deleted
+        :rtype: int
+        """
+        ids = tuple(row[0] for row in rows)
+        mmsis = tuple({row[1] for row in rows})
+        id_list = ", ".join(["%s"] * len(ids))
+        mmsi_list = ", ".join(["%s"] * len(mmsis))
+        cursor.execute("""DELETE FROM POSITION_REPORT WHERE AISMessage_Id IN ({});""".format(id_list), ids)
+        cursor.execute("""UPDATE POSITION_REPORT SET LastStaticData_Id = NULL
+                          WHERE LastStaticData_Id IN ({});""".format(id_list), ids)
+        cursor.execute("""DELETE FROM VESSEL_LAST_STATIC WHERE AISMessage_Id IN ({});""".format(id_list), ids)
+        cursor.execute("""DELETE FROM STATIC_DATA WHERE AISMessage_Id IN ({});""".format(id_list), ids)
+        cursor.execute("""DELETE FROM AIS_MESSAGE WHERE Id IN ({});""".format(id_list), ids)
+        deletions = cursor.rowcount
+        cursor.execute("""UPDATE VESSEL_LATEST
+                          SET PositionMessage_Id = NULL, PositionTimestamp = NULL, Latitude = NULL, Longitude = NULL,
+                              MapView1_Id = NULL, MapView2_Id = NULL, MapView3_Id = NULL
+                          WHERE MMSI IN ({}) AND PositionMessage_Id IN ({});""".format(mmsi_list, id_list), mmsis + ids)
+        cursor.execute("""UPDATE VESSEL_LATEST
+                          SET StaticMessage_Id = NULL, StaticTimestamp = NULL, Name = NULL, AISIMO = NULL,
+                              Vessel_IMO = NULL, DestinationPort_Id = NULL
+                          WHERE MMSI IN ({}) AND StaticMessage_Id IN ({});""".format(mmsi_list, id_list), mmsis + ids)
+        cursor.execute("""DELETE FROM VESSEL_LATEST
+                          WHERE MMSI IN ({}) AND PositionMessage_Id IS NULL AND StaticMessage_Id IS NULL;""".format(
+                           mmsi_list), mmsis)
+        return deletions
+
     def get_vessel_imo(self, mmsi):
         """
         Retrieves the permanent data's IMO for a ship with a given MMSI
@@ -387,21 +1151,7 @@ class MySQL_DAO:
         try:
             with MySQLConnectionManager() as con:
                 with MySQLCursorManager(con) as cursor:
-                    data = ["NULL", "NULL"]
-                    cursor.execute(
-                        """SELECT Name, AISIMO FROM STATIC_DATA, AIS_MESSAGE WHERE AISMessage_Id = Id AND MMSI = %s ORDER BY Timestamp ASC;""",
-                        (mmsi,))
-                    rows = cursor.fetchall()
-                    for row in rows:
-                        if row[0] is not None:
-                            data[0] = row[0]
-                        if row[1] is not None:
-                            data[1] = row[1]
-            if data[0] == "NULL":
-                data[0] = self.get_vessel_name(mmsi)
-            if data[1] == "NULL":
-                data[1] = self.get_vessel_imo(mmsi)
-            return data
+                    return self.get_optional_vessel_data_many(cursor, [mmsi])[mmsi]
 
         except mysql.connector.Error as err:
             if err.errno == errorcode.ER_ACCESS_DENIED_ERROR:
@@ -411,12 +1161,44 @@ class MySQL_DAO:
             else:
                 print(err)
 
-    def create_vessel_document(self, vessel):
+    def get_optional_vessel_data_many(self, cursor, mmsis):
+        """
+        Same as get_optional_vessel_data() for many vessels at once, with one query on the transient data (as kept in
+        VESSEL_LATEST) and one on the permanent data per bulk_chunk_size vessels, instead of up to three queries per
+        vessel.
+
+        :param cursor: A cursor on the connection to read with
+        :type cursor: MySQLCursorManager
+        :param mmsis: The vessel MMSIs
+        :type mmsis: iterable
+        :return: Dictionary of MMSI to the [Name, IMO] list get_optional_vessel_data() would return for it
+        :rtype: dict
+        """
+        self.ensure_schema(cursor)
+        data = {mmsi: ["NULL", "NULL"] for mmsi in mmsis}
+        rows = self.select_in(cursor, """SELECT MMSI, Name, AISIMO FROM VESSEL_LATEST WHERE MMSI IN ({});""", data)
+        for mmsi, name, imo in rows:
+            if name is not None:
+                data[mmsi][0] = name
+            if imo is not None:
+                data[mmsi][1] = imo
+        missing = [mmsi for mmsi, values in data.items() if "NULL" in values]
+        rows = self.select_in(cursor, """SELECT MMSI, Name, IMO FROM VESSEL WHERE MMSI IN ({});""", missing)
+        for mmsi, name, imo in rows:
+            if data[mmsi][0] == "NULL":
+                data[mmsi][0] = name
+            if data[mmsi][1] == "NULL":
+                data[mmsi][1] = imo
+        return data
+
+    def create_vessel_document(self, vessel, optional_data=None):
         """
         From a list of vessel values, return a dictionary with the MMSI, Latitude, Longitude, Name, and IMO
 
         :param vessel: A list of vessel values
         :type vessel: list
+        :param optional_data: Optional, the vessel's [Name, IMO] if already known, see get_optional_vessel_data_many()
+        :type optional_data: list
         :return: Dictionary containing {'MMSI': ..., 'lat': ...,} with the values of the vessel
         :rtype: dict
         """
@@ -436,7 +1218,8 @@ class MySQL_DAO:
                 "Name": None,
                 "IMO": None
             }
-        optional_data = self.get_optional_vessel_data(vessel[0])
+        if optional_data is None:
+            optional_data = self.get_optional_vessel_data(vessel[0])
         return {
             "MMSI": vessel[0],
             "lat": float(vessel[1]),
@@ -465,14 +1248,16 @@ class MySQL_DAO:
         try:
             with MySQLConnectionManager() as con:
                 with MySQLCursorManager(con) as cursor:
-                    cursor.execute("""SELECT t.MMSI, pos.Latitude, pos.Longitude
-                                      FROM (SELECT Id, MMSI, MAX(Timestamp) as LatestTime from AIS_MESSAGE GROUP BY MMSI) t, POSITION_REPORT as pos
-                                      WHERE t.Id = pos.AISMessage_Id ORDER BY t.LatestTime DESC;""")
+                    self.ensure_schema(cursor)
+                    cursor.execute("""SELECT MMSI, Latitude, Longitude FROM VESSEL_LATEST
+                                      WHERE PositionMessage_Id IS NOT NULL
+                                      ORDER BY PositionTimestamp DESC, PositionMessage_Id ASC;""")
                     rows = cursor.fetchall()
+                    optional_data = self.get_optional_vessel_data_many(cursor, [row[0] for row in rows])
                     vessels = []
                     if len(rows) > 0:
                         for row in rows:
-                            vessel = self.create_vessel_document(row)
+                            vessel = self.create_vessel_document(row, optional_data[row[0]])
                             vessels.append(vessel)
 
                     return json.dumps({"vessels": vessels})
@@ -501,20 +1286,14 @@ class MySQL_DAO:
         try:
             with MySQLConnectionManager() as con:
                 with MySQLCursorManager(con) as cursor:
-                    cursor.execute("""SELECT t.MMSI, pos.Latitude, pos.Longitude, t.Vessel_IMO
-                                      FROM (SELECT Id, MMSI, Vessel_IMO, Timestamp from AIS_MESSAGE WHERE MMSI = %s ORDER BY Timestamp DESC) t, POSITION_REPORT as pos
-                                      WHERE t.Id = pos.AISMessage_Id;""", (mmsi,))
+                    self.ensure_schema(cursor)
+                    cursor.execute("""SELECT MMSI, Latitude, Longitude, Vessel_IMO FROM VESSEL_LATEST
+                                      WHERE MMSI = %s AND PositionMessage_Id IS NOT NULL;""", (mmsi,))
                     if cursor.rowcount == 0:
                         return json.dumps({})
                     pos = cursor.fetchall()[0]
-                    cursor.execute(
-                        """SELECT Vessel_IMO, MMSI, Timestamp FROM AIS_MESSAGE WHERE MMSI = %s AND Vessel_IMO IS NOT NULL ORDER BY Timestamp DESC;""",
-                        (mmsi,))
-                    stat = cursor.fetchall()
-                    if cursor.rowcount == 0:
-                        stat[0][0] = None
 
-                    return json.dumps({"MMSI": pos[0], "lat": float(pos[1]), "long": float(pos[2]), "IMO": stat[0][0]})
+                    return json.dumps({"MMSI": pos[0], "lat": float(pos[1]), "long": float(pos[2]), "IMO": pos[3]})
 
         except mysql.connector.Error as err:
             if err.errno == errorcode.ER_ACCESS_DENIED_ERROR:
@@ -683,15 +1462,17 @@ class MySQL_DAO:
         try:
             with MySQLConnectionManager() as con:
                 with MySQLCursorManager(con) as cursor:
-                    cursor.execute("""SELECT t.MMSI, pos.Latitude, pos.Longitude
-                                      FROM (SELECT Id, MMSI, MAX(Timestamp) as LatestTime FROM AIS_MESSAGE WHERE Vessel_IMO IS NULL GROUP BY MMSI) t, POSITION_REPORT as pos, STATIC_DATA as sd
-                                      WHERE t.Id = pos.AISMessage_Id AND pos.LastStaticData_Id = sd.AISMessage_Id AND sd.DestinationPort_Id = %s ORDER BY t.LatestTime DESC;""",
+                    self.ensure_schema(cursor)
+                    cursor.execute("""SELECT MMSI, Latitude, Longitude FROM VESSEL_LATEST
+                                      WHERE DestinationPort_Id = %s AND PositionMessage_Id IS NOT NULL
+                                      ORDER BY PositionTimestamp DESC, PositionMessage_Id ASC;""",
                                    (port_id,))
                     rows = cursor.fetchall()
+                    optional_data = self.get_optional_vessel_data_many(cursor, [row[0] for row in rows])
                     vessels = []
-                    if cursor.rowcount > 0:
+                    if len(rows) > 0:
                         for row in rows:
-                            vessel = self.create_vessel_document(row)
+                            vessel = self.create_vessel_document(row, optional_data[row[0]])
                             del vessel['Name']
                             vessels.append(vessel)
                     else:
@@ -770,18 +1551,18 @@ class MySQL_DAO:
                     elif cursor.rowcount > 1:
                         return self.read_all_matching_ports(port_name, country)
                     else:
+                        self.ensure_schema(cursor)
                         cursor.execute(
-                            """SELECT t.MMSI, pos.Latitude, pos.Longitude FROM (SELECT Id, MMSI, MAX(Timestamp) as 
-                            LatestTime from AIS_MESSAGE WHERE Vessel_IMO IS NULL GROUP BY MMSI) t, POSITION_REPORT as 
-                            pos, PORT as port, STATIC_DATA as sd WHERE t.Id = pos.AISMessage_Id AND pos.LastStaticData_Id 
-                            = sd.AISMessage_Id AND sd.DestinationPort_Id = port.Id AND port.Name = %s AND 
-                            port.Country = %s ORDER BY t.LatestTime DESC;""",
-                            (port_name, country))
+                            """SELECT MMSI, Latitude, Longitude FROM VESSEL_LATEST
+                            WHERE DestinationPort_Id = %s AND PositionMessage_Id IS NOT NULL
+                            ORDER BY PositionTimestamp DESC, PositionMessage_Id ASC;""",
+                            (id[0][0],))
                         rows = cursor.fetchall()
+                        optional_data = self.get_optional_vessel_data_many(cursor, [row[0] for row in rows])
                         vessels = []
-                        if cursor.rowcount > 0:
+                        if len(rows) > 0:
                             for row in rows:
-                                vessel = self.create_vessel_document(row)
+                                vessel = self.create_vessel_document(row, optional_data[row[0]])
                                 vessels.append(vessel)
                             return json.dumps({"vessels": vessels})
                         else:
@@ -834,24 +1615,21 @@ class MySQL_DAO:
         if self.is_stub:
             return json.dumps({"vessel": []})
         try:
+            rs = self.get_tile_tree().scale(tile_id)
+            if rs is None:
+                return json.dumps({"vessel": []})
             with MySQLConnectionManager() as con:
                 with MySQLCursorManager(con) as cursor:
-                    cursor.execute("""SELECT Scale
-                                      FROM MAP_VIEW
-                                      WHERE MAP_VIEW.Id = %s""", (tile_id,))
-                    if cursor.rowcount == 0:
-                        return json.dumps({"vessel": []})
-                    rs = cursor.fetchone()[0]
-                    statement = """SELECT t.MMSI, pos.Latitude, pos.Longitude, t.Vessel_IMO
-                                                    FROM (SELECT Id, MMSI, Vessel_IMO, max(Timestamp) max from AIS_MESSAGE WHERE Vessel_IMO IS NULL GROUP BY MMSI) t, POSITION_REPORT as pos
-                                                    WHERE pos.MapView""" + str(
-                        rs) + """_Id = %s AND t.Id = pos.AISMessage_Id;"""
+                    self.ensure_schema(cursor)
+                    statement = """SELECT MMSI, Latitude, Longitude, Vessel_IMO FROM VESSEL_LATEST
+                                   WHERE MapView""" + str(rs) + """_Id = %s AND PositionMessage_Id IS NOT NULL;"""
                     cursor.execute(statement, (tile_id,))
                     rows = cursor.fetchall()
+                    optional_data = self.get_optional_vessel_data_many(cursor, [row[0] for row in rows])
                     vessel = []
-                    if cursor.rowcount > 0:
+                    if len(rows) > 0:
                         for row in rows:
-                            v = self.create_vessel_document(row)
+                            v = self.create_vessel_document(row, optional_data[row[0]])
                             vessel.append(v)
 
                     return json.dumps({"vessel": vessel})
@@ -1028,18 +1806,76 @@ class MySQL_DAO:
         if self.is_stub:
             return json.dumps({"tiles": []})
         try:
-            with MySQLConnectionManager() as con:
-                with MySQLCursorManager(con) as cursor:
-                    cursor.execute("""SELECT map3.*
-                                      FROM MAP_VIEW as map3, MAP_VIEW as map2
-                                      WHERE map2.Id= %s AND map3.ContainerMapView_Id=map2.Id;""", (map_tile_id,))
-                    rows = cursor.fetchall()
-                    tiles = []
-                    if cursor.rowcount > 0:
-                        for row in rows:
-                            tile = self.create_tile_document(row)
-                            tiles.append(tile)
-                    return json.dumps({"tiles": tiles})
+            tiles = [self.create_tile_document(row) for row in self.get_tile_tree().children(map_tile_id)]
+            return json.dumps({"tiles": tiles})
+
+        except mysql.connector.Error as err:
+            if err.errno == errorcode.ER_ACCESS_DENIED_ERROR:
+                print("Something is wrong with your user name or password")
+            elif err.errno == errorcode.ER_BAD_DB_ERROR:
+                print("Database does not exist")
+            else:
+                print(err)
+
+    def get_tile_bundle_path(self):
+        """
+        Reads the tile bundle to serve tiles from in the [TILES] section of the connection config, see tile_bundle.py.
+        A relative path is taken from the base project directory.
+
+        :return: The path of the bundle, or None if tiles are read from their own files
+        :rtype: str
+        """
+        config = read_connection_config(MySQLConnectionManager.config_file)
+        path = config.get('TILES', 'bundle', fallback='').strip()
+        if not path:
+            return None
+        return os.path.join(os.path.dirname(os.path.abspath(__file__)), path)
+
+    def get_tile_entry(self, map_tile_id):
+        """
+        Returns the file of a map tile from tile_cache. On a cache miss, the tile is sliced out of the tile bundle if
+        one is configured, and otherwise its RasterFile is found in the tile tree and read.
+
+        :param map_tile_id: The Id of a map tile
+        :type map_tile_id: str
+        :raises [mysql.connector.Error]: If the MAP_VIEW lookup fails
+        :return: The tile, or None if there is no such tile
+        :rtype: TileEntry
+        """
+        entry = self.tile_cache.get(map_tile_id)
+        if entry is not None:
+            return entry
+        bundle_path = self.get_tile_bundle_path()
+        bundle = get_tile_bundle(bundle_path) if bundle_path is not None else None
+        if bundle is not None:
+            raw = bundle.get_by_id(map_tile_id)
+            if raw is None:
+                return None
+            return self.tile_cache.put(map_tile_id, TileEntry(bundle.path, bundle.mtime_ns, raw))
+        tile_image = self.get_tile_tree().raster_file(map_tile_id)
+        if tile_image is None:
+            return None
+        return self.tile_cache.load(map_tile_id, os.path.join(TILE_DIRECTORY, tile_image))
+
+    def given_tile_id_get_tile_raw(self, map_tile_id):
+        """
+        Query 14, without the base64 encoding: returns the PNG bytes of a tile as a read-only view of the cached
+        buffer, so that they can be sent as they are without copying, along with an ETag for conditional requests.
+
+        :param map_tile_id: The Id of a map tile
+        :type map_tile_id: str
+        :raises [BaseException]: If the connection fails
+        :return: Object {'data': ..., 'etag': ..., 'content_type': 'image/png'} with the bytes as a memoryview, or -1
+            if there is no such tile
+        :rtype: dict
+        """
+        if self.is_stub:
+            return {"data": memoryview(b''), "etag": None, "content_type": "image/png"}
+        try:
+            entry = self.get_tile_entry(map_tile_id)
+            if entry is None:
+                return -1
+            return {"data": entry.view(), "etag": entry.etag, "content_type": "image/png"}
 
         except mysql.connector.Error as err:
             if err.errno == errorcode.ER_ACCESS_DENIED_ERROR:
@@ -1053,6 +1889,7 @@ class MySQL_DAO:
         """
         Query 14, Priority 4
         Return the actual tile (a PNG file), the binary data.
+        Tiles are served from tile_cache, so only the first request for a tile reads its file.
 
         :param map_tile_id: The Id of a map tile
         :type map_tile_id: str
@@ -1065,18 +1902,10 @@ class MySQL_DAO:
         if self.is_stub:
             return map_tile_id
         try:
-            with MySQLConnectionManager() as con:
-                with MySQLCursorManager(con) as cursor:
-                    cursor.execute("""SELECT MAP_VIEW.RasterFile
-                                       FROM MAP_VIEW
-                                       WHERE MAP_VIEW.Id = %s""", (map_tile_id,))
-                    if cursor.rowcount == 0:
-                        return -1
-                    tile_image = cursor.fetchone()[0]
-                    path = os.path.abspath(os.path.join(os.path.dirname(__file__), 'data', 'denmark_tiles', tile_image))
-                    with open(path, 'rb') as f:
-                        file_data = base64.b64encode(f.read())
-                        return file_data
+            entry = self.get_tile_entry(map_tile_id)
+            if entry is None:
+                return -1
+            return entry.encoded
 
         except mysql.connector.Error as err:
             if err.errno == errorcode.ER_ACCESS_DENIED_ERROR:
@@ -1085,3 +1914,6 @@ class MySQL_DAO:
                 print("Database does not exist")
             else:
                 print(err)
+
+
+configure_instrumentation(MySQL_DAO, read_connection_config(MySQLConnectionManager.config_file))
@@ -0,0 +1,274 @@
+"""
+Generates synthetic AIS traffic for scale testing, as position_report and static_data messages in the JSON shape
+insert_ais_batch() and insert_ais_stream() accept. Vessels sail between ports, or wander when no ports are given,
+and never leave the map (7 to 13 degrees east, 54.5 to 57.5 degrees north). The same seed always gives the same
+messages, and messages are made one at a time, so any number can be streamed.
+
+To write a million messages as NDJSON, with destinations drawn from the PORT table, run from the base project
+directory: `python -m ais_generator --messages 1000000 --ports-from-db --output traffic.ndjson`
+"""
+import argparse
+import datetime
+import heapq
+import json
+import math
+import random
+import sys
+
+from map_tiles import TileResolver
+from MySQL_DAO import MySQLConnectionManager, MySQLCursorManager
+
+TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%S.000Z"
+VESSEL_TYPES = ['Cargo', 'Tanker', 'Passenger', 'Fishing', 'Tug', 'Pleasure']
+# Degrees from a port at which a vessel counts as arrived and picks its next destination
+ARRIVAL_DISTANCE = 0.02
+
+
+def load_ports():
+    """
+    Reads the ports that lie on the map from the PORT table.
+
+    :raises [mysql.connector.Error]: If the query fails
+    :return: List of port objects {'Id': ..., 'Name': ..., 'Latitude': ..., 'Longitude': ...}
+    :rtype: list
+    """
+    with MySQLConnectionManager() as con:
+        with MySQLCursorManager(con) as cursor:
+            cursor.execute("""SELECT Id, Name, Latitude, Longitude FROM PORT
+                              WHERE Latitude BETWEEN %s AND %s AND Longitude BETWEEN %s AND %s
+                              ORDER BY Id;""",
+                           (TileResolver.SOUTH, TileResolver.NORTH, TileResolver.WEST, TileResolver.EAST))
+            return [{"Id": row[0], "Name": row[1], "Latitude": float(row[2]), "Longitude": float(row[3])}
+                    for row in cursor.fetchall()]
+
+
+class SimulatedVessel:
+    """
+    Class SimulatedVessel
+    One vessel of the generated traffic: its fixed particulars and its current position, speed and course.
+
+    :param mmsi: The vessel MMSI
+    :type mmsi: int
+    :param rng: The random generator of the traffic
+    :type rng: random.Random
+    :param report_interval: Seconds between two position reports of this vessel
+    :type report_interval: float
+    """
+
+    def __init__(self, mmsi, rng, report_interval):
+        self.mmsi = mmsi
+        self.report_interval = report_interval
+        self.imo = str(9000000 + rng.randrange(1000000)) if rng.random() < 0.8 else "Unknown"
+        self.name = "VESSEL %d" % mmsi
+        self.vessel_type = rng.choice(VESSEL_TYPES)
+        self.length = rng.randrange(10, 300)
+        self.breadth = max(3, self.length // 6)
+        self.lat = rng.uniform(TileResolver.SOUTH, TileResolver.NORTH)
+        self.long = rng.uniform(TileResolver.WEST, TileResolver.EAST)
+        self.speed = rng.uniform(5.0, 20.0)
+        self.course = rng.uniform(0.0, 360.0)
+        self.destination = None
+        self.last_static = None
+
+    def steer(self, rng, ports):
+        """
+        Sets the course for the next leg: towards the destination port if there is one, picking a new one on
+        arrival, or else a small random turn.
+
+        :param rng: The random generator of the traffic
+        :type rng: random.Random
+        :param ports: The ports to sail to, possibly empty
+        :type ports: list
+        """
+        if ports:
+            if self.destination is None or (abs(self.destination['Latitude'] - self.lat) < ARRIVAL_DISTANCE and
+                                            abs(self.destination['Longitude'] - self.long) < ARRIVAL_DISTANCE):
+                self.destination = rng.choice(ports)
+            north = self.destination['Latitude'] - self.lat
+            east = (self.destination['Longitude'] - self.long) * math.cos(math.radians(self.lat))
+            self.course = (math.degrees(math.atan2(east, north)) + rng.uniform(-5.0, 5.0)) % 360.0
+        else:
+            self.course = (self.course + rng.uniform(-10.0, 10.0)) % 360.0
+
+    def move(self, seconds):
+        """
+        Sails on for some time, turning back at the edges of the map.
+
+        :param seconds: The time sailed
+        :type seconds: float
+        """
+        # One knot is one minute of latitude per hour
+        distance = self.speed * seconds / 3600.0 / 60.0
+        lat = self.lat + distance * math.cos(math.radians(self.course))
+        long = self.long + distance * math.sin(math.radians(self.course)) / math.cos(math.radians(self.lat))
+        if not TileResolver.SOUTH <= lat <= TileResolver.NORTH:
+            self.course = (180.0 - self.course) % 360.0
+            lat = min(max(lat, TileResolver.SOUTH), TileResolver.NORTH)
+        if not TileResolver.WEST <= long <= TileResolver.EAST:
+            self.course = (360.0 - self.course) % 360.0
+            long = min(max(long, TileResolver.WEST), TileResolver.EAST)
+        self.lat, self.long = lat, long
+
+
+class AISGenerator:
+    """
+    Class AISGenerator
+    Reproducible stream of synthetic AIS messages. Every vessel sends a position report every report_interval
+    seconds (give or take 20%, fixed per vessel), and its static data with its first report and then every
+    static_interval seconds. The static data of a vessel with a destination names the port and its id.
+
+    :param vessels: Optional, the number of vessels
+    :type vessels: int
+    :param report_interval: Optional, the mean number of seconds between two position reports of a vessel
+    :type report_interval: float
+    :param static_interval: Optional, the number of seconds between two static data messages of a vessel
+    :type static_interval: float
+    :param ports: Optional, the destinations, as returned by load_ports(); vessels wander without them
+    :type ports: list
+    :param seed: Optional, the random seed
+    :type seed: int
+    :param start: Optional, the time of the first message
+    :type start: datetime.datetime
+    """
+
+    def __init__(self, vessels=100, report_interval=10.0, static_interval=360.0, ports=None, seed=418,
+                 start=datetime.datetime(2020, 11, 18)):
+        self.vessels = vessels
+        self.report_interval = report_interval
+        self.static_interval = static_interval
+        self.ports = list(ports) if ports else []
+        self.seed = seed
+        self.start = start
+
+    def messages(self, count=None, duration=None):
+        """
+        Makes the messages in timestamp order.
+
+        :param count: Optional, the number of messages to make, unlimited by default
+        :type count: int
+        :param duration: Optional, the number of seconds of traffic to make, unlimited by default
+        :type duration: float
+        :return: A generator of message dictionaries
+        :rtype: generator
+        """
+        rng = random.Random(self.seed)
+        fleet = [SimulatedVessel(200000000 + index, rng, self.report_interval * rng.uniform(0.8, 1.2))
+                 for index in range(self.vessels)]
+        queue = [(rng.uniform(0.0, vessel.report_interval), index) for index, vessel in enumerate(fleet)]
+        heapq.heapify(queue)
+        made = 0
+        second, timestamp = None, None
+        while queue and (count is None or made < count):
+            elapsed, index = heapq.heappop(queue)
+            if duration is not None and elapsed > duration:
+                return
+            vessel = fleet[index]
+            # Many messages share a second, so the timestamp is only formatted when the second changes
+            if int(elapsed) != second:
+                second = int(elapsed)
+                timestamp = (self.start + datetime.timedelta(seconds=second)).strftime(TIMESTAMP_FORMAT)
+            if vessel.last_static is None or elapsed - vessel.last_static >= self.static_interval:
+                vessel.steer(rng, self.ports)
+                vessel.last_static = elapsed
+                yield self.static_data(vessel, timestamp)
+                made += 1
+                if count is not None and made >= count:
+                    return
+            vessel.steer(rng, self.ports)
+            vessel.move(vessel.report_interval)
+            yield self.position_report(vessel, timestamp)
+            made += 1
+            heapq.heappush(queue, (elapsed + vessel.report_interval, index))
+
+    def __iter__(self):
+        return self.messages()
+
+    @staticmethod
+    def position_report(vessel, timestamp):
+        """
+        Makes a position report of a vessel.
+
+        :param vessel: The vessel
+        :type vessel: SimulatedVessel
+        :param timestamp: The ISO 8601 timestamp of the message
+        :type timestamp: str
+        :return: The message
+        :rtype: dict
+        """
+        return {"Timestamp": timestamp, "Class": "Class A", "MMSI": vessel.mmsi, "MsgType": "position_report",
+                "Position": {"type": "Point", "coordinates": [round(vessel.lat, 6), round(vessel.long, 6)]},
+                "Status": "Under way using engine", "RoT": 0, "SoG": round(vessel.speed, 1),
+                "CoG": round(vessel.course, 1), "Heading": int(vessel.course) % 360}
+
+    @staticmethod
+    def static_data(vessel, timestamp):
+        """
+        Makes a static data message of a vessel.
+
+        :param vessel: The vessel
+        :type vessel: SimulatedVessel
+        :param timestamp: The ISO 8601 timestamp of the message
+        :type timestamp: str
+        :return: The message
+        :rtype: dict
+        """
+        msg = {"Timestamp": timestamp, "Class": "Class A", "MMSI": vessel.mmsi, "MsgType": "static_data",
+               "IMO": vessel.imo, "Name": vessel.name, "VesselType": vessel.vessel_type, "Length": vessel.length,
+               "Breadth": vessel.breadth, "A": vessel.length // 2, "B": vessel.length - vessel.length // 2,
+               "C": vessel.breadth // 2, "D": vessel.breadth - vessel.breadth // 2}
+        if vessel.destination is not None:
+            msg["Destination"] = vessel.destination['Name']
+            msg["DestinationId"] = vessel.destination['Id']
+        return msg
+
+
+def write_messages(messages, out, array=False):
+    """
+    Writes messages as NDJSON, or as one JSON array, without holding them all in memory.
+
+    :param messages: The messages
+    :type messages: iterable
+    :param out: A text file object
+    :type out: file
+    :param array: Optional, whether to write a JSON array instead of NDJSON
+    :type array: bool
+    :return: The number of messages written
+    :rtype: int
+    """
+    count = 0
+    if array:
+        out.write("[")
+    for msg in messages:
+        if array and count > 0:
+            out.write(",\n")
+        out.write(json.dumps(msg))
+        if not array:
+            out.write("\n")
+        count += 1
+    if array:
+        out.write("]\n")
+    return count
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--messages', type=int, default=None, help="number of messages, unlimited by default")
+    parser.add_argument('--duration', type=float, default=None, help="seconds of traffic, unlimited by default")
+    parser.add_argument('--vessels', type=int, default=100)
+    parser.add_argument('--report-interval', type=float, default=10.0)
+    parser.add_argument('--static-interval', type=float, default=360.0)
+    parser.add_argument('--seed', type=int, default=418)
+    parser.add_argument('--ports-from-db', action='store_true', help="sail between the ports of the PORT table")
+    parser.add_argument('--array', action='store_true', help="write a JSON array instead of NDJSON")
+    parser.add_argument('--output', help="file to write, standard output by default")
+    args = parser.parse_args()
+    if args.messages is None and args.duration is None:
+        parser.error("give --messages or --duration")
+    generator = AISGenerator(args.vessels, args.report_interval, args.static_interval,
+                             load_ports() if args.ports_from_db else None, args.seed)
+    stream = generator.messages(args.messages, args.duration)
+    if args.output:
+        with open(args.output, 'w') as f:
+            write_messages(stream, f, args.array)
+    else:
+        write_messages(stream, sys.stdout, args.array)
@@ -0,0 +1,152 @@
+import codecs
+import json
+
+READ_SIZE = 65536
+MAX_MESSAGE_SIZE = 1048576
+
+
+class AISStreamError(ValueError):
+    """
+    Class AISStreamError
+    Raised by iter_ais_messages() when the input is neither valid NDJSON nor a valid JSON array, so that callers can
+    tell a malformed input from errors raised while handling the parsed messages.
+    """
+
+
+def _text_chunks(source, read_size):
+    """
+    Turns a file object (text or binary) or an iterable of lines into a stream of text chunks.
+    Items of an iterable are treated as lines, so a missing line break is added.
+    """
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    try:
+        if hasattr(source, 'read'):
+            while True:
+                chunk = source.read(read_size)
+                if not chunk:
+                    break
+                yield decoder.decode(chunk) if isinstance(chunk, bytes) else chunk
+        else:
+            for line in source:
+                if isinstance(line, bytes):
+                    line = decoder.decode(line)
+                yield line if line.endswith('\n') else line + '\n'
+        tail = decoder.decode(b'', final=True)
+    except UnicodeDecodeError as e:
+        raise AISStreamError("Input is not valid UTF-8: %s" % e) from e
+    if tail:
+        yield tail
+
+
+def iter_ais_messages(source, read_size=READ_SIZE, max_message_size=MAX_MESSAGE_SIZE):
+    """
+    Parses AIS messages one at a time from NDJSON (one JSON object per line) or from a JSON array, without holding
+    the whole input in memory. The format is picked from the first non-whitespace character.
+
+    :param source: A file object, or an iterable of lines
+    :type source: file or iterable
+    :param read_size: Optional, how many characters or bytes to read from a file object at a time
+    :type read_size: int
+    :param max_message_size: Optional, the largest number of characters a single message may use
+    :type max_message_size: int
+    :raises [AISStreamError]: If the input is neither valid NDJSON nor a valid JSON array
+    :return: A generator of the parsed messages
+    :rtype: generator
+    """
+    chunks = _text_chunks(source, read_size)
+    buffer = ''
+    for chunk in chunks:
+        buffer += chunk
+        if buffer.strip():
+            break
+    buffer = buffer.lstrip()
+    if not buffer:
+        return
+    if buffer[0] == '[':
+        yield from _iter_array(buffer[1:], chunks, max_message_size)
+    else:
+        yield from _iter_lines(buffer, chunks, max_message_size)
+
+
+def _load_line(line):
+    try:
+        return json.loads(line)
+    except json.JSONDecodeError as e:
+        raise AISStreamError("Invalid NDJSON line: %s" % e) from e
+
+
+def _iter_lines(buffer, chunks, max_message_size):
+    while True:
+        lines = buffer.split('\n')
+        buffer = lines.pop()
+        for line in lines:
+            if line.strip():
+                yield _load_line(line)
+        if len(buffer) > max_message_size:
+            raise AISStreamError("NDJSON line longer than %d characters" % max_message_size)
+        chunk = next(chunks, None)
+        if chunk is None:
+            if buffer.strip():
+                yield _load_line(buffer)
+            return
+        buffer += chunk
+
+
+def _iter_array(buffer, chunks, max_message_size):
+    decoder = json.JSONDecoder()
+    exhausted = False
+    expect_value = True
+    after_comma = False
+    pos = 0
+    while True:
+        while pos < len(buffer) and buffer[pos] in ' \t\r\n':
+            pos += 1
+        if pos >= len(buffer) or (not expect_value and buffer[pos] not in ',]'):
+            if pos < len(buffer):
+                raise AISStreamError("Expected ',' or ']' in JSON array at character %d" % pos)
+            if exhausted:
+                raise AISStreamError("JSON array is not closed")
+            buffer, pos = buffer[pos:], 0
+            chunk = next(chunks, None)
+            if chunk is None:
+                exhausted = True
+            else:
+                buffer += chunk
+            continue
+        if buffer[pos] == ']':
+            if after_comma:
+                raise AISStreamError("Trailing ',' in JSON array")
+            if buffer[pos + 1:].strip() or any(chunk.strip() for chunk in chunks):
+                raise AISStreamError("Extra data after JSON array")
+            return
+        if not expect_value:
+            pos += 1
+            expect_value = True
+            after_comma = True
+            continue
+        try:
+            value, end = decoder.raw_decode(buffer, pos)
+            # Objects, arrays and strings end with their own delimiter, but a number or literal may have been cut
+            # short by the end of the buffer, so only trust it once the character after it has been read
+            complete = isinstance(value, (dict, list, str)) or exhausted or \
+                (end < len(buffer) and buffer[end] in ' \t\r\n,]')
+        except json.JSONDecodeError:
+            complete = False
+        if not complete:
+            if exhausted:
+                raise AISStreamError("Invalid JSON in array at character %d" % pos)
+            if len(buffer) - pos > max_message_size:
+                raise AISStreamError("JSON array element longer than %d characters" % max_message_size)
+            buffer, pos = buffer[pos:], 0
+            chunk = next(chunks, None)
+            if chunk is None:
+                exhausted = True
+            else:
+                buffer += chunk
+            continue
+        yield value
+        pos = end
+        expect_value = False
+        after_comma = False
+        if pos > READ_SIZE:
+            buffer, pos = buffer[pos:], 0
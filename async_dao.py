@@ -0,0 +1,55 @@
+import asyncio
+import concurrent.futures
+import functools
+
+from MySQL_DAO import MySQL_DAO, MySQLConnectionManager, read_connection_config
+
+
+class AsyncMySQL_DAO:
+    """
+    Class AsyncMySQL_DAO
+    The methods of MySQL_DAO as coroutines, so that one event loop can have many DAO calls in flight. Each call runs
+    the blocking method on a thread of a bounded executor, and the threads check their connections out of the shared
+    connection pool. The executor has as many threads as the pool has connections by default, so that calls queue
+    in the event loop rather than in the pool.
+
+    Every public method of MySQL_DAO is available under the same name and with the same parameters, e.g.
+    `await dao.read_vessel_information(219005465)`.
+
+    :param stub: Optional, whether the underlying DAO is a stub
+    :type stub: bool
+    :param max_workers: Optional, the number of calls run at once, the [POOL] size by default
+    :type max_workers: int
+    """
+
+    def __init__(self, stub=False, max_workers=None):
+        if max_workers is None:
+            max_workers = read_connection_config(MySQLConnectionManager.config_file).getint(
+                'POOL', 'size', fallback=5)
+        self.dao = MySQL_DAO(stub)
+        self.max_workers = max_workers
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='dao')
+
+    def __getattr__(self, name):
+        method = getattr(self.dao, name)
+        if name.startswith('_') or not callable(method):
+            return method
+
+        @functools.wraps(method)
+        async def call(*args, **kwargs):
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, functools.partial(method, *args, **kwargs))
+
+        return call
+
+    async def close(self):
+        """
+        Waits for the calls in flight to finish and stops the executor threads.
+        """
+        await asyncio.get_running_loop().run_in_executor(None, self._executor.shutdown)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
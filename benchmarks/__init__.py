@@ -0,0 +1,4 @@
+"""
+Benchmarks for the MySQL DAO. Run them from the base project directory so `connection_data.conf` is found, e.g.
+`python -m benchmarks.bench_pool`.
+"""
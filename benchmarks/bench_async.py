@@ -0,0 +1,58 @@
+"""
+Measures how the throughput of AsyncMySQL_DAO scales with the number of calls in flight on one event loop, against
+the blocking DAO called one call at a time. Each call is Query 3 (the most recent position of a vessel).
+Needs a running MySQL server configured in `connection_data.conf`, with some AIS messages inserted. Calls past the
+[POOL] size wait for a connection, so raise it to measure higher levels.
+"""
+import argparse
+import asyncio
+import time
+
+from MySQL_DAO import MySQL_DAO
+from async_dao import AsyncMySQL_DAO
+from benchmarks.common import time_calls, summarize, print_summary
+
+MMSI = 219005465
+
+
+async def run_concurrent(dao, calls, concurrency):
+    samples = []
+    queue = asyncio.Queue()
+    for _ in range(calls):
+        queue.put_nowait(MMSI)
+
+    async def client():
+        while not queue.empty():
+            mmsi = queue.get_nowait()
+            start = time.perf_counter()
+            await dao.select_most_recent_from_mmsi(mmsi)
+            samples.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[client() for _ in range(concurrency)])
+    return samples, time.perf_counter() - start
+
+
+def run(calls, levels):
+    tmb = MySQL_DAO()
+    result = summarize("blocking DAO", time_calls(lambda: tmb.select_most_recent_from_mmsi(MMSI), calls))
+    print_summary(result)
+    results = [result]
+    for concurrency in levels:
+        dao = AsyncMySQL_DAO(max_workers=concurrency)
+        samples, elapsed = asyncio.run(run_concurrent(dao, calls, concurrency))
+        dao._executor.shutdown()
+        result = summarize("async DAO, %d in flight" % concurrency, samples)
+        # Calls overlap, so the rate comes from the wall-clock time rather than the sum of the latencies
+        result['per_second'] = calls / elapsed if elapsed > 0 else 0.0
+        print_summary(result)
+        results.append(result)
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--calls', type=int, default=2000)
+    parser.add_argument('--levels', type=int, nargs='+', default=[1, 2, 4, 8, 16])
+    args = parser.parse_args()
+    run(args.calls, args.levels)
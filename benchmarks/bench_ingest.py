@@ -0,0 +1,50 @@
+"""
+Compares the per-message and the bulk paths of insert_ais_batch on one batch of synthetic messages.
+Needs a running MySQL server configured in `connection_data.conf`. The AIS tables are emptied before each run.
+"""
+import argparse
+import json
+import random
+import time
+
+from MySQL_DAO import MySQL_DAO
+
+
+def make_batch(size, seed=418):
+    rng = random.Random(seed)
+    messages = []
+    for i in range(size):
+        mmsi = 200000000 + rng.randrange(size // 10 + 1)
+        if i % 5 == 0:
+            messages.append({"Timestamp": "2020-11-18T00:00:%02d.000Z" % (i % 60), "Class": "Class A", "MMSI": mmsi,
+                             "MsgType": "static_data", "IMO": "Unknown", "Name": "VESSEL %d" % mmsi,
+                             "VesselType": "Cargo", "Length": 100, "Breadth": 20})
+        else:
+            messages.append({"Timestamp": "2020-11-18T00:00:%02d.000Z" % (i % 60), "Class": "Class A", "MMSI": mmsi,
+                             "MsgType": "position_report",
+                             "Position": {"type": "Point",
+                                          "coordinates": [rng.uniform(54.5, 57.5), rng.uniform(7.0, 13.0)]},
+                             "Status": "Under way using engine", "RoT": 0, "SoG": 10.0, "CoG": 90.0, "Heading": 90})
+    return json.dumps(messages)
+
+
+def run(size):
+    tmb = MySQL_DAO()
+    batch = make_batch(size)
+    results = []
+    for bulk in (False, True):
+        tmb.delete_ais_messages()
+        start = time.perf_counter()
+        inserted = json.loads(tmb.insert_ais_batch(batch, bulk=bulk))['inserts']
+        elapsed = time.perf_counter() - start
+        results.append({"name": "insert_ais_batch bulk=%s" % bulk, "messages": inserted, "seconds": elapsed,
+                        "per_second": inserted / elapsed if elapsed > 0 else 0.0})
+        print("{name:<30} {messages:>8} messages {seconds:8.3f} s {per_second:12.1f} messages/s".format(**results[-1]))
+    tmb.delete_ais_messages()
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--size', type=int, default=10000)
+    run(parser.parse_args().size)
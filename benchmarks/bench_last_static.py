@@ -0,0 +1,44 @@
+"""
+Measures insert_ais_message latency for position reports while STATIC_DATA grows, to check that looking up
+LastStaticData_Id does not slow down with history size.
+Needs a running MySQL server configured in `connection_data.conf`. The AIS tables are emptied first.
+"""
+import argparse
+import json
+
+from MySQL_DAO import MySQL_DAO
+from benchmarks.common import time_calls, summarize, print_summary
+
+
+def static_batch(size, offset):
+    return json.dumps([{"Timestamp": "2020-11-18T00:00:00.000Z", "Class": "Class A",
+                        "MMSI": 200000000 + (offset + i) % 5000, "MsgType": "static_data", "IMO": "Unknown",
+                        "Name": "VESSEL"} for i in range(size)])
+
+
+def position(mmsi):
+    return {"Timestamp": "2020-11-18T00:00:00.000Z", "Class": "Class A", "MMSI": mmsi, "MsgType": "position_report",
+            "Position": {"type": "Point", "coordinates": [55.5, 11.5]}, "Status": "Under way using engine",
+            "RoT": 0, "SoG": 10.0, "CoG": 90.0, "Heading": 90}
+
+
+def run(steps, step_size, iterations):
+    tmb = MySQL_DAO()
+    tmb.delete_ais_messages()
+    results = []
+    for step in range(steps):
+        tmb.insert_ais_batch(static_batch(step_size, step * step_size))
+        samples = time_calls(lambda: tmb.insert_ais_message(position(200000000 + step)), iterations)
+        results.append(summarize("position insert, %d static rows" % ((step + 1) * step_size), samples))
+        print_summary(results[-1])
+    tmb.delete_ais_messages()
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--steps', type=int, default=5)
+    parser.add_argument('--step-size', type=int, default=100000)
+    parser.add_argument('--iterations', type=int, default=200)
+    args = parser.parse_args()
+    run(args.steps, args.step_size, args.iterations)
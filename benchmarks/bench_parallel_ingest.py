@@ -0,0 +1,54 @@
+"""
+Measures how ParallelIngest scales with the number of worker processes, against the serial prepare_ais_messages().
+By default the DAO is a stub, so only the formatting is measured and no database is needed. With --write, the
+messages are also written, which needs a running MySQL server configured in `connection_data.conf`; the AIS tables
+are then emptied before each run.
+"""
+import argparse
+import json
+import time
+
+from MySQL_DAO import MySQL_DAO
+from parallel_ingest import ParallelIngest
+from benchmarks.bench_ingest import make_batch
+
+
+def timed(name, messages, func):
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    result = {"name": name, "messages": messages, "seconds": elapsed,
+              "per_second": messages / elapsed if elapsed > 0 else 0.0}
+    print("{name:<40} {messages:>8} messages {seconds:8.3f} s {per_second:12.1f} messages/s".format(**result))
+    return result
+
+
+def run(size, levels, writers, write):
+    tmb = MySQL_DAO(not write)
+    messages = json.loads(make_batch(size))
+    if write:
+        tmb.delete_ais_messages()
+        results = [timed("MySQL_DAO.insert_ais_messages", size, lambda: tmb.insert_ais_messages(messages))]
+    else:
+        results = [timed("MySQL_DAO.prepare_ais_messages", size, lambda: tmb.prepare_ais_messages(messages))]
+    for processes in levels:
+        with ParallelIngest(tmb, processes=processes, writers=writers) as ingest:
+            # Starts the worker processes, so that their start-up time is not measured
+            ingest.insert_ais_messages(messages[:processes * writers])
+            if write:
+                tmb.delete_ais_messages()
+            results.append(timed("ParallelIngest, %d processes" % processes, size,
+                                 lambda: ingest.insert_ais_messages(messages)))
+    if write:
+        tmb.delete_ais_messages()
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--size', type=int, default=200000)
+    parser.add_argument('--levels', type=int, nargs='+', default=[1, 2, 4, 8, 16])
+    parser.add_argument('--writers', type=int, default=2)
+    parser.add_argument('--write', action='store_true')
+    args = parser.parse_args()
+    run(args.size, args.levels, args.writers, args.write)
@@ -0,0 +1,32 @@
+"""
+Compares opening a new connection per call against checking one out of the connection pool.
+Needs a running MySQL server configured in `connection_data.conf`.
+"""
+import argparse
+
+from MySQL_DAO import MySQLConnectionManager, MySQLCursorManager, get_connection_pool
+from benchmarks.common import time_calls, summarize, print_summary
+
+
+def select_one(pooled):
+    with MySQLConnectionManager(pooled) as con:
+        with MySQLCursorManager(con) as cursor:
+            cursor.execute("""SELECT 1;""")
+            cursor.fetchall()
+
+
+def run(iterations):
+    results = [
+        summarize("unpooled connect + SELECT 1", time_calls(lambda: select_one(False), iterations)),
+        summarize("pooled checkout + SELECT 1", time_calls(lambda: select_one(True), iterations)),
+    ]
+    for result in results:
+        print_summary(result)
+    print("pool stats:", get_connection_pool().stats)
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--iterations', type=int, default=1000)
+    run(parser.parse_args().iterations)
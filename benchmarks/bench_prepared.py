@@ -0,0 +1,46 @@
+"""
+Compares the text protocol against server-side prepared statements on the single-message insert path and on
+Queries 4 and 5. Needs a running MySQL server configured in `connection_data.conf`. The AIS tables are emptied first.
+The server's Com_stmt_prepare and Com_stmt_execute counters show how often statements were parsed.
+"""
+import argparse
+
+from MySQL_DAO import MySQL_DAO, MySQLConnectionManager, MySQLCursorManager, read_connection_config
+from benchmarks.bench_last_static import position
+from benchmarks.common import time_calls, summarize, print_summary
+
+
+def statement_counters():
+    with MySQLConnectionManager() as con:
+        with MySQLCursorManager(con, prepared=False) as cursor:
+            cursor.execute("""SHOW SESSION STATUS WHERE Variable_name IN ('Com_stmt_prepare', 'Com_stmt_execute');""")
+            return dict(cursor.fetchall())
+
+
+def run(iterations):
+    tmb = MySQL_DAO()
+    tmb.delete_ais_messages()
+    config = read_connection_config(MySQLConnectionManager.config_file)
+    results = []
+    for prepared in ('no', 'yes'):
+        config.set('SQL', 'prepared', prepared)
+        cases = [("insert_ais_message", lambda: tmb.insert_ais_message(position(200000000))),
+                 ("Query 4 select_all_recent_positions", tmb.select_all_recent_positions),
+                 ("Query 5 select_most_recent_from_mmsi", lambda: tmb.select_most_recent_from_mmsi(200000000))]
+        for name, func in cases:
+            before = statement_counters()
+            result = summarize("%s prepared=%s" % (name, prepared), time_calls(func, iterations))
+            after = statement_counters()
+            print_summary(result)
+            print("    prepares: %d, prepared executions: %d" % (
+                int(after['Com_stmt_prepare']) - int(before['Com_stmt_prepare']),
+                int(after['Com_stmt_execute']) - int(before['Com_stmt_execute'])))
+            results.append(result)
+    tmb.delete_ais_messages()
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--iterations', type=int, default=2000)
+    run(parser.parse_args().iterations)
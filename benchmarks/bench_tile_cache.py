@@ -0,0 +1,46 @@
+"""
+Compares reading and base64-encoding a tile file on every request, as Query 14 used to, against serving it from
+TileCache, with requests spread over a few hot tiles. Does not need a database.
+"""
+import argparse
+import base64
+import os
+import random
+
+from tile_store import TileCache, TILE_DIRECTORY
+from benchmarks.common import time_calls, summarize, print_summary
+
+
+def run(requests, hot_tiles):
+    paths = sorted(os.path.join(TILE_DIRECTORY, name) for name in os.listdir(TILE_DIRECTORY) if name.endswith('.png'))
+    hot = paths[:hot_tiles]
+    rng = random.Random(0)
+    pattern = [rng.randrange(len(hot)) for _ in range(requests)]
+    cache = TileCache()
+
+    def read_and_encode():
+        for index in pattern:
+            with open(hot[index], 'rb') as f:
+                base64.b64encode(f.read())
+
+    def cached():
+        for index in pattern:
+            entry = cache.get(index)
+            if entry is None:
+                entry = cache.load(index, hot[index])
+            entry.encoded
+
+    results = [summarize("read + b64encode per request", time_calls(read_and_encode, 5), requests),
+               summarize("TileCache", time_calls(cached, 5), requests)]
+    for result in results:
+        print_summary(result)
+    print(cache.get_stats())
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--hot-tiles', type=int, default=8)
+    args = parser.parse_args()
+    run(args.requests, args.hot_tiles)
@@ -0,0 +1,52 @@
+"""
+Compares ways of assigning tile ids to positions: the scalar get_tile() math, TileResolver.resolve() per point and
+TileResolver.resolve_many() over NumPy arrays. Does not need a database.
+"""
+import argparse
+import random
+import time
+
+from MySQL_DAO import MySQL_DAO
+from map_tiles import get_tile_resolver, np
+
+
+def timed(name, points, func):
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    result = {"name": name, "points": points, "seconds": elapsed, "per_second": points / elapsed if elapsed else 0.0}
+    print("{name:<40} {points:>9} points {seconds:8.3f} s {per_second:14.1f} points/s".format(**result))
+    return result
+
+
+def run(points, seed=418):
+    rng = random.Random(seed)
+    lats = [rng.uniform(54.5, 57.5) for _ in range(points)]
+    longs = [rng.uniform(7.0, 13.0) for _ in range(points)]
+    tmb = MySQL_DAO(True)
+    resolver = get_tile_resolver()
+
+    def scalar_get_tile():
+        for lat, long in zip(lats, longs):
+            for scale in (1, 2, 3):
+                tmb.get_tile(scale, long, lat)
+
+    def scalar_resolve():
+        for lat, long in zip(lats, longs):
+            resolver.resolve(lat, long)
+
+    results = [timed("get_tile() x3 per point", points, scalar_get_tile),
+               timed("TileResolver.resolve() per point", points, scalar_resolve)]
+    if np is not None:
+        lat_array, long_array = np.array(lats), np.array(longs)
+        results.append(timed("TileResolver.resolve_many()", points, lambda: resolver.resolve_many(lat_array,
+                                                                                                  long_array)))
+    else:
+        print("NumPy is not installed, skipping resolve_many()")
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--points', type=int, default=1000000)
+    run(parser.parse_args().points)
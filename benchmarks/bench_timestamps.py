@@ -0,0 +1,45 @@
+"""
+Compares dateutil.parser.isoparse() + strftime() against parse_ais_timestamp() on AIS timestamps, both with every
+timestamp distinct and with the repeated, second-granular timestamps typical of a batch. Does not need a database.
+"""
+import argparse
+import datetime
+
+import dateutil.parser
+
+from MySQL_DAO import parse_ais_timestamp
+from benchmarks.common import time_calls, summarize, print_summary
+
+
+def make_timestamps(count, distinct):
+    start = datetime.datetime(2020, 11, 18)
+    return [(start + datetime.timedelta(seconds=i % distinct)).strftime("%Y-%m-%dT%H:%M:%S.000Z")
+            for i in range(count)]
+
+
+def run(count):
+    results = []
+    for distinct in (count, 60):
+        timestamps = make_timestamps(count, distinct)
+        label = "distinct" if distinct == count else "%d distinct" % distinct
+
+        def isoparse():
+            for value in timestamps:
+                dateutil.parser.isoparse(value).strftime("%Y-%m-%d %H:%M:%S")
+
+        def fast_path():
+            parse_ais_timestamp.cache_clear()
+            for value in timestamps:
+                parse_ais_timestamp(value)
+
+        results.append(summarize("isoparse + strftime, " + label, time_calls(isoparse, 5), count))
+        results.append(summarize("parse_ais_timestamp, " + label, time_calls(fast_path, 5), count))
+    for result in results:
+        print_summary(result)
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--count', type=int, default=100000)
+    run(parser.parse_args().count)
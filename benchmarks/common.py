@@ -0,0 +1,77 @@
+"""
+Timing helpers shared by the benchmarks.
+"""
+import time
+
+
+def time_calls(func, iterations):
+    """
+    Calls a function repeatedly and records how long each call took.
+
+    :param func: The function to call, without arguments
+    :type func: callable
+    :param iterations: How many times to call it
+    :type iterations: int
+    :return: The duration of every call, in seconds
+    :rtype: list
+    """
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def percentile(samples, pct):
+    """
+    Nearest-rank percentile of a list of samples.
+
+    :param samples: The samples
+    :type samples: list
+    :param pct: The percentile, from 0 to 100
+    :type pct: float
+    :return: The sample at that percentile
+    :rtype: float
+    """
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[rank]
+
+
+def summarize(name, samples, units=1):
+    """
+    Summarizes a list of call durations.
+
+    :param name: The name of the benchmark case
+    :type name: str
+    :param samples: The duration of every call, in seconds
+    :type samples: list
+    :param units: Optional, how many units of work (e.g. messages) each call processed
+    :type units: int
+    :return: object {'name': ..., 'calls': ..., 'per_second': ..., 'p50_ms': ..., } describing the run
+    :rtype: dict
+    """
+    total = sum(samples)
+    return {
+        "name": name,
+        "calls": len(samples),
+        "total_s": total,
+        "per_second": (len(samples) * units / total) if total > 0 else 0.0,
+        "p50_ms": percentile(samples, 50) * 1000,
+        "p95_ms": percentile(samples, 95) * 1000,
+        "p99_ms": percentile(samples, 99) * 1000,
+    }
+
+
+def print_summary(summary):
+    """
+    Prints a summary made by summarize() on one line.
+
+    :param summary: The summary
+    :type summary: dict
+    """
+    print("{name:<40} {calls:>8} calls {per_second:>12.1f}/s  p50 {p50_ms:8.3f} ms  p95 {p95_ms:8.3f} ms  "
+          "p99 {p99_ms:8.3f} ms".format(**summary))
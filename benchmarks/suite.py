@@ -0,0 +1,201 @@
+"""
+Runs every DAO benchmark case in one go and writes the results as JSON, so that runs of different versions can be
+compared. The cases cover the ingest path (Query 1 in batches, Query 2 message by message), Queries 3 to 14 and
+tile serving, on a synthetic data set of the given size.
+Needs a running MySQL server configured in `connection_data.conf`, or the SQLite backend; the AIS tables are emptied
+before and after the run. With --config, another config file is used, e.g. one with "backend = sqlite" to measure
+the SQLite backend. With --stub, the cases run against the stub DAO instead, which only checks the suite itself.
+
+Examples, from the base project directory:
+`python -m benchmarks.suite --messages 100000 --output results.json`
+`python -m benchmarks.suite --compare results.json`
+`python -m benchmarks.suite --config sqlite.conf --output sqlite.json --compare results.json`
+"""
+import argparse
+import datetime
+import json
+import platform
+import random
+import subprocess
+
+from MySQL_DAO import MySQL_DAO, MySQLConnectionManager, read_connection_config, get_backend
+from benchmarks.common import time_calls, summarize, print_summary
+
+PORT_ID = 381
+PORT_NAME = 'Nyborg'
+COUNTRY = 'Denmark'
+TILE_ID = 5036
+
+
+def make_messages(count, vessels, seed=418):
+    """
+    Makes synthetic AIS messages: position reports spread over the map, and one static data message in five,
+    half of them headed to PORT_ID.
+
+    :param count: The number of messages
+    :type count: int
+    :param vessels: The number of distinct vessels
+    :type vessels: int
+    :param seed: Optional, the random seed, so that every run uses the same messages
+    :type seed: int
+    :return: The message dictionaries, in timestamp order
+    :rtype: list
+    """
+    rng = random.Random(seed)
+    start = datetime.datetime(2020, 11, 18)
+    messages = []
+    for i in range(count):
+        mmsi = 200000000 + rng.randrange(vessels)
+        timestamp = (start + datetime.timedelta(seconds=i // 10)).strftime("%Y-%m-%dT%H:%M:%S.000Z")
+        if i % 5 == 0:
+            msg = {"Timestamp": timestamp, "Class": "Class A", "MMSI": mmsi, "MsgType": "static_data",
+                   "IMO": "Unknown", "Name": "VESSEL %d" % mmsi, "VesselType": "Cargo", "Length": 100,
+                   "Breadth": 20}
+            if mmsi % 2 == 0:
+                msg.update({"Destination": PORT_NAME, "DestinationId": PORT_ID})
+            messages.append(msg)
+        else:
+            messages.append({"Timestamp": timestamp, "Class": "Class A", "MMSI": mmsi,
+                             "MsgType": "position_report",
+                             "Position": {"type": "Point",
+                                          "coordinates": [rng.uniform(54.5, 57.5), rng.uniform(7.0, 13.0)]},
+                             "Status": "Under way using engine", "RoT": 0, "SoG": 10.0, "CoG": 90.0, "Heading": 90})
+    return messages
+
+
+def get_version():
+    """
+    Names the version of the code being measured.
+
+    :return: The output of `git describe --always --dirty`, or None outside a git checkout
+    :rtype: str
+    """
+    try:
+        return subprocess.check_output(['git', 'describe', '--always', '--dirty'],
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def query_cases(tmb, mmsi):
+    """
+    Lists the read-only cases, Queries 4 to 14.
+
+    :param tmb: The DAO
+    :type tmb: MySQL_DAO
+    :param mmsi: A vessel present in the data set
+    :type mmsi: int
+    :return: List of (name, function) tuples
+    :rtype: list
+    """
+    return [
+        ("Q4 select_all_recent_positions", tmb.select_all_recent_positions),
+        ("Q5 select_most_recent_from_mmsi", lambda: tmb.select_most_recent_from_mmsi(mmsi)),
+        ("Q6 read_vessel_information", lambda: tmb.read_vessel_information(mmsi)),
+        ("Q7 select_all_recent_in_tile", lambda: tmb.select_all_recent_in_tile(TILE_ID)),
+        ("Q8 read_all_matching_ports", lambda: tmb.read_all_matching_ports(PORT_NAME, COUNTRY)),
+        ("Q9 read_ship_pos_in_ts3_given_port", lambda: tmb.read_ship_pos_in_ts3_given_port(PORT_NAME, COUNTRY)),
+        ("Q10 select_most_recent_5_ship_positions", lambda: tmb.select_most_recent_5_ship_positions(mmsi)),
+        ("Q11 recent_ships_positions_headed_to_given_portId",
+         lambda: tmb.recent_ships_positions_headed_to_given_portId(PORT_ID)),
+        ("Q12 recent_ships_positions_headed_to_given_port",
+         lambda: tmb.recent_ships_positions_headed_to_given_port(PORT_NAME, COUNTRY)),
+        ("Q13 given_tile_find_contained_tiles", lambda: tmb.given_tile_find_contained_tiles(TILE_ID)),
+        ("Q14 given_tile_id_get_tile", lambda: tmb.given_tile_id_get_tile(TILE_ID)),
+        ("Q14 given_tile_id_get_tile_raw", lambda: tmb.given_tile_id_get_tile_raw(TILE_ID)),
+    ]
+
+
+def run(messages, vessels, batch_size, iterations, stub=False):
+    """
+    Runs every case.
+
+    :param messages: The number of messages loaded with Query 1
+    :type messages: int
+    :param vessels: The number of distinct vessels in the messages
+    :type vessels: int
+    :param batch_size: The number of messages per insert_ais_batch call
+    :type batch_size: int
+    :param iterations: The number of calls of each single-message and query case
+    :type iterations: int
+    :param stub: Optional, whether to run against the stub DAO
+    :type stub: bool
+    :return: Object {'version': ..., 'started': ..., 'parameters': {...}, 'results': [...]}, with one summary
+        as made by benchmarks.common.summarize() per case
+    :rtype: dict
+    """
+    tmb = MySQL_DAO(stub)
+    data = make_messages(messages, vessels)
+    batches = [json.dumps(data[start:start + batch_size]) for start in range(0, len(data), batch_size)]
+    singles = make_messages(iterations, vessels, seed=419)
+    report = {
+        "version": get_version(),
+        "started": datetime.datetime.now().isoformat(timespec='seconds'),
+        "python": platform.python_version(),
+        "parameters": {"messages": messages, "vessels": vessels, "batch_size": batch_size,
+                       "iterations": iterations, "stub": stub,
+                       "backend": get_backend(read_connection_config(MySQLConnectionManager.config_file))},
+        "results": [],
+    }
+
+    def record(result):
+        print_summary(result)
+        report['results'].append(result)
+
+    tmb.delete_ais_messages()
+    remaining = iter(batches)
+    record(summarize("Q1 insert_ais_batch", time_calls(lambda: tmb.insert_ais_batch(next(remaining)),
+                                                       len(batches)), batch_size))
+    remaining = iter(singles)
+    record(summarize("Q2 insert_ais_message", time_calls(lambda: tmb.insert_ais_message(next(remaining)),
+                                                         iterations)))
+    for name, func in query_cases(tmb, data[0]['MMSI']):
+        func()
+        record(summarize(name, time_calls(func, iterations)))
+    # Every message is far older than the retention window, so this expires the whole data set
+    record(summarize("Q3 delete_old_ais_messages", time_calls(tmb.delete_old_ais_messages, 1),
+                     messages + iterations))
+    tmb.delete_ais_messages()
+    return report
+
+
+def compare(baseline, report):
+    """
+    Prints the change in throughput and p95 latency of every case since a baseline run.
+
+    :param baseline: An earlier report made by run()
+    :type baseline: dict
+    :param report: The current report
+    :type report: dict
+    """
+    previous = {result['name']: result for result in baseline['results']}
+    print("compared with %s (%s)" % (baseline.get('version'), baseline.get('started')))
+    for result in report['results']:
+        old = previous.get(result['name'])
+        if old is None or old['per_second'] == 0 or old['p95_ms'] == 0:
+            continue
+        print("{:<50} throughput {:+7.1f}%  p95 {:+7.1f}%".format(
+            result['name'], (result['per_second'] / old['per_second'] - 1) * 100,
+            (result['p95_ms'] / old['p95_ms'] - 1) * 100))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--messages', type=int, default=10000)
+    parser.add_argument('--vessels', type=int, default=1000)
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--stub', action='store_true')
+    parser.add_argument('--config', help="the connection config to use instead of connection_data.conf")
+    parser.add_argument('--output', help="write the results to this JSON file")
+    parser.add_argument('--compare', help="a JSON file written by an earlier run to compare with")
+    args = parser.parse_args()
+    if args.config:
+        MySQLConnectionManager.config_file = args.config
+    results = run(args.messages, args.vessels, args.batch_size, args.iterations, args.stub)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), results)
@@ -0,0 +1,447 @@
+import bisect
+import contextlib
+import datetime
+import functools
+import json
+import re
+import threading
+import time
+import types
+
+# Upper bounds of the histogram buckets, in milliseconds; the last bucket holds everything slower
+BUCKETS_MS = [0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000]
+
+_WHITESPACE = re.compile(r'\s+')
+_IN_LIST = re.compile(r'\bIN\s*\(\s*%s\s*(,\s*%s\s*)*\)', re.IGNORECASE)
+
+
+def normalize_statement(operation):
+    """
+    Turns the SQL text of a statement into the key its timings are recorded under: whitespace is collapsed and
+    IN lists of any length are written as (...), so that the chunks of one query share a key.
+
+    :param operation: The SQL text
+    :type operation: str
+    :return: The normalized text
+    :rtype: str
+    """
+    return _IN_LIST.sub('IN (...)', _WHITESPACE.sub(' ', operation).strip())
+
+
+class Histogram:
+    """
+    Class Histogram
+    Counts durations in fixed buckets, from which percentiles are estimated to within a bucket.
+    """
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def add(self, ms):
+        """
+        Records a duration.
+
+        :param ms: The duration in milliseconds
+        :type ms: float
+        """
+        self.counts[bisect.bisect_left(BUCKETS_MS, ms)] += 1
+        self.count += 1
+        self.total_ms += ms
+        if ms > self.max_ms:
+            self.max_ms = ms
+
+    def percentile(self, pct):
+        """
+        Estimates a percentile as the upper bound of the bucket it falls in.
+
+        :param pct: The percentile, from 0 to 100
+        :type pct: float
+        :return: The estimate in milliseconds, the largest duration seen for the last bucket, or 0 if empty
+        :rtype: float
+        """
+        if self.count == 0:
+            return 0.0
+        rank = pct / 100.0 * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count > 0:
+                return min(BUCKETS_MS[index], self.max_ms) if index < len(BUCKETS_MS) else self.max_ms
+        return self.max_ms
+
+    def summary(self):
+        """
+        Summarizes the histogram.
+
+        :return: Object {'count': ..., 'total_ms': ..., 'mean_ms': ..., 'max_ms': ..., 'p50_ms': ..., 'p95_ms': ...,
+            'p99_ms': ..., 'buckets': [...]}
+        :rtype: dict
+        """
+        return {
+            "count": self.count,
+            "total_ms": self.total_ms,
+            "mean_ms": self.total_ms / self.count if self.count else 0.0,
+            "max_ms": self.max_ms,
+            "p50_ms": self.percentile(50),
+            "p95_ms": self.percentile(95),
+            "p99_ms": self.percentile(99),
+            "buckets": list(self.counts),
+        }
+
+
+class _Record:
+
+    def __init__(self):
+        self.histogram = Histogram()
+        self.db_ms = 0.0
+        self.rows = 0
+        self.round_trips = 0
+        self.errors = 0
+
+    def summary(self):
+        summary = self.histogram.summary()
+        summary.update({"db_ms": self.db_ms, "rows": self.rows, "round_trips": self.round_trips,
+                        "errors": self.errors})
+        return summary
+
+
+class _Frame:
+    __slots__ = ('db_ms', 'rows', 'round_trips')
+
+    def __init__(self):
+        self.db_ms = 0.0
+        self.rows = 0
+        self.round_trips = 0
+
+
+class Instrumentation:
+    """
+    Class Instrumentation
+    Records the wall time, database time, rows and round trips of every DAO method call and every SQL statement in
+    in-process histograms, and writes the calls slower than a threshold to a slow query log as JSON lines.
+    A method's database time, rows and round trips include those of the methods it calls.
+    While disabled, the DAO methods are left as they are and cursors are not wrapped, so nothing is measured and
+    nothing is paid for. Statements and connections can still be counted with counting(), e.g. by tests.
+
+    :param slow_query_ms: Optional, calls taking at least this many milliseconds are logged, none if None
+    :type slow_query_ms: float
+    :param slow_query_log: Optional, path of the slow query log
+    :type slow_query_log: str
+    """
+
+    def __init__(self, slow_query_ms=None, slow_query_log='slow_queries.log'):
+        self.enabled = False
+        self.slow_query_ms = slow_query_ms
+        self.slow_query_log = slow_query_log
+        self.methods = {}
+        self.statements = {}
+        self._lock = threading.Lock()
+        self._log_lock = threading.Lock()
+        self._local = threading.local()
+        self._originals = {}
+        self._counters = []
+
+    def enable(self, cls):
+        """
+        Starts measuring, wrapping every public method of a DAO class.
+
+        :param cls: The DAO class, e.g. MySQL_DAO
+        :type cls: type
+        """
+        with self._lock:
+            if cls not in self._originals:
+                originals = {}
+                for name, method in list(vars(cls).items()):
+                    if not name.startswith('_') and isinstance(method, types.FunctionType):
+                        originals[name] = method
+                        setattr(cls, name, self._wrap(cls.__name__ + '.' + name, method))
+                self._originals[cls] = originals
+            self.enabled = True
+
+    def disable(self):
+        """
+        Stops measuring and puts back the original DAO methods. The recorded stats are kept.
+        """
+        with self._lock:
+            self.enabled = False
+            for cls, originals in self._originals.items():
+                for name, method in originals.items():
+                    setattr(cls, name, method)
+            self._originals = {}
+
+    def _stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _wrap(self, name, method):
+        @functools.wraps(method)
+        def call(*args, **kwargs):
+            stack = self._stack()
+            frame = _Frame()
+            stack.append(frame)
+            start = time.perf_counter()
+            failed = False
+            try:
+                return method(*args, **kwargs)
+            except Exception:
+                failed = True
+                raise
+            finally:
+                ms = (time.perf_counter() - start) * 1000
+                stack.pop()
+                if stack:
+                    parent = stack[-1]
+                    parent.db_ms += frame.db_ms
+                    parent.rows += frame.rows
+                    parent.round_trips += frame.round_trips
+                self._record(self.methods, name, ms, frame.db_ms, frame.rows, frame.round_trips, failed)
+                self._log('method', name, ms, frame.db_ms, frame.rows, frame.round_trips)
+        return call
+
+    def record_statement(self, operation, ms, rows, round_trips=1, failed=False):
+        """
+        Records one SQL statement, adding it to the method calls in progress on this thread.
+
+        :param operation: The SQL text
+        :type operation: str
+        :param ms: The time the statement took, in milliseconds
+        :type ms: float
+        :param rows: The number of rows returned or changed
+        :type rows: int
+        :param round_trips: Optional, the number of round trips to the server
+        :type round_trips: int
+        :param failed: Optional, whether the statement raised an error
+        :type failed: bool
+        """
+        stack = self._stack()
+        if stack:
+            frame = stack[-1]
+            frame.db_ms += ms
+            frame.rows += rows
+            frame.round_trips += round_trips
+        key = normalize_statement(operation)
+        for counter in self._counters:
+            counter.add_statement(key)
+        if self.enabled:
+            self._record(self.statements, key, ms, ms, rows, round_trips, failed)
+            self._log('statement', key, ms, ms, rows, round_trips)
+
+    def record_connection(self, created):
+        """
+        Records the checkout of a connection, for the query counters in progress.
+
+        :param created: Whether a new connection was opened for it
+        :type created: bool
+        """
+        for counter in self._counters:
+            counter.add_connection(created)
+
+    @contextlib.contextmanager
+    def counting(self):
+        """
+        Counts the statements run and the connections checked out, on every thread, until the block ends. Cursors
+        made inside the block are wrapped even while the instrumentation is disabled.
+
+        :return: A context manager giving the counter
+        :rtype: QueryCounter
+        """
+        counter = QueryCounter()
+        with self._lock:
+            self._counters = self._counters + [counter]
+        try:
+            yield counter
+        finally:
+            with self._lock:
+                self._counters = [other for other in self._counters if other is not counter]
+
+    def _record(self, records, name, ms, db_ms, rows, round_trips, failed):
+        with self._lock:
+            record = records.get(name)
+            if record is None:
+                record = records[name] = _Record()
+            record.histogram.add(ms)
+            record.db_ms += db_ms
+            record.rows += rows
+            record.round_trips += round_trips
+            if failed:
+                record.errors += 1
+
+    def _log(self, kind, name, ms, db_ms, rows, round_trips):
+        if self.slow_query_ms is None or ms < self.slow_query_ms:
+            return
+        line = json.dumps({"time": datetime.datetime.now().isoformat(timespec='milliseconds'), "kind": kind,
+                           "name": name, "ms": round(ms, 3), "db_ms": round(db_ms, 3), "rows": rows,
+                           "round_trips": round_trips})
+        with self._log_lock:
+            with open(self.slow_query_log, 'a') as f:
+                f.write(line + '\n')
+
+    def cursor(self, cursor):
+        """
+        Wraps a cursor so that its statements are recorded, if measuring or counting.
+
+        :param cursor: A cursor
+        :type cursor: PreparedCursor or mysql.connector.cursor.MySQLCursorBuffered
+        :return: The cursor, wrapped only if enabled or counting
+        :rtype: InstrumentedCursor or PreparedCursor or mysql.connector.cursor.MySQLCursorBuffered
+        """
+        return InstrumentedCursor(cursor, self) if self.enabled or self._counters else cursor
+
+    def get_stats(self):
+        """
+        Returns a summary of every method and statement measured so far.
+
+        :return: Object {'methods': {name: {'count': ..., 'p95_ms': ..., 'db_ms': ..., 'rows': ...,
+            'round_trips': ..., 'errors': ..., }, ...}, 'statements': {...}}
+        :rtype: dict
+        """
+        with self._lock:
+            return {"methods": {name: record.summary() for name, record in self.methods.items()},
+                    "statements": {name: record.summary() for name, record in self.statements.items()}}
+
+    def reset(self):
+        """
+        Forgets everything measured so far.
+        """
+        with self._lock:
+            self.methods = {}
+            self.statements = {}
+
+
+class QueryCounter:
+    """
+    Class QueryCounter
+    The statements run and the connections checked out during a block of code, see count_queries(). Nested
+    checkouts of the connection a thread already holds are not counted, as they cost nothing.
+    """
+
+    def __init__(self):
+        self.statements = []
+        self.connections = 0
+        self.created = 0
+        self._lock = threading.Lock()
+
+    def add_statement(self, key):
+        """
+        Records a statement.
+
+        :param key: The normalized SQL text, see normalize_statement()
+        :type key: str
+        """
+        with self._lock:
+            self.statements.append(key)
+
+    def add_connection(self, created):
+        """
+        Records a connection checkout.
+
+        :param created: Whether a new connection was opened for it
+        :type created: bool
+        """
+        with self._lock:
+            self.connections += 1
+            if created:
+                self.created += 1
+
+    def __len__(self):
+        return len(self.statements)
+
+    def report(self):
+        """
+        Describes what was counted, one line per distinct statement, for test failure messages.
+
+        :return: The description
+        :rtype: str
+        """
+        counts = {}
+        for key in self.statements:
+            counts[key] = counts.get(key, 0) + 1
+        lines = ["%d statements, %d connections (%d new)" % (len(self.statements), self.connections, self.created)]
+        lines.extend("%5d x %s" % (count, key) for key, count in counts.items())
+        return "\n".join(lines)
+
+
+class InstrumentedCursor:
+    """
+    Class InstrumentedCursor
+    Passes statements on to a cursor, recording how long each took and how many rows it returned or changed.
+    The cursors of the DAO read the whole result on execute, so the time includes fetching the rows.
+
+    :param cursor: The cursor
+    :type cursor: PreparedCursor or mysql.connector.cursor.MySQLCursorBuffered
+    :param instrumentation: Where to record the statements
+    :type instrumentation: Instrumentation
+    """
+
+    def __init__(self, cursor, instrumentation):
+        self._cursor = cursor
+        self._instrumentation = instrumentation
+
+    def _timed(self, func, operation, params):
+        start = time.perf_counter()
+        try:
+            result = func(operation, params)
+        except Exception:
+            self._instrumentation.record_statement(operation, (time.perf_counter() - start) * 1000, 0, failed=True)
+            raise
+        self._instrumentation.record_statement(operation, (time.perf_counter() - start) * 1000,
+                                               max(self._cursor.rowcount, 0))
+        return result
+
+    def execute(self, operation, params=None):
+        return self._timed(self._cursor.execute, operation, params)
+
+    def executemany(self, operation, seq_params):
+        return self._timed(self._cursor.executemany, operation, seq_params)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+_instrumentation = Instrumentation()
+
+
+def get_instrumentation():
+    """
+    Returns the process-wide instrumentation.
+
+    :return: The instrumentation
+    :rtype: Instrumentation
+    """
+    return _instrumentation
+
+
+def count_queries():
+    """
+    Counts the statements run and the connections checked out by the DAO until the block ends, e.g.
+    `with count_queries() as queries: dao.select_all_recent_positions()`, then `len(queries)`.
+
+    :return: A context manager giving the counter
+    :rtype: QueryCounter
+    """
+    return _instrumentation.counting()
+
+
+def configure_instrumentation(cls, config):
+    """
+    Sets up the process-wide instrumentation from the [INSTRUMENTATION] section of the connection config, enabling it
+    for a DAO class if asked to.
+
+    :param cls: The DAO class
+    :type cls: type
+    :param config: The parsed connection config
+    :type config: configparser.ConfigParser
+    :return: The instrumentation
+    :rtype: Instrumentation
+    """
+    slow_query_ms = config.getfloat('INSTRUMENTATION', 'slow_query_ms', fallback=0.0)
+    _instrumentation.slow_query_ms = slow_query_ms if slow_query_ms > 0 else None
+    _instrumentation.slow_query_log = config.get('INSTRUMENTATION', 'slow_query_log', fallback='slow_queries.log')
+    if config.getboolean('INSTRUMENTATION', 'enabled', fallback=False):
+        _instrumentation.enable(cls)
+    return _instrumentation
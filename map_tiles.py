@@ -0,0 +1,308 @@
+import json
+import math
+import os
+import threading
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+MAP_VIEW_FILE = os.path.abspath(os.path.join(os.path.dirname(__file__), 'data', 'denmark_tiles', 'MAP_VIEW.json'))
+
+_map_view = None
+_tile_resolver = None
+_load_lock = threading.Lock()
+
+
+def load_map_view(path=MAP_VIEW_FILE):
+    """
+    Reads the MAP_VIEW tiles from their JSON mirror, which holds one JSON object per line.
+
+    :param path: Optional, path of the JSON file
+    :type path: str
+    :return: List of tile objects {'id': ..., 'ICESName': ..., 'west': ..., } as found in the file
+    :rtype: list
+    """
+    tiles = []
+    with open(path, 'r') as f:
+        for line in f:
+            if line.strip():
+                tiles.append(json.loads(line))
+    return tiles
+
+
+def get_map_view():
+    """
+    Returns the MAP_VIEW tiles, loading them on first use only.
+
+    :return: List of tile objects as returned by load_map_view()
+    :rtype: list
+    """
+    global _map_view
+    if _map_view is None:
+        with _load_lock:
+            if _map_view is None:
+                _map_view = load_map_view()
+    return _map_view
+
+
+class TileResolver:
+    """
+    Class TileResolver
+    Finds the MapView1/2/3 ids of a position with arithmetic on the tile grid instead of querying MAP_VIEW.
+    A position gets the same ids as matching the boundaries from MySQL_DAO.get_tile() against MAP_VIEW, so a
+    position lying on a tile edge gets no tile at scales 2 and 3.
+
+    :param tiles: The MAP_VIEW tiles, as returned by load_map_view()
+    :type tiles: list
+    """
+    SOUTH, NORTH, WEST, EAST = (54.5, 57.5, 7.0, 13.0)
+    vectorize_threshold = 64
+
+    def __init__(self, tiles):
+        self.root_id = None
+        # Scale 2 tiles are 1 degree of longitude by 0.5 degrees of latitude, scale 3 tiles half of that each way,
+        # so a tile is found by the (row, column) of its south-west corner in units of its own size.
+        self.scale2 = {}
+        self.scale3 = {}
+        for tile in tiles:
+            if tile['scale'] == 1:
+                if (tile['west'], tile['east'], tile['north'], tile['south']) == \
+                        (self.WEST, self.EAST, self.NORTH, self.SOUTH):
+                    self.root_id = tile['id']
+            elif tile['scale'] == 2:
+                self.scale2[(round(tile['south'] * 2), round(tile['west']))] = tile['id']
+            elif tile['scale'] == 3:
+                self.scale3[(round(tile['south'] * 4), round(tile['west'] * 2))] = tile['id']
+        self._grids = None
+
+    @staticmethod
+    def _cell(grid, y, x):
+        row, col = math.floor(y), math.floor(x)
+        if row == math.ceil(y) or col == math.ceil(x):
+            return None
+        return grid.get((row, col))
+
+    def resolve(self, lat, long):
+        """
+        Finds the tile ids containing a position at each scale.
+
+        :param lat: latitude
+        :type lat: float
+        :param long: longitude
+        :type long: float
+        :return: The MapView1, MapView2 and MapView3 ids, each None if no tile contains the position
+        :rtype: tuple
+        """
+        return (self.root_id,
+                self._cell(self.scale2, lat * 2, long),
+                self._cell(self.scale3, lat * 4, long * 2))
+
+    def _build_grids(self):
+        grids = []
+        for cells in (self.scale2, self.scale3):
+            if cells:
+                rows = [cell[0] for cell in cells]
+                cols = [cell[1] for cell in cells]
+                row0, col0 = min(rows), min(cols)
+                table = np.full((max(rows) - row0 + 1, max(cols) - col0 + 1), -1, dtype=np.int64)
+                for (row, col), tile_id in cells.items():
+                    table[row - row0, col - col0] = tile_id
+            else:
+                table, row0, col0 = np.full((0, 0), -1, dtype=np.int64), 0, 0
+            grids.append((table, row0, col0))
+        self._grids = grids
+
+    @staticmethod
+    def _cells_many(grid, y, x):
+        table, row0, col0 = grid
+        rows = np.floor(y)
+        cols = np.floor(x)
+        valid = np.isfinite(y) & np.isfinite(x) & (rows != np.ceil(y)) & (cols != np.ceil(x))
+        rows = rows - row0
+        cols = cols - col0
+        valid &= (rows >= 0) & (rows < table.shape[0]) & (cols >= 0) & (cols < table.shape[1])
+        ids = np.full(y.shape, -1, dtype=np.int64)
+        ids[valid] = table[rows[valid].astype(np.intp), cols[valid].astype(np.intp)]
+        return ids
+
+    def resolve_many(self, lats, longs):
+        """
+        Finds the tile ids of many positions at every scale in one NumPy pass.
+
+        :param lats: latitudes
+        :type lats: numpy.ndarray
+        :param longs: longitudes, in the same order as the latitudes
+        :type longs: numpy.ndarray
+        :raises [ImportError]: If NumPy is not installed
+        :return: Three int64 arrays of MapView1, MapView2 and MapView3 ids, with -1 where no tile contains the position
+        :rtype: tuple
+        """
+        if np is None:
+            raise ImportError("TileResolver.resolve_many needs NumPy")
+        if self._grids is None:
+            self._build_grids()
+        lats = np.asarray(lats, dtype=np.float64)
+        longs = np.asarray(longs, dtype=np.float64)
+        root = np.full(lats.shape, -1 if self.root_id is None else self.root_id, dtype=np.int64)
+        return (root,
+                self._cells_many(self._grids[0], lats * 2, longs),
+                self._cells_many(self._grids[1], lats * 4, longs * 2))
+
+    def resolve_all(self, lats, longs):
+        """
+        Finds the tile ids of a list of positions, using resolve_many() when NumPy is installed.
+
+        :param lats: latitudes
+        :type lats: list
+        :param longs: longitudes, in the same order as the latitudes
+        :type longs: list
+        :return: List of (MapView1, MapView2, MapView3) tuples like resolve() returns, one per position
+        :rtype: list
+        """
+        if np is None or len(lats) < self.vectorize_threshold:
+            return [self.resolve(lat, long) for lat, long in zip(lats, longs)]
+        columns = [[None if tile_id == -1 else tile_id for tile_id in ids.tolist()]
+                   for ids in self.resolve_many(lats, longs)]
+        return list(zip(*columns))
+
+
+def get_tile_resolver():
+    """
+    Returns the process-wide tile resolver, built from MAP_VIEW on first use.
+
+    :return: The tile resolver
+    :rtype: TileResolver
+    """
+    global _tile_resolver
+    if _tile_resolver is None:
+        resolver = TileResolver(get_map_view())
+        with _load_lock:
+            if _tile_resolver is None:
+                _tile_resolver = resolver
+    return _tile_resolver
+
+
+class TileTree:
+    """
+    Class TileTree
+    The MAP_VIEW tile hierarchy held in memory, answering children, parent, scale and bounds lookups with no query.
+    Tiles are kept as MAP_VIEW rows, in the column order of the table, so they can be turned into tile documents
+    like rows read from the database.
+
+    :param rows: The MAP_VIEW rows, as returned by SELECT * FROM MAP_VIEW
+    :type rows: list
+    """
+    ID, NAME, WEST, SOUTH, EAST, NORTH, SCALE, RASTER_FILE = range(8)
+    CONTAINER = 14
+
+    def __init__(self, rows):
+        self.tiles = {}
+        self._children = {}
+        for row in sorted(rows, key=lambda r: r[self.ID]):
+            self.tiles[row[self.ID]] = tuple(row)
+            if row[self.CONTAINER] is not None:
+                self._children.setdefault(row[self.CONTAINER], []).append(tuple(row))
+
+    @classmethod
+    def from_map_view(cls, tiles):
+        """
+        Builds a tree from the MAP_VIEW JSON mirror, where a tile with no container or name has -1 instead.
+
+        :param tiles: The MAP_VIEW tiles, as returned by load_map_view()
+        :type tiles: list
+        :return: The tile tree
+        :rtype: TileTree
+        """
+        rows = []
+        for tile in tiles:
+            rows.append((tile['id'], None if tile['ICESName'] == '-1' else tile['ICESName'], tile['west'],
+                         tile['south'], tile['east'], tile['north'], str(tile['scale']), tile['filename'],
+                         tile['image_width'], tile['image_height'], tile['image_west'], tile['image_south'],
+                         tile['image_east'], tile['image_north'],
+                         None if tile['contained_by'] == -1 else tile['contained_by']))
+        return cls(rows)
+
+    def __len__(self):
+        return len(self.tiles)
+
+    def get(self, tile_id):
+        """
+        Finds a tile by its id.
+
+        :param tile_id: The Id of a map tile
+        :type tile_id: int or str
+        :return: The MAP_VIEW row of the tile, or None if there is no such tile
+        :rtype: tuple
+        """
+        try:
+            return self.tiles.get(int(tile_id))
+        except (TypeError, ValueError):
+            return None
+
+    def children(self, tile_id):
+        """
+        Lists the tiles a tile contains, in order of id.
+
+        :param tile_id: The Id of a map tile
+        :type tile_id: int or str
+        :return: The MAP_VIEW rows of the contained tiles, empty if there are none or no such tile
+        :rtype: list
+        """
+        tile = self.get(tile_id)
+        if tile is None:
+            return []
+        return list(self._children.get(tile[self.ID], []))
+
+    def parent(self, tile_id):
+        """
+        Finds the tile containing a tile.
+
+        :param tile_id: The Id of a map tile
+        :type tile_id: int or str
+        :return: The MAP_VIEW row of the containing tile, or None for a tile with no container or no such tile
+        :rtype: tuple
+        """
+        tile = self.get(tile_id)
+        if tile is None or tile[self.CONTAINER] is None:
+            return None
+        return self.tiles.get(tile[self.CONTAINER])
+
+    def scale(self, tile_id):
+        """
+        Finds the scale of a tile.
+
+        :param tile_id: The Id of a map tile
+        :type tile_id: int or str
+        :return: 1, 2 or 3, or None if there is no such tile
+        :rtype: int
+        """
+        tile = self.get(tile_id)
+        return None if tile is None else int(tile[self.SCALE])
+
+    def bounds(self, tile_id):
+        """
+        Finds the boundaries of a tile.
+
+        :param tile_id: The Id of a map tile
+        :type tile_id: int or str
+        :return: The west, south, east and north boundaries, or None if there is no such tile
+        :rtype: tuple
+        """
+        tile = self.get(tile_id)
+        if tile is None:
+            return None
+        return tuple(float(tile[i]) for i in (self.WEST, self.SOUTH, self.EAST, self.NORTH))
+
+    def raster_file(self, tile_id):
+        """
+        Finds the image file of a tile.
+
+        :param tile_id: The Id of a map tile
+        :type tile_id: int or str
+        :return: The file name, or None if there is no such tile
+        :rtype: str
+        """
+        tile = self.get(tile_id)
+        return None if tile is None else tile[self.RASTER_FILE]
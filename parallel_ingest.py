@@ -0,0 +1,223 @@
+import concurrent.futures
+import json
+import multiprocessing
+import queue
+import threading
+
+from ais_stream import iter_ais_messages, AISStreamError
+from MySQL_DAO import MySQL_DAO, MySQLConnectionManager, read_connection_config
+
+_STOP = object()
+
+
+def shard_of(msg, shards):
+    """
+    Picks the shard of a message from its MMSI, so that all messages of a vessel go to the same shard.
+
+    :param msg: A message dictionary
+    :type msg: dict
+    :param shards: The number of shards
+    :type shards: int
+    :return: The shard number, from 0 to shards - 1
+    :rtype: int
+    """
+    try:
+        return int(msg.get('MMSI')) % shards
+    except (TypeError, ValueError):
+        return 0
+
+
+def shard_messages(messages, shards):
+    """
+    Splits messages by MMSI, keeping their order within each shard.
+
+    :param messages: A list of message dictionaries
+    :type messages: list
+    :param shards: The number of shards
+    :type shards: int
+    :return: One list of messages per shard
+    :rtype: list
+    """
+    sharded = [[] for _ in range(shards)]
+    for msg in messages:
+        sharded[shard_of(msg, shards)].append(msg)
+    return sharded
+
+
+def prepare_shard(messages):
+    """
+    Formats a list of messages in a worker process, see MySQL_DAO.prepare_ais_messages().
+
+    :param messages: A list of message dictionaries
+    :type messages: list
+    :return: The prepared messages
+    :rtype: list
+    """
+    return MySQL_DAO(True).prepare_ais_messages(messages)
+
+
+class ParallelIngest:
+    """
+    Class ParallelIngest
+    Inserts AIS messages with the formatting spread over a pool of processes. Messages are sharded by MMSI between a
+    few writer threads; each chunk of a shard is formatted by a worker process and then written by the shard's writer
+    in one transaction, in the order the messages came in. A vessel's messages therefore always go through the same
+    writer, in order, and the writers never update the same vessel rows.
+
+    :param dao: Optional, the DAO to write with, a new one by default
+    :type dao: MySQL_DAO
+    :param processes: Optional, the number of worker processes, the number of CPUs by default
+    :type processes: int
+    :param writers: Optional, the number of writer threads, each using one pooled connection
+    :type writers: int
+    :param chunk_size: Optional, the number of messages read before they are sharded and sent to the workers, the
+        DAO's bulk_chunk_size by default
+    :type chunk_size: int
+    :param backlog: Optional, the number of chunks per writer that may wait to be written before reading stops, by
+        default enough to keep every worker process busy twice over
+    :type backlog: int
+    """
+
+    def __init__(self, dao=None, processes=None, writers=2, chunk_size=None, backlog=None):
+        self.dao = dao if dao is not None else MySQL_DAO()
+        self.processes = processes if processes else multiprocessing.cpu_count()
+        self.writers = writers
+        self.chunk_size = chunk_size if chunk_size else self.dao.bulk_chunk_size
+        self.backlog = backlog if backlog else 2 * -(-self.processes // writers)
+        # Workers are spawned rather than forked, as the DAO process runs threads (pool, retention, writers)
+        self._executor = concurrent.futures.ProcessPoolExecutor(max_workers=self.processes,
+                                                                mp_context=multiprocessing.get_context('spawn'))
+
+    def write(self, prepared, messages):
+        """
+        Writes one prepared chunk in its own transaction with MySQL_DAO.insert_ais_messages(), which inserts the chunk
+        message by message instead if the transaction fails.
+
+        :param prepared: The prepared messages
+        :type prepared: list
+        :param messages: The same messages as they came in
+        :type messages: list
+        :return: The number of messages inserted
+        :rtype: int
+        """
+        return self.dao.insert_ais_messages(messages, prepared=prepared)
+
+    def _writer(self, chunks, counts, errors, index):
+        while True:
+            item = chunks.get()
+            if item is _STOP:
+                return
+            if errors:
+                continue
+            future, messages = item
+            try:
+                counts[index] += self.write(future.result(), messages)
+            except Exception as e:
+                errors.append(e)
+
+    def insert_ais_messages(self, messages):
+        """
+        Inserts AIS messages, formatting them in the worker processes. Once a worker or writer hits an error, no more
+        messages are read, and the chunks still waiting are dropped.
+
+        :param messages: The message dictionaries, as a list or any iterable
+        :type messages: iterable
+        :raises [Exception]: The first error a worker or writer hit, once the writers have stopped
+        :return: The count of insertions
+        :rtype: int
+        """
+        counts = [0] * self.writers
+        errors = []
+        queues = [queue.Queue(self.backlog) for _ in range(self.writers)]
+        threads = [threading.Thread(target=self._writer, args=(queues[i], counts, errors, i), daemon=True)
+                   for i in range(self.writers)]
+        for thread in threads:
+            thread.start()
+        try:
+            chunk = []
+            for msg in messages:
+                if errors:
+                    break
+                chunk.append(msg)
+                if len(chunk) >= self.chunk_size:
+                    self._submit(chunk, queues)
+                    chunk = []
+            else:
+                self._submit(chunk, queues)
+        finally:
+            for chunks in queues:
+                chunks.put(_STOP)
+            for thread in threads:
+                thread.join()
+        if errors:
+            raise errors[0]
+        return sum(counts)
+
+    def _submit(self, chunk, queues):
+        for index, shard in enumerate(shard_messages(chunk, self.writers)):
+            if shard:
+                queues[index].put((self._executor.submit(prepare_shard, shard), shard))
+
+    def insert_ais_batch(self, json_data):
+        """
+        Query 1 with parallel formatting, see MySQL_DAO.insert_ais_batch().
+
+        :param json_data: a json string
+        :type json_data: str
+        :return: JSON string containing {'inserts': ...} with the count of insertions, or -1 if the JSON cannot be
+            loaded or is not an array
+        :rtype: str
+        """
+        try:
+            data = json.loads(json_data)
+        except Exception as e:
+            return -1
+        if not isinstance(data, list):
+            return -1
+        return json.dumps({"inserts": self.insert_ais_messages(data)})
+
+    def insert_ais_stream(self, source):
+        """
+        Inserts AIS messages read incrementally from NDJSON or from a JSON array, see MySQL_DAO.insert_ais_stream().
+
+        :param source: A file object, or an iterable of NDJSON lines
+        :type source: file or iterable
+        :return: JSON string containing {'inserts': ...} with the count of insertions, or -1 if the input cannot be
+            parsed. Chunks read before a parse error stay inserted; errors raised while formatting or writing are not
+            caught.
+        :rtype: str
+        """
+        try:
+            count = self.insert_ais_messages(iter_ais_messages(source))
+        except AISStreamError as e:
+            return -1
+        return json.dumps({"inserts": count})
+
+    def close(self):
+        """
+        Stops the worker processes.
+        """
+        self._executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def ingest_from_config(dao=None):
+    """
+    Makes a parallel ingest from the [INGEST] section of the connection config.
+
+    :param dao: Optional, the DAO to write with, a new one by default
+    :type dao: MySQL_DAO
+    :return: The parallel ingest
+    :rtype: ParallelIngest
+    """
+    config = read_connection_config(MySQLConnectionManager.config_file)
+    return ParallelIngest(dao,
+                          processes=config.getint('INGEST', 'processes', fallback=0),
+                          writers=config.getint('INGEST', 'writers', fallback=2),
+                          chunk_size=config.getint('INGEST', 'chunk_size', fallback=0),
+                          backlog=config.getint('INGEST', 'backlog', fallback=0))
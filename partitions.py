@@ -0,0 +1,171 @@
+# The AIS tables and the column each is partitioned on. All three share the same AIS message id boundaries, so a
+# message, its position report and its static data always live in partitions of the same name.
+PARTITIONED_TABLES = [('POSITION_REPORT', 'AISMessage_Id'), ('STATIC_DATA', 'AISMessage_Id'), ('AIS_MESSAGE', 'Id')]
+
+
+def _partition_name(bound):
+    return 'p%d' % bound
+
+
+def is_partitioned(cursor):
+    """
+    Tells whether the AIS tables are partitioned.
+
+    :param cursor: A cursor to run the statements with
+    :type cursor: MySQLCursorManager
+    :return: True if AIS_MESSAGE has partitions
+    :rtype: bool
+    """
+    cursor.execute("""SELECT COUNT(*) FROM INFORMATION_SCHEMA.PARTITIONS
+                      WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'AIS_MESSAGE' AND PARTITION_NAME IS NOT NULL;""")
+    return cursor.fetchone()[0] > 0
+
+
+def get_partitions(cursor, table='AIS_MESSAGE'):
+    """
+    Lists the partitions of a table in order.
+
+    :param cursor: A cursor to run the statements with
+    :type cursor: MySQLCursorManager
+    :param table: Optional, the table name
+    :type table: str
+    :return: List of (name, lower bound, upper bound) tuples, the upper bound being None for the MAXVALUE partition
+    :rtype: list
+    """
+    cursor.execute("""SELECT PARTITION_NAME, PARTITION_DESCRIPTION FROM INFORMATION_SCHEMA.PARTITIONS
+                      WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND PARTITION_NAME IS NOT NULL
+                      ORDER BY PARTITION_ORDINAL_POSITION;""", (table,))
+    partitions = []
+    lower = 0
+    for name, description in cursor.fetchall():
+        upper = None if description == 'MAXVALUE' else int(description)
+        partitions.append((name, lower, upper))
+        lower = upper
+    return partitions
+
+
+def _next_id(cursor):
+    cursor.execute("""SELECT COALESCE(MAX(Id), 0) + 1 FROM AIS_MESSAGE;""")
+    return cursor.fetchone()[0]
+
+
+def drop_foreign_keys(cursor):
+    """
+    Drops the foreign keys on and to the AIS tables, which MySQL does not allow on partitioned tables.
+
+    :param cursor: A cursor to run the statements with
+    :type cursor: MySQLCursorManager
+    :return: The (table, constraint name) of the foreign keys dropped
+    :rtype: list
+    """
+    tables = [table for table, column in PARTITIONED_TABLES]
+    placeholders = ", ".join(["%s"] * len(tables))
+    cursor.execute("""SELECT TABLE_NAME, CONSTRAINT_NAME FROM INFORMATION_SCHEMA.REFERENTIAL_CONSTRAINTS
+                      WHERE CONSTRAINT_SCHEMA = DATABASE()
+                      AND (TABLE_NAME IN ({0}) OR REFERENCED_TABLE_NAME IN ({0}));""".format(placeholders),
+                   tuple(tables) * 2)
+    constraints = cursor.fetchall()
+    for table, name in constraints:
+        cursor.execute("""ALTER TABLE {} DROP FOREIGN KEY {};""".format(table, name))
+    return constraints
+
+
+def enable_partitioning(cursor, partition_size):
+    """
+    Range-partitions the AIS tables by AIS message id, with one partition per partition_size ids up to a little past
+    the current id, and a MAXVALUE partition after them. Does nothing if they are partitioned already.
+    This rebuilds the tables, so it takes a while on a large database.
+
+    :param cursor: A cursor to run the statements with
+    :type cursor: MySQLCursorManager
+    :param partition_size: The number of AIS message ids per partition
+    :type partition_size: int
+    :return: True if the tables were partitioned by this call
+    :rtype: bool
+    """
+    if is_partitioned(cursor):
+        return False
+    drop_foreign_keys(cursor)
+    last_bound = (_next_id(cursor) // partition_size + 2) * partition_size
+    bounds = range(partition_size, last_bound + 1, partition_size)
+    partitions = ", ".join(["PARTITION {} VALUES LESS THAN ({})".format(_partition_name(bound), bound)
+                            for bound in bounds] + ["PARTITION pmax VALUES LESS THAN MAXVALUE"])
+    for table, column in PARTITIONED_TABLES:
+        cursor.execute("""ALTER TABLE {} PARTITION BY RANGE ({}) ({});""".format(table, column, partitions))
+    return True
+
+
+def add_partitions(cursor, partition_size, headroom=2):
+    """
+    Splits new partitions off the MAXVALUE partition so that at least headroom empty partitions lie ahead of the
+    next AIS message id. Ids past the last bounded partition still go to the MAXVALUE partition, which retention
+    only expires row by row, so this should run regularly.
+
+    :param cursor: A cursor to run the statements with
+    :type cursor: MySQLCursorManager
+    :param partition_size: The number of AIS message ids per partition
+    :type partition_size: int
+    :param headroom: Optional, the number of partitions kept ahead
+    :type headroom: int
+    :return: The names of the partitions added
+    :rtype: list
+    """
+    bounded = [partition for partition in get_partitions(cursor) if partition[2] is not None]
+    if not bounded:
+        return []
+    highest = bounded[-1][2]
+    target = _next_id(cursor) + headroom * partition_size
+    added = []
+    while highest < target:
+        highest += partition_size
+        for table, column in PARTITIONED_TABLES:
+            cursor.execute("""ALTER TABLE {} REORGANIZE PARTITION pmax INTO (
+                                  PARTITION {} VALUES LESS THAN ({}), PARTITION pmax VALUES LESS THAN MAXVALUE);""".format(
+                table, _partition_name(highest), highest))
+        added.append(_partition_name(highest))
+    return added
+
+
+def drop_expired_partitions(cursor, cutoff, partition_size):
+    """
+    Drops the partitions whose AIS messages are all older than the cutoff, from all three AIS tables at once.
+    Only partitions at least one partition_size behind the next AIS message id are considered, so a partition still
+    being written to is never dropped. References to the dropped messages from outside the dropped partitions are
+    cleared first, like delete_ais_message_chunk() does for deleted rows.
+
+    :param cursor: A cursor to run the statements with
+    :type cursor: MySQLCursorManager
+    :param cutoff: Messages older than this are expired
+    :type cutoff: datetime.datetime
+    :param partition_size: The number of AIS message ids per partition
+    :type partition_size: int
+    :return: The number of AIS messages dropped
+    :rtype: int
+    """
+    limit = _next_id(cursor) - partition_size
+    deletions = 0
+    for name, lower, upper in get_partitions(cursor):
+        if upper is None or upper > limit:
+            break
+        cursor.execute("""SELECT COUNT(*), MAX(Timestamp) FROM AIS_MESSAGE PARTITION ({});""".format(name))
+        count, newest = cursor.fetchone()
+        if count > 0 and newest >= cutoff:
+            continue
+        cursor.execute("""UPDATE POSITION_REPORT SET LastStaticData_Id = NULL
+                          WHERE LastStaticData_Id >= %s AND LastStaticData_Id < %s;""", (lower, upper))
+        cursor.execute("""DELETE FROM VESSEL_LAST_STATIC WHERE AISMessage_Id >= %s AND AISMessage_Id < %s;""",
+                       (lower, upper))
+        cursor.execute("""UPDATE VESSEL_LATEST
+                          SET PositionMessage_Id = NULL, PositionTimestamp = NULL, Latitude = NULL, Longitude = NULL,
+                              MapView1_Id = NULL, MapView2_Id = NULL, MapView3_Id = NULL
+                          WHERE PositionMessage_Id >= %s AND PositionMessage_Id < %s;""", (lower, upper))
+        cursor.execute("""UPDATE VESSEL_LATEST
+                          SET StaticMessage_Id = NULL, StaticTimestamp = NULL, Name = NULL, AISIMO = NULL,
+                              Vessel_IMO = NULL, DestinationPort_Id = NULL
+                          WHERE StaticMessage_Id >= %s AND StaticMessage_Id < %s;""", (lower, upper))
+        cursor.execute("""DELETE FROM VESSEL_LATEST WHERE PositionMessage_Id IS NULL AND StaticMessage_Id IS NULL;""")
+        cursor.execute("""COMMIT;""")
+        for table, column in PARTITIONED_TABLES:
+            cursor.execute("""ALTER TABLE {} DROP PARTITION {};""".format(table, name))
+        deletions += count
+    return deletions
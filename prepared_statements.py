@@ -0,0 +1,217 @@
+import collections
+import threading
+import weakref
+
+import mysql.connector
+from mysql.connector import errorcode
+
+# Statements starting with these words are prepared, the others (DDL, COMMIT, ...) are run as text
+PREPARED_STATEMENTS = ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+
+_caches = weakref.WeakKeyDictionary()
+_caches_lock = threading.Lock()
+
+
+class StatementCache:
+    """
+    Class StatementCache
+    The server-side prepared statements of one connection, keyed by their SQL text. A statement is prepared the first
+    time its text is run on the connection and reused by every later call, so the server parses it only once.
+    The least recently used statements are deallocated past max_size, which bounds the statements built with
+    variable-length IN lists.
+    A connection is used by one thread at a time, so the cache needs no lock.
+
+    :param cnx: The connection the statements are prepared on
+    :type cnx: mysql.connector.connection.MySQLConnection
+    :param max_size: Optional, the most statements kept prepared
+    :type max_size: int
+    """
+
+    def __init__(self, cnx, max_size=64):
+        self.cnx = cnx
+        self.max_size = max_size
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+        self._statements = collections.OrderedDict()
+        self._unsupported = set()
+
+    def get(self, operation):
+        """
+        Returns the prepared cursor of a statement, making it if the statement is new.
+
+        :param operation: The SQL text, with %s placeholders
+        :type operation: str
+        :return: The cursor and the SQL text to execute it with, or (None, operation) if the server cannot prepare
+            the statement
+        :rtype: tuple
+        """
+        if operation in self._unsupported:
+            return None, operation
+        entry = self._statements.get(operation)
+        if entry is not None:
+            self._statements.move_to_end(operation)
+            self.stats['hits'] += 1
+            return entry
+        self.stats['misses'] += 1
+        # MySQLCursorPrepared re-prepares whenever it is given a different str object, even with the same text, so
+        # the cursor is always executed with the key it is stored under
+        entry = (self.cnx.cursor(prepared=True), operation)
+        self._statements[operation] = entry
+        while len(self._statements) > self.max_size:
+            evicted_operation, evicted = self._statements.popitem(last=False)
+            self._close(evicted[0])
+            self.stats['evictions'] += 1
+        return entry
+
+    def unsupported(self, operation):
+        """
+        Records that the server cannot prepare a statement, so that it is always run as text.
+
+        :param operation: The SQL text
+        :type operation: str
+        """
+        entry = self._statements.pop(operation, None)
+        if entry is not None:
+            self._close(entry[0])
+        self._unsupported.add(operation)
+
+    def __len__(self):
+        return len(self._statements)
+
+    @staticmethod
+    def _close(cursor):
+        try:
+            cursor.close()
+        except mysql.connector.Error:
+            pass
+
+    def clear(self):
+        """
+        Deallocates every statement.
+        """
+        for cursor, operation in self._statements.values():
+            self._close(cursor)
+        self._statements.clear()
+
+
+def get_statement_cache(cnx):
+    """
+    Returns the statement cache of a connection, creating it on first use. It goes away with the connection.
+
+    :param cnx: An open connection
+    :type cnx: mysql.connector.connection.MySQLConnection
+    :return: The statement cache
+    :rtype: StatementCache
+    """
+    cache = _caches.get(cnx)
+    if cache is None:
+        with _caches_lock:
+            cache = _caches.get(cnx)
+            if cache is None:
+                cache = StatementCache(cnx)
+                _caches[cnx] = cache
+    return cache
+
+
+class PreparedCursor:
+    """
+    Class PreparedCursor
+    A cursor that runs queries and DML as prepared statements from the connection's StatementCache, and the other
+    statements (DDL, COMMIT, ...) and executemany() through a buffered text cursor. Results are read in full
+    on execute(), so rowcount, fetchone() and fetchall() behave as on the buffered cursor it replaces.
+
+    :param cnx: The connection
+    :type cnx: mysql.connector.connection.MySQLConnection
+    """
+
+    def __init__(self, cnx):
+        self.cnx = cnx
+        self.statements = get_statement_cache(cnx)
+        self.rowcount = -1
+        self.lastrowid = None
+        self._text = None
+        self._rows = []
+        self._next_row = 0
+
+    def _text_cursor(self):
+        if self._text is None:
+            self._text = self.cnx.cursor(buffered=True)
+        return self._text
+
+    def _read(self, cursor):
+        self._rows = cursor.fetchall() if cursor.with_rows else []
+        self._next_row = 0
+        self.rowcount = cursor.rowcount
+        self.lastrowid = cursor.lastrowid
+
+    def execute(self, operation, params=None):
+        """
+        Runs a statement, prepared if it is a query or DML.
+
+        :param operation: The SQL text, with %s placeholders
+        :type operation: str
+        :param params: Optional, the parameters
+        :type params: tuple
+        :raises [mysql.connector.Error]: If the statement fails
+        """
+        if operation.lstrip().split(None, 1)[0].upper() in PREPARED_STATEMENTS:
+            cursor, operation = self.statements.get(operation)
+            if cursor is not None:
+                try:
+                    cursor.execute(operation, params)
+                    self._read(cursor)
+                    return
+                except mysql.connector.Error as err:
+                    if err.errno != errorcode.ER_UNSUPPORTED_PS:
+                        raise
+                    self.statements.unsupported(operation)
+        cursor = self._text_cursor()
+        cursor.execute(operation, params)
+        self._read(cursor)
+
+    def executemany(self, operation, seq_params):
+        """
+        Runs a statement for every set of parameters. This goes through the text protocol, which turns an INSERT
+        into a single multi-row INSERT, rather than executing a prepared statement once per row.
+
+        :param operation: The SQL text, with %s placeholders
+        :type operation: str
+        :param seq_params: The parameters of every row
+        :type seq_params: list
+        :raises [mysql.connector.Error]: If the statement fails
+        """
+        cursor = self._text_cursor()
+        cursor.executemany(operation, seq_params)
+        self._read(cursor)
+
+    def fetchone(self):
+        """
+        Returns the next row of the result.
+
+        :return: The row, or None once every row has been read
+        :rtype: tuple
+        """
+        if self._next_row >= len(self._rows):
+            return None
+        row = self._rows[self._next_row]
+        self._next_row += 1
+        return row
+
+    def fetchall(self):
+        """
+        Returns the rows of the result not read yet.
+
+        :return: The rows
+        :rtype: list
+        """
+        rows = self._rows[self._next_row:]
+        self._next_row = len(self._rows)
+        return rows
+
+    def close(self):
+        """
+        Closes the text cursor. The prepared statements stay with the connection.
+        """
+        if self._text is not None:
+            self._text.close()
+            self._text = None
+        self._rows = []
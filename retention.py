@@ -0,0 +1,144 @@
+import random
+import threading
+import time
+
+
+class RetentionScheduler:
+    """
+    Class RetentionScheduler
+    Runs the DAO's retention in a background thread every few seconds, each run limited by a time budget, so that
+    old messages are expired in small, frequent slices instead of rare long bursts. A run that hits its budget is
+    simply carried on by the next one.
+
+    :param dao: The DAO to run retention with
+    :type dao: MySQL_DAO
+    :param interval: Optional, seconds between the end of a run and the start of the next one
+    :type interval: float
+    :param window: Optional, the age in seconds past which messages are deleted, the DAO's retention_window by default
+    :type window: float
+    :param jitter: Optional, up to this many seconds are randomly added to or taken from every interval, so that
+        several processes do not run retention in lockstep
+    :type jitter: float
+    :param budget: Optional, seconds after which a run starts no new chunk, unlimited by default
+    :type budget: float
+    :param chunk_size: Optional, the number of AIS messages deleted per transaction, the DAO's default if not given
+    :type chunk_size: int
+    :param pause: Optional, seconds to wait between chunks, the DAO's default if not given
+    :type pause: float
+    """
+
+    def __init__(self, dao, interval=10.0, window=None, jitter=0.0, budget=None, chunk_size=None, pause=None):
+        self.dao = dao
+        self.interval = interval
+        self.window = window
+        self.jitter = jitter
+        self.budget = budget
+        self.chunk_size = chunk_size
+        self.pause = pause
+        self.stats = {"runs": 0, "deletions": 0, "errors": 0, "last_run": None}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def next_delay(self):
+        """
+        Picks the time to wait before the next run.
+
+        :return: The interval with a random jitter, never negative
+        :rtype: float
+        """
+        return max(0.0, self.interval + random.uniform(-self.jitter, self.jitter))
+
+    def run_once(self):
+        """
+        Runs retention once and records it in the stats.
+
+        :return: The stats of this run, {'started': ..., 'duration': ..., 'deletions': ..., 'complete': ...,
+            'error': ...}
+        :rtype: dict
+        """
+        started = time.time()
+        clock = time.monotonic()
+        run = {"started": started, "duration": None, "deletions": 0, "complete": False, "error": None}
+        try:
+            run['deletions'], run['complete'] = self.dao.expire_ais_messages(
+                window=self.window, chunk_size=self.chunk_size, pause=self.pause, budget=self.budget)
+        except Exception as e:
+            run['error'] = str(e)
+        run['duration'] = time.monotonic() - clock
+        with self._lock:
+            self.stats['runs'] += 1
+            self.stats['deletions'] += run['deletions']
+            if run['error'] is not None:
+                self.stats['errors'] += 1
+            self.stats['last_run'] = run
+        return run
+
+    def get_stats(self):
+        """
+        Returns a copy of the stats: the number of runs, deletions and failed runs so far, and the last run.
+
+        :return: Object {'runs': ..., 'deletions': ..., 'errors': ..., 'last_run': {...}}
+        :rtype: dict
+        """
+        with self._lock:
+            stats = dict(self.stats)
+            if stats['last_run'] is not None:
+                stats['last_run'] = dict(stats['last_run'])
+            return stats
+
+    def _loop(self):
+        while not self._stop.wait(self.next_delay()):
+            self.run_once()
+
+    def start(self):
+        """
+        Starts the background thread, unless it is running already.
+        """
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name='retention', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        """
+        Stops the background thread, waiting for a run in progress to finish.
+
+        :param timeout: Optional, the longest time to wait in seconds
+        :type timeout: float
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def is_running(self):
+        """
+        Tells whether the background thread is running.
+
+        :return: True if it is running
+        :rtype: bool
+        """
+        return self._thread is not None and self._thread.is_alive()
+
+
+def scheduler_from_config(dao, config):
+    """
+    Makes a scheduler from the [RETENTION] section of the connection config.
+
+    :param dao: The DAO to run retention with
+    :type dao: MySQL_DAO
+    :param config: The parsed connection config
+    :type config: configparser.ConfigParser
+    :return: The scheduler, not yet started
+    :rtype: RetentionScheduler
+    """
+    budget = config.getfloat('RETENTION', 'budget', fallback=0.0)
+    return RetentionScheduler(dao,
+                              interval=config.getfloat('RETENTION', 'interval', fallback=10.0),
+                              window=config.getfloat('RETENTION', 'window', fallback=dao.retention_window),
+                              jitter=config.getfloat('RETENTION', 'jitter', fallback=0.0),
+                              budget=budget if budget > 0 else None,
+                              chunk_size=config.getint('RETENTION', 'chunk_size', fallback=dao.retention_chunk_size),
+                              pause=config.getfloat('RETENTION', 'pause', fallback=dao.retention_pause))
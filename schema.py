@@ -0,0 +1,322 @@
+"""
+The database schema the DAO relies on: the tables (TABLES), the indexes each query needs (INDEXES), and the
+migrations that bring an existing database up to date (MIGRATIONS), each recorded in SCHEMA_MIGRATIONS once applied.
+The DAO calls ensure_schema() once per process, so a new or older database is migrated on first use, and a query
+index dropped since the migrations ran is created again.
+"""
+
+TABLES = [
+    ('MAP_VIEW', """CREATE TABLE IF NOT EXISTS MAP_VIEW(
+                        Id INT NOT NULL PRIMARY KEY,
+                        Name VARCHAR(10) NULL,
+                        LongitudeW DECIMAL(10, 6) NOT NULL,
+                        LatitudeS DECIMAL(9, 6) NOT NULL,
+                        LongitudeE DECIMAL(10, 6) NOT NULL,
+                        LatitudeN DECIMAL(9, 6) NOT NULL,
+                        Scale ENUM('1', '2', '3') NOT NULL,
+                        RasterFile VARCHAR(100) NULL,
+                        ImageWidth SMALLINT NULL,
+                        ImageHeight SMALLINT NULL,
+                        ActualLongitudeW DECIMAL(10, 6) NULL,
+                        ActualLatitudeS DECIMAL(9, 6) NULL,
+                        ActualLongitudeE DECIMAL(10, 6) NULL,
+                        ActualLatitudeN DECIMAL(9, 6) NULL,
+                        ContainerMapView_Id INT NULL,
+                        FOREIGN KEY (ContainerMapView_Id) REFERENCES MAP_VIEW(Id));"""),
+    ('PORT', """CREATE TABLE IF NOT EXISTS PORT(
+                    Id INT NOT NULL PRIMARY KEY,
+                    LoCode VARCHAR(5) NULL,
+                    Name VARCHAR(100) NOT NULL,
+                    Country VARCHAR(50) NOT NULL,
+                    Longitude DECIMAL(9, 6) NOT NULL,
+                    Latitude DECIMAL(8, 6) NOT NULL,
+                    Website VARCHAR(100) NULL,
+                    MapView1_Id INT NULL,
+                    MapView2_Id INT NULL,
+                    MapView3_Id INT NULL,
+                    FOREIGN KEY (MapView1_Id) REFERENCES MAP_VIEW(Id),
+                    FOREIGN KEY (MapView2_Id) REFERENCES MAP_VIEW(Id),
+                    FOREIGN KEY (MapView3_Id) REFERENCES MAP_VIEW(Id));"""),
+    ('VESSEL', """CREATE TABLE IF NOT EXISTS VESSEL(
+                      IMO INT NOT NULL PRIMARY KEY,
+                      Flag VARCHAR(50) NULL,
+                      Name VARCHAR(128) NULL,
+                      Built SMALLINT NULL,
+                      CallSign VARCHAR(8) NULL,
+                      Length SMALLINT NULL,
+                      Breadth SMALLINT NULL,
+                      Tonnage INT NULL,
+                      MMSI INT NULL,
+                      Type VARCHAR(30) NULL,
+                      Status VARCHAR(50) NULL,
+                      Owner VARCHAR(80) NULL);"""),
+    ('AIS_MESSAGE', """CREATE TABLE IF NOT EXISTS AIS_MESSAGE(
+                           Id INT NOT NULL AUTO_INCREMENT PRIMARY KEY,
+                           Timestamp DATETIME NOT NULL,
+                           MMSI INT NOT NULL,
+                           Class VARCHAR(30) NOT NULL,
+                           Vessel_IMO INT NULL,
+                           FOREIGN KEY (Vessel_IMO) REFERENCES VESSEL(IMO));"""),
+    ('STATIC_DATA', """CREATE TABLE IF NOT EXISTS STATIC_DATA(
+                           AISMessage_Id INT NOT NULL PRIMARY KEY,
+                           AISIMO INT NULL,
+                           CallSign VARCHAR(8) NULL,
+                           Name VARCHAR(128) NULL,
+                           VesselType VARCHAR(50) NULL,
+                           CargoType VARCHAR(80) NULL,
+                           Length SMALLINT NULL,
+                           Breadth SMALLINT NULL,
+                           Draught DECIMAL(4, 1) NULL,
+                           AISDestination VARCHAR(100) NULL,
+                           ETA DATETIME NULL,
+                           DestinationPort_Id INT NULL,
+                           FOREIGN KEY (AISMessage_Id) REFERENCES AIS_MESSAGE(Id),
+                           FOREIGN KEY (DestinationPort_Id) REFERENCES PORT(Id));"""),
+    ('POSITION_REPORT', """CREATE TABLE IF NOT EXISTS POSITION_REPORT(
+                               AISMessage_Id INT NOT NULL PRIMARY KEY,
+                               NavigationalStatus VARCHAR(50) NULL,
+                               Longitude DECIMAL(9, 6) NULL,
+                               Latitude DECIMAL(8, 6) NULL,
+                               RoT DECIMAL(4, 1) NULL,
+                               SoG DECIMAL(4, 1) NULL,
+                               CoG DECIMAL(4, 1) NULL,
+                               Heading SMALLINT NULL,
+                               LastStaticData_Id INT NULL,
+                               MapView1_Id INT NULL,
+                               MapView2_Id INT NULL,
+                               MapView3_Id INT NULL,
+                               FOREIGN KEY (AISMessage_Id) REFERENCES AIS_MESSAGE(Id),
+                               FOREIGN KEY (LastStaticData_Id) REFERENCES STATIC_DATA(AISMessage_Id),
+                               FOREIGN KEY (MapView1_Id) REFERENCES MAP_VIEW(Id),
+                               FOREIGN KEY (MapView2_Id) REFERENCES MAP_VIEW(Id),
+                               FOREIGN KEY (MapView3_Id) REFERENCES MAP_VIEW(Id));"""),
+    ('VESSEL_LAST_STATIC', """CREATE TABLE IF NOT EXISTS VESSEL_LAST_STATIC(
+                                  MMSI INT NOT NULL PRIMARY KEY,
+                                  AISMessage_Id INT NOT NULL);"""),
+    ('VESSEL_LATEST', """CREATE TABLE IF NOT EXISTS VESSEL_LATEST(
+                             MMSI INT NOT NULL PRIMARY KEY,
+                             PositionMessage_Id INT NULL,
+                             PositionTimestamp DATETIME NULL,
+                             Latitude DECIMAL(8, 6) NULL,
+                             Longitude DECIMAL(9, 6) NULL,
+                             MapView1_Id INT NULL,
+                             MapView2_Id INT NULL,
+                             MapView3_Id INT NULL,
+                             StaticMessage_Id INT NULL,
+                             StaticTimestamp DATETIME NULL,
+                             Name VARCHAR(128) NULL,
+                             AISIMO INT NULL,
+                             Vessel_IMO INT NULL,
+                             DestinationPort_Id INT NULL);"""),
+]
+
+# The indexes every DAO query relies on, as (table, index name, columns). An existing index whose leading columns
+# are the same (such as the primary key or one made for a foreign key) counts as well.
+INDEXES = [
+    # Query 5/6/10 and the static data lookups: the messages of one vessel, newest first
+    ('AIS_MESSAGE', 'AIS_MESSAGE_MMSI_Timestamp', ('MMSI', 'Timestamp')),
+    # Query 3: retention by age
+    ('AIS_MESSAGE', 'AIS_MESSAGE_Timestamp', ('Timestamp',)),
+    ('AIS_MESSAGE', 'AIS_MESSAGE_Vessel_IMO', ('Vessel_IMO',)),
+    ('POSITION_REPORT', 'POSITION_REPORT_LastStaticData_Id', ('LastStaticData_Id',)),
+    ('POSITION_REPORT', 'POSITION_REPORT_MapView2_Id', ('MapView2_Id',)),
+    ('POSITION_REPORT', 'POSITION_REPORT_MapView3_Id', ('MapView3_Id',)),
+    ('STATIC_DATA', 'STATIC_DATA_DestinationPort_Id', ('DestinationPort_Id',)),
+    # Query 8/9/12: ports by name and country
+    ('PORT', 'PORT_Name_Country', ('Name', 'Country')),
+    # Query 13: the tiles contained in a tile
+    ('MAP_VIEW', 'MAP_VIEW_ContainerMapView_Id', ('ContainerMapView_Id',)),
+    # Permanent vessel data fallback of get_optional_vessel_data()
+    ('VESSEL', 'VESSEL_MMSI', ('MMSI',)),
+    # Retention: forgetting the deleted messages in the side tables
+    ('VESSEL_LAST_STATIC', 'VESSEL_LAST_STATIC_AISMessage_Id', ('AISMessage_Id',)),
+    ('VESSEL_LATEST', 'VESSEL_LATEST_PositionMessage_Id', ('PositionMessage_Id',)),
+    ('VESSEL_LATEST', 'VESSEL_LATEST_StaticMessage_Id', ('StaticMessage_Id',)),
+    ('VESSEL_LATEST', 'VESSEL_LATEST_PositionTimestamp', ('PositionTimestamp',)),
+    ('VESSEL_LATEST', 'VESSEL_LATEST_MapView2_Id', ('MapView2_Id',)),
+    ('VESSEL_LATEST', 'VESSEL_LATEST_MapView3_Id', ('MapView3_Id',)),
+    ('VESSEL_LATEST', 'VESSEL_LATEST_DestinationPort_Id', ('DestinationPort_Id',)),
+]
+
+# VESSEL_LATEST keeps the latest position and the latest static values of every vessel. A message only replaces the
+# stored values if it is at least as recent, so messages arriving out of order are harmless. Name and IMO keep the
+# latest non-null value, like get_optional_vessel_data() used to find from STATIC_DATA.
+# The timestamp is assigned last, as MySQL applies the assignments from left to right.
+LATEST_POSITION_UPDATE = """ON DUPLICATE KEY UPDATE
+    PositionMessage_Id = IF(PositionTimestamp IS NULL OR VALUES(PositionTimestamp) >= PositionTimestamp, VALUES(PositionMessage_Id), PositionMessage_Id),
+    Latitude = IF(PositionTimestamp IS NULL OR VALUES(PositionTimestamp) >= PositionTimestamp, VALUES(Latitude), Latitude),
+    Longitude = IF(PositionTimestamp IS NULL OR VALUES(PositionTimestamp) >= PositionTimestamp, VALUES(Longitude), Longitude),
+    MapView1_Id = IF(PositionTimestamp IS NULL OR VALUES(PositionTimestamp) >= PositionTimestamp, VALUES(MapView1_Id), MapView1_Id),
+    MapView2_Id = IF(PositionTimestamp IS NULL OR VALUES(PositionTimestamp) >= PositionTimestamp, VALUES(MapView2_Id), MapView2_Id),
+    MapView3_Id = IF(PositionTimestamp IS NULL OR VALUES(PositionTimestamp) >= PositionTimestamp, VALUES(MapView3_Id), MapView3_Id),
+    PositionTimestamp = IF(PositionTimestamp IS NULL OR VALUES(PositionTimestamp) >= PositionTimestamp, VALUES(PositionTimestamp), PositionTimestamp);"""
+LATEST_STATIC_UPDATE = """ON DUPLICATE KEY UPDATE
+    StaticMessage_Id = IF(StaticTimestamp IS NULL OR VALUES(StaticTimestamp) >= StaticTimestamp, VALUES(StaticMessage_Id), StaticMessage_Id),
+    Name = IF(StaticTimestamp IS NULL OR VALUES(StaticTimestamp) >= StaticTimestamp, COALESCE(VALUES(Name), Name), COALESCE(Name, VALUES(Name))),
+    AISIMO = IF(StaticTimestamp IS NULL OR VALUES(StaticTimestamp) >= StaticTimestamp, COALESCE(VALUES(AISIMO), AISIMO), COALESCE(AISIMO, VALUES(AISIMO))),
+    Vessel_IMO = IF(StaticTimestamp IS NULL OR VALUES(StaticTimestamp) >= StaticTimestamp, COALESCE(VALUES(Vessel_IMO), Vessel_IMO), COALESCE(Vessel_IMO, VALUES(Vessel_IMO))),
+    DestinationPort_Id = IF(StaticTimestamp IS NULL OR VALUES(StaticTimestamp) >= StaticTimestamp, VALUES(DestinationPort_Id), DestinationPort_Id),
+    StaticTimestamp = IF(StaticTimestamp IS NULL OR VALUES(StaticTimestamp) >= StaticTimestamp, VALUES(StaticTimestamp), StaticTimestamp);"""
+
+
+def _create_tables(cursor):
+    for name, ddl in TABLES:
+        cursor.execute(ddl)
+
+
+def _fill_vessel_last_static(cursor):
+    cursor.execute("""INSERT IGNORE INTO VESSEL_LAST_STATIC(MMSI, AISMessage_Id)
+                      SELECT AIS_MESSAGE.MMSI, MAX(STATIC_DATA.AISMessage_Id) FROM STATIC_DATA, AIS_MESSAGE
+                      WHERE STATIC_DATA.AISMessage_Id = AIS_MESSAGE.Id GROUP BY AIS_MESSAGE.MMSI;""")
+
+
+def _fill_vessel_latest(cursor):
+    # Replaying the history in timestamp order through the same upserts as the ingest path leaves the latest values
+    # in place. The rows are read from a derived table whose columns are all renamed, as MySQL lets the ON DUPLICATE
+    # KEY UPDATE of an INSERT ... SELECT see the columns of the tables selected from, which would make the unqualified
+    # VESSEL_LATEST columns of the update ambiguous. WHERE TRUE keeps SQLite from reading ON CONFLICT as a join
+    # constraint.
+    cursor.execute("""INSERT INTO VESSEL_LATEST(MMSI, PositionMessage_Id, PositionTimestamp, Latitude, Longitude, MapView1_Id, MapView2_Id, MapView3_Id)
+                      SELECT * FROM (
+                          SELECT AIS_MESSAGE.MMSI AS NewMMSI, AIS_MESSAGE.Id AS NewId, AIS_MESSAGE.Timestamp AS NewTimestamp,
+                                 POSITION_REPORT.Latitude AS NewLatitude, POSITION_REPORT.Longitude AS NewLongitude,
+                                 POSITION_REPORT.MapView1_Id AS NewMapView1_Id, POSITION_REPORT.MapView2_Id AS NewMapView2_Id,
+                                 POSITION_REPORT.MapView3_Id AS NewMapView3_Id
+                          FROM POSITION_REPORT, AIS_MESSAGE
+                          WHERE POSITION_REPORT.AISMessage_Id = AIS_MESSAGE.Id AND POSITION_REPORT.Latitude IS NOT NULL) AS NEW_POSITION
+                      WHERE TRUE ORDER BY NewTimestamp ASC, NewId ASC """ + LATEST_POSITION_UPDATE)
+    cursor.execute("""INSERT INTO VESSEL_LATEST(MMSI, StaticMessage_Id, StaticTimestamp, Name, AISIMO, Vessel_IMO, DestinationPort_Id)
+                      SELECT * FROM (
+                          SELECT AIS_MESSAGE.MMSI AS NewMMSI, AIS_MESSAGE.Id AS NewId, AIS_MESSAGE.Timestamp AS NewTimestamp,
+                                 STATIC_DATA.Name AS NewName, STATIC_DATA.AISIMO AS NewAISIMO,
+                                 AIS_MESSAGE.Vessel_IMO AS NewVessel_IMO, STATIC_DATA.DestinationPort_Id AS NewDestinationPort_Id
+                          FROM STATIC_DATA, AIS_MESSAGE
+                          WHERE STATIC_DATA.AISMessage_Id = AIS_MESSAGE.Id) AS NEW_STATIC
+                      WHERE TRUE ORDER BY NewTimestamp ASC, NewId ASC """ + LATEST_STATIC_UPDATE)
+
+
+def _fill_side_tables(cursor):
+    # Databases made before the migrations table existed may already have these tables, filled by the ingest path
+    cursor.execute("""SELECT COUNT(*) FROM VESSEL_LAST_STATIC;""")
+    if cursor.fetchone()[0] == 0:
+        _fill_vessel_last_static(cursor)
+    cursor.execute("""SELECT COUNT(*) FROM VESSEL_LATEST;""")
+    if cursor.fetchone()[0] == 0:
+        _fill_vessel_latest(cursor)
+
+
+def _create_indexes(cursor):
+    create_missing_indexes(cursor)
+
+
+def _add_batch_column(cursor):
+    # Tags the AIS_MESSAGE rows of a bulk insert, so that their ids can be read back, see MySQL_DAO.insert_many().
+    # Not part of TABLES, so that dumps made before it still load
+    cursor.execute("""SELECT TABLE_NAME, COLUMN_NAME FROM INFORMATION_SCHEMA.COLUMNS WHERE TABLE_SCHEMA = DATABASE();""")
+    if ('AIS_MESSAGE', 'batch') not in {(table.upper(), column.lower()) for table, column in cursor.fetchall()}:
+        cursor.execute("""ALTER TABLE AIS_MESSAGE ADD COLUMN Batch BIGINT NULL;""")
+
+
+# Applied in order, each exactly once per database. MySQL commits DDL implicitly, so a migration interrupted half
+# way is run again from the start and every step must be safe to repeat.
+MIGRATIONS = [
+    (1, 'Create the tables', _create_tables),
+    (2, 'Fill VESSEL_LAST_STATIC and VESSEL_LATEST from the AIS history', _fill_side_tables),
+    (3, 'Create the query indexes', _create_indexes),
+    (4, 'Add AIS_MESSAGE.Batch to read back the ids of bulk inserts', _add_batch_column),
+]
+
+
+def get_indexes(cursor):
+    """
+    Lists the indexes of the current database.
+
+    :param cursor: A cursor to run the statements with
+    :type cursor: MySQLCursorManager
+    :return: Dictionary of table name to the list of column tuples of its indexes
+    :rtype: dict
+    """
+    cursor.execute("""SELECT TABLE_NAME, INDEX_NAME, COLUMN_NAME FROM INFORMATION_SCHEMA.STATISTICS
+                      WHERE TABLE_SCHEMA = DATABASE() ORDER BY TABLE_NAME, INDEX_NAME, SEQ_IN_INDEX;""")
+    columns = {}
+    for table, index, column in cursor.fetchall():
+        columns.setdefault((table.upper(), index), []).append(column.lower())
+    indexes = {}
+    for (table, index), index_columns in columns.items():
+        indexes.setdefault(table, []).append(tuple(index_columns))
+    return indexes
+
+
+def verify_indexes(cursor):
+    """
+    Checks that every index in INDEXES, or one starting with the same columns, exists.
+
+    :param cursor: A cursor to run the statements with
+    :type cursor: MySQLCursorManager
+    :return: The (table, index name, columns) entries of INDEXES that are missing
+    :rtype: list
+    """
+    indexes = get_indexes(cursor)
+    missing = []
+    for table, name, columns in INDEXES:
+        wanted = tuple(column.lower() for column in columns)
+        if not any(existing[:len(wanted)] == wanted for existing in indexes.get(table, [])):
+            missing.append((table, name, columns))
+    return missing
+
+
+def create_missing_indexes(cursor):
+    """
+    Creates the indexes verify_indexes() reports missing.
+
+    :param cursor: A cursor to run the statements with
+    :type cursor: MySQLCursorManager
+    :return: The (table, index name, columns) entries that were created
+    :rtype: list
+    """
+    missing = verify_indexes(cursor)
+    for table, name, columns in missing:
+        cursor.execute("""CREATE INDEX {} ON {}({});""".format(name, table, ", ".join(columns)))
+    return missing
+
+
+def migrate(cursor):
+    """
+    Applies the migrations the database has not had yet, recording each in SCHEMA_MIGRATIONS.
+
+    :param cursor: A cursor to run the statements with
+    :type cursor: MySQLCursorManager
+    :return: The versions applied
+    :rtype: list
+    """
+    cursor.execute("""CREATE TABLE IF NOT EXISTS SCHEMA_MIGRATIONS(
+                          Version INT NOT NULL PRIMARY KEY,
+                          Description VARCHAR(200) NOT NULL,
+                          AppliedAt DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP);""")
+    cursor.execute("""SELECT Version FROM SCHEMA_MIGRATIONS;""")
+    done = {row[0] for row in cursor.fetchall()}
+    applied = []
+    for version, description, step in MIGRATIONS:
+        if version in done:
+            continue
+        step(cursor)
+        cursor.execute("""INSERT INTO SCHEMA_MIGRATIONS(Version, Description) VALUES(%s, %s);""",
+                       (version, description))
+        cursor.execute("""COMMIT;""")
+        applied.append(version)
+    return applied
+
+
+def ensure_schema(cursor):
+    """
+    Brings the database up to date: applies the pending migrations, then recreates any query index that has gone
+    missing since.
+
+    :param cursor: A cursor to run the statements with
+    :type cursor: MySQLCursorManager
+    :return: The versions applied, and the (table, index name, columns) entries of the indexes that were missing and
+        have been created
+    :rtype: tuple
+    """
+    applied = migrate(cursor)
+    return applied, create_missing_indexes(cursor)
@@ -0,0 +1,425 @@
+"""
+Runs the DAO on an SQLite database file instead of a MySQL server, for local runs, tests and deployments without a
+database server. Set "backend = sqlite" in the [SQL] section of the connection config; the [SQLITE] section names the
+file and tunes it. The DAO keeps its MySQL statements: SQLiteCursor rewrites the few MySQL-only constructs into their
+SQLite equivalents (ON DUPLICATE KEY UPDATE becomes an upsert, IF becomes IIF, ...), reads results in full like the
+buffered MySQL cursor, and raises mysql.connector errors, so the DAO's error handling is the same on both backends.
+Needs SQLite 3.35 or later. Table partitioning ([STORAGE] partitioned) is MySQL-only and is ignored.
+
+To make a database from the MySQL dump, run from the base project directory:
+`python -m sqlite_backend load data/Milestone_4_Dump.mysql`
+"""
+import argparse
+import datetime
+import decimal
+import functools
+import os
+import re
+import sqlite3
+
+import mysql.connector
+
+from schema import TABLES, ensure_schema
+
+# The most parameters SQLite takes in one statement (SQLITE_MAX_VARIABLE_NUMBER of SQLite 3.32 and later)
+MAX_VARIABLES = 32766
+
+_COMMIT = re.compile(r'^\s*COMMIT\s*;?\s*$', re.IGNORECASE)
+_ALTER_AUTO_INCREMENT = re.compile(r'^\s*ALTER\s+TABLE\s+(\w+)\s+AUTO_INCREMENT\s*=\s*\d+\s*;?\s*$', re.IGNORECASE)
+_ON_DUPLICATE = re.compile(r'\bON\s+DUPLICATE\s+KEY\s+UPDATE\b', re.IGNORECASE)
+_NEW_VALUE = re.compile(r'\bVALUES\s*\(\s*(\w+)\s*\)', re.IGNORECASE)
+_VALUES_ROW = re.compile(r'\bVALUES\s*(\(\s*%s\s*(?:,\s*%s\s*)*\))', re.IGNORECASE)
+_INSERT_TABLE = re.compile(r'^\s*INSERT\s+INTO\s+`?(\w+)`?', re.IGNORECASE)
+_STRING = re.compile(r"'((?:[^'\\]|\\.|'')*)'", re.DOTALL)
+_ESCAPES = {'0': '\0', "'": "''", '"': '"', 'b': '\b', 'n': '\n', 'r': '\r', 't': '\t', 'Z': '\x1a', '\\': '\\'}
+
+# Statements with no SQLite equivalent, replaced as a whole when their text matches
+STATEMENTS = [
+    # SQLite has a single writer at a time, so a multi-row INSERT always gets consecutive ids
+    (re.compile(r'^\s*SELECT\s+@@auto_increment_increment\s*,\s*@@innodb_autoinc_lock_mode\b', re.IGNORECASE),
+     """SELECT 1, 0;"""),
+    (re.compile(r'\bINFORMATION_SCHEMA\.STATISTICS\b', re.IGNORECASE),
+     """SELECT m.name, il.name, ii.name FROM sqlite_master AS m, pragma_index_list(m.name) AS il,
+            pragma_index_info(il.name) AS ii
+        WHERE m.type = 'table' ORDER BY m.name, il.name, ii.seqno;"""),
+    (re.compile(r'\bINFORMATION_SCHEMA\.COLUMNS\b', re.IGNORECASE),
+     """SELECT m.name, c.name FROM sqlite_master AS m, pragma_table_info(m.name) AS c WHERE m.type = 'table';"""),
+]
+
+# MySQL constructs and the SQLite they are written as, applied in order
+REWRITES = [
+    (re.compile(r'\bINT(\s+NOT\s+NULL)?\s+AUTO_INCREMENT\s+PRIMARY\s+KEY\b', re.IGNORECASE),
+     r'INTEGER\1 PRIMARY KEY AUTOINCREMENT'),
+    (re.compile(r'\bENUM\s*\([^)]*\)', re.IGNORECASE), 'VARCHAR(10)'),
+    (re.compile(r'\bINSERT\s+IGNORE\s+INTO\b', re.IGNORECASE), 'INSERT OR IGNORE INTO'),
+    (re.compile(r'\bLAST_INSERT_ID\s*\(\s*\)', re.IGNORECASE), 'last_insert_rowid()'),
+    (re.compile(r'\bGREATEST\s*\(', re.IGNORECASE), 'MAX('),
+    (re.compile(r'\bIF\s*\(', re.IGNORECASE), 'IIF('),
+    (re.compile(r'\bCURRENT_TIMESTAMP\s*-\s*INTERVAL\s+%s\s+SECOND\b', re.IGNORECASE),
+     "datetime(CURRENT_TIMESTAMP, '-' || %s || ' seconds')"),
+    (re.compile(r'%s'), '?'),
+]
+
+_ERRORS = [
+    (sqlite3.IntegrityError, mysql.connector.errors.IntegrityError),
+    (sqlite3.DataError, mysql.connector.errors.DataError),
+    (sqlite3.NotSupportedError, mysql.connector.errors.NotSupportedError),
+    (sqlite3.ProgrammingError, mysql.connector.errors.ProgrammingError),
+    (sqlite3.OperationalError, mysql.connector.errors.OperationalError),
+    (sqlite3.Error, mysql.connector.errors.DatabaseError),
+]
+
+
+def _to_datetime(value):
+    try:
+        return datetime.datetime.fromisoformat(value.decode())
+    except ValueError:
+        return value.decode()
+
+
+# Results come back as the MySQL connector returns them: DATETIME columns as datetime, DECIMAL columns as Decimal
+sqlite3.register_converter('DATETIME', _to_datetime)
+sqlite3.register_converter('DECIMAL', lambda value: decimal.Decimal(value.decode()))
+sqlite3.register_adapter(datetime.datetime, lambda value: value.isoformat(' '))
+sqlite3.register_adapter(decimal.Decimal, float)
+
+
+@functools.lru_cache(maxsize=1024)
+def translate(operation):
+    """
+    Rewrites a MySQL statement of the DAO into SQLite. Results are cached, as the DAO runs the same texts over and
+    over.
+
+    :param operation: The MySQL text, with %s placeholders
+    :type operation: str
+    :return: The SQLite text, with ? placeholders
+    :rtype: str
+    """
+    for pattern, statement in STATEMENTS:
+        if pattern.search(operation):
+            return statement
+    match = _ALTER_AUTO_INCREMENT.match(operation)
+    if match:
+        # Only used to restart the ids of an emptied table
+        return "DELETE FROM sqlite_sequence WHERE name = '{}';".format(match.group(1))
+    parts = _ON_DUPLICATE.split(operation, 1)
+    if len(parts) == 2:
+        # Unqualified columns of the update mean the stored row on both sides, VALUES(x) the row being inserted.
+        # MySQL applies the assignments from left to right, but the DAO always assigns the compared column last, so
+        # SQLite, which reads every column before the update, gives the same row
+        operation = parts[0] + 'ON CONFLICT DO UPDATE SET' + _NEW_VALUE.sub(r'excluded.\1', parts[1])
+    for pattern, replacement in REWRITES:
+        operation = pattern.sub(replacement, operation)
+    return operation
+
+
+def _raise_mysql_error(err):
+    for sqlite_error, mysql_error in _ERRORS:
+        if isinstance(err, sqlite_error):
+            raise mysql_error(msg=str(err)) from err
+    raise err
+
+
+class SQLiteCursor:
+    """
+    Class SQLiteCursor
+    Runs the DAO's MySQL statements on an SQLite connection, see translate(). Results are read in full on execute(),
+    so rowcount, fetchone() and fetchall() behave as on the buffered MySQL cursor. executemany() of an INSERT runs
+    a single multi-row INSERT, after which lastrowid is the id of the first row, as on MySQL.
+
+    :param cnx: The connection
+    :type cnx: SQLiteConnection
+    """
+
+    def __init__(self, cnx):
+        self.cnx = cnx
+        self.rowcount = -1
+        self.lastrowid = None
+        self.description = None
+        self.with_rows = False
+        self._cursor = cnx.db.cursor()
+        self._rows = []
+        self._next_row = 0
+
+    def _run(self, operation, params):
+        try:
+            self._cursor.execute(operation, params)
+            self.description = self._cursor.description
+            self.with_rows = self.description is not None
+            self._rows = self._cursor.fetchall() if self.with_rows else []
+        except sqlite3.Error as err:
+            _raise_mysql_error(err)
+        self._next_row = 0
+        self.lastrowid = self._cursor.lastrowid
+        return len(self._rows) if self.with_rows else self._cursor.rowcount
+
+    def execute(self, operation, params=None):
+        """
+        Runs a statement.
+
+        :param operation: The MySQL text, with %s placeholders
+        :type operation: str
+        :param params: Optional, the parameters
+        :type params: tuple
+        :raises [mysql.connector.Error]: If the statement fails
+        """
+        if _COMMIT.match(operation):
+            self.cnx.commit()
+            self.rowcount = 0
+            self._rows = []
+            return
+        self.rowcount = self._run(translate(operation), tuple(params) if params is not None else ())
+
+    def executemany(self, operation, seq_params):
+        """
+        Runs a statement for every set of parameters, an INSERT as multi-row INSERTs of at most MAX_VARIABLES
+        parameters each.
+
+        :param operation: The MySQL text, with %s placeholders
+        :type operation: str
+        :param seq_params: The parameters of every row
+        :type seq_params: list
+        :raises [mysql.connector.Error]: If the statement fails
+        """
+        rows = [tuple(params) for params in seq_params]
+        match = _VALUES_ROW.search(operation) if _INSERT_TABLE.match(operation) else None
+        if match is None or len(rows) == 0:
+            try:
+                self._cursor.executemany(translate(operation), rows)
+            except sqlite3.Error as err:
+                _raise_mysql_error(err)
+            self.rowcount = self._cursor.rowcount
+            self._rows = []
+            self.with_rows = False
+            return
+        row = match.group(1)
+        per_statement = max(1, MAX_VARIABLES // row.count('%s'))
+        count = 0
+        first_id = None
+        for start in range(0, len(rows), per_statement):
+            chunk = rows[start:start + per_statement]
+            statement = operation[:match.start(1)] + ", ".join([row] * len(chunk)) + operation[match.end(1):]
+            count += self._run(translate(statement), tuple(value for params in chunk for value in params))
+            if first_id is None and self.lastrowid is not None:
+                first_id = self.lastrowid - len(chunk) + 1
+        self.rowcount = count
+        self.lastrowid = first_id
+
+    def fetchone(self):
+        """
+        Returns the next row of the result.
+
+        :return: The row, or None once every row has been read
+        :rtype: tuple
+        """
+        if self._next_row >= len(self._rows):
+            return None
+        row = self._rows[self._next_row]
+        self._next_row += 1
+        return row
+
+    def fetchall(self):
+        """
+        Returns the rows of the result not read yet.
+
+        :return: The rows
+        :rtype: list
+        """
+        rows = self._rows[self._next_row:]
+        self._next_row = len(self._rows)
+        return rows
+
+    def close(self):
+        """
+        Closes the cursor.
+        """
+        self._cursor.close()
+        self._rows = []
+
+
+class SQLiteConnection:
+    """
+    Class SQLiteConnection
+    An SQLite database file opened with the MySQL connection methods the DAO and the connection pool use.
+    It may be handed from thread to thread by the pool, but is only used by one thread at a time.
+
+    :param path: The database file
+    :type path: str
+    :param pragmas: Optional, the (name, value) PRAGMAs set on the connection, in order
+    :type pragmas: list
+    """
+
+    def __init__(self, path, pragmas=()):
+        self.path = path
+        try:
+            self.db = sqlite3.connect(path, detect_types=sqlite3.PARSE_DECLTYPES, check_same_thread=False,
+                                      cached_statements=256)
+            for name, value in pragmas:
+                self.db.execute("PRAGMA {} = {};".format(name, value))
+        except sqlite3.Error as err:
+            _raise_mysql_error(err)
+
+    def cursor(self, buffered=True, prepared=False):
+        """
+        Makes a cursor. SQLite keeps its own cache of compiled statements, so there is no separate prepared cursor.
+
+        :param buffered: Ignored, results are always read in full
+        :type buffered: bool
+        :param prepared: Ignored
+        :type prepared: bool
+        :return: The cursor
+        :rtype: SQLiteCursor
+        """
+        return SQLiteCursor(self)
+
+    def commit(self):
+        try:
+            self.db.commit()
+        except sqlite3.Error as err:
+            _raise_mysql_error(err)
+
+    def rollback(self):
+        try:
+            self.db.rollback()
+        except sqlite3.Error as err:
+            _raise_mysql_error(err)
+
+    def is_connected(self):
+        try:
+            self.db.execute("SELECT 1;")
+            return True
+        except sqlite3.Error:
+            return False
+
+    def close(self):
+        self.db.close()
+
+
+def get_sqlite_path(config):
+    """
+    Reads the database file from the [SQLITE] section of the connection config. A relative path is taken from the
+    base project directory.
+
+    :param config: The parsed connection config
+    :type config: configparser.ConfigParser
+    :return: The path of the database file
+    :rtype: str
+    """
+    path = config.get('SQLITE', 'path', fallback='data/milestone4.sqlite').strip()
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), path)
+
+
+def get_pragmas(config):
+    """
+    Lists the PRAGMAs set on every connection, from the [SQLITE] section of the connection config. By default the
+    database is in WAL mode, so readers do not block the writer, and syncs only at checkpoints.
+
+    :param config: The parsed connection config
+    :type config: configparser.ConfigParser
+    :return: List of (name, value) tuples
+    :rtype: list
+    """
+    return [
+        ('journal_mode', config.get('SQLITE', 'journal_mode', fallback='WAL')),
+        ('synchronous', config.get('SQLITE', 'synchronous', fallback='NORMAL')),
+        ('busy_timeout', config.getint('SQLITE', 'busy_timeout', fallback=5000)),
+        ('cache_size', -1024 * config.getint('SQLITE', 'cache_size_mb', fallback=64)),
+        ('mmap_size', 1024 * 1024 * config.getint('SQLITE', 'mmap_size_mb', fallback=256)),
+        ('temp_store', 'MEMORY'),
+        ('foreign_keys', 'ON' if config.getboolean('SQLITE', 'foreign_keys', fallback=True) else 'OFF'),
+    ]
+
+
+def connect_sqlite(config):
+    """
+    Opens the SQLite database of the connection config, creating the file if needed.
+
+    :param config: The parsed connection config
+    :type config: configparser.ConfigParser
+    :raises [mysql.connector.Error]: If the file cannot be opened
+    :return: The connection
+    :rtype: SQLiteConnection
+    """
+    return SQLiteConnection(get_sqlite_path(config), get_pragmas(config))
+
+
+def mysql_literals_to_sqlite(statement):
+    """
+    Rewrites the backslash escapes in the string literals of a MySQL statement, such as a line of a mysqldump file,
+    as SQLite has none.
+
+    :param statement: The MySQL statement
+    :type statement: str
+    :return: The same statement with SQLite string literals
+    :rtype: str
+    """
+    if '\\' not in statement:
+        return statement
+    return _STRING.sub(lambda match: "'" + re.sub(r'\\(.)', lambda escape: _ESCAPES.get(escape.group(1),
+                                                                                      escape.group(1)),
+                                                    match.group(1), flags=re.DOTALL) + "'", statement)
+
+
+def load_dump(cnx, dump):
+    """
+    Creates the tables and loads the rows of a mysqldump file, such as `data/Milestone_4_Dump.mysql`, then brings
+    the schema up to date. Only the INSERT statements of the tables in schema.TABLES are run, the MySQL DDL is not.
+
+    :param cnx: A connection to an empty database
+    :type cnx: SQLiteConnection
+    :param dump: The dump, as a text file object
+    :type dump: file
+    :raises [mysql.connector.Error]: If a statement fails
+    :return: Dictionary of table name to the number of rows loaded
+    :rtype: dict
+    """
+    tables = {name.upper(): name for name, ddl in TABLES}
+    loaded = {}
+    cursor = cnx.cursor()
+    # Like mysqldump's FOREIGN_KEY_CHECKS=0: the dump is not in dependency order
+    foreign_keys = cnx.db.execute("PRAGMA foreign_keys;").fetchone()[0]
+    cnx.db.execute("PRAGMA foreign_keys = OFF;")
+    try:
+        for name, ddl in TABLES:
+            cursor.execute(ddl)
+        statement = []
+        for line in dump:
+            if not statement and not line.startswith('INSERT INTO'):
+                continue
+            statement.append(line)
+            if not line.rstrip().endswith(';'):
+                continue
+            text = ''.join(statement)
+            statement = []
+            table = tables.get(_INSERT_TABLE.match(text).group(1).upper())
+            if table is None:
+                continue
+            # Run as it is, not through translate(), as the rows may hold text such as %s
+            try:
+                loaded[table] = loaded.get(table, 0) + cnx.db.execute(mysql_literals_to_sqlite(text)).rowcount
+            except sqlite3.Error as err:
+                _raise_mysql_error(err)
+        cnx.commit()
+    finally:
+        cnx.db.execute("PRAGMA foreign_keys = {};".format(foreign_keys))
+    ensure_schema(cursor)
+    cnx.commit()
+    return loaded
+
+
+if __name__ == '__main__':
+    from MySQL_DAO import MySQLConnectionManager, read_connection_config
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('command', choices=['load'])
+    parser.add_argument('dump', help="a mysqldump file")
+    parser.add_argument('--database', help="the SQLite file to create, as configured in [SQLITE] by default")
+    args = parser.parse_args()
+    path = args.database or get_sqlite_path(read_connection_config(MySQLConnectionManager.config_file))
+    if os.path.exists(path):
+        parser.error("%s already exists" % path)
+    connection = SQLiteConnection(path, get_pragmas(read_connection_config(MySQLConnectionManager.config_file)))
+    with open(args.dump, encoding='utf-8') as f:
+        for table, count in load_dump(connection, f).items():
+            print("%s: %d rows" % (table, count))
+    connection.close()
@@ -0,0 +1,82 @@
+import io
+import itertools
+import json
+import unittest
+
+from MySQL_DAO import MySQL_DAO
+from ais_generator import AISGenerator, write_messages
+from ais_stream import iter_ais_messages
+
+PORTS = [{"Id": 381, "Name": "Nyborg", "Latitude": 55.298889, "Longitude": 10.810833},
+         {"Id": 382, "Name": "Nysted", "Latitude": 54.662778, "Longitude": 11.733056}]
+
+
+class AISGeneratorTest(unittest.TestCase):
+
+    def test_reproducible(self):
+        """
+        Class `AISGenerator` makes the same messages from the same seed, and different ones from another seed.
+        """
+        first = list(AISGenerator(vessels=20, seed=1).messages(500))
+        self.assertEqual(first, list(AISGenerator(vessels=20, seed=1).messages(500)))
+        self.assertNotEqual(first, list(AISGenerator(vessels=20, seed=2).messages(500)))
+
+    def test_messages(self):
+        """
+        Function `messages` makes position reports on the map and static data, in timestamp order.
+        """
+        messages = list(AISGenerator(vessels=50).messages(duration=3600))
+        self.assertEqual(len({msg['MMSI'] for msg in messages}), 50)
+        timestamps = [msg['Timestamp'] for msg in messages]
+        self.assertEqual(timestamps, sorted(timestamps))
+        self.assertTrue(timestamps[-1] <= "2020-11-18T01:00:00.000Z")
+        for msg in messages:
+            if msg['MsgType'] == 'position_report':
+                lat, long = msg['Position']['coordinates']
+                self.assertTrue(54.5 <= lat <= 57.5 and 7.0 <= long <= 13.0)
+        # About one report every 10 seconds, and static data every 6 minutes, per vessel
+        reports = sum(1 for msg in messages if msg['MsgType'] == 'position_report')
+        statics = sum(1 for msg in messages if msg['MsgType'] == 'static_data')
+        self.assertTrue(50 * 300 <= reports <= 50 * 460)
+        self.assertTrue(50 * 10 <= statics <= 50 * 11)
+
+    def test_ports(self):
+        """
+        Class `AISGenerator` gives static data a destination drawn from the ports.
+        """
+        messages = list(AISGenerator(vessels=10, ports=PORTS).messages(1000))
+        statics = [msg for msg in messages if msg['MsgType'] == 'static_data']
+        self.assertTrue(statics)
+        for msg in statics:
+            self.assertTrue((msg['DestinationId'], msg['Destination']) in [(p['Id'], p['Name']) for p in PORTS])
+
+    def test_insert_ais_batch_interface(self):
+        """
+        Function `insert_ais_batch` accepts the generated messages.
+        """
+        tmb = MySQL_DAO(True)
+        messages = list(AISGenerator(vessels=10, ports=PORTS).messages(100))
+        self.assertEqual(json.loads(tmb.insert_ais_batch(json.dumps(messages))), {"inserts": 100})
+        self.assertEqual(len(tmb.prepare_ais_messages(messages)), 100)
+
+    def test_write_messages(self):
+        """
+        Function `write_messages` writes NDJSON or a JSON array that reads back as the same messages.
+        """
+        messages = list(AISGenerator(vessels=5).messages(50))
+        for array in (False, True):
+            out = io.StringIO()
+            self.assertEqual(write_messages(iter(messages), out, array), 50)
+            out.seek(0)
+            self.assertEqual(list(iter_ais_messages(out)), messages)
+
+    def test_stream(self):
+        """
+        Class `AISGenerator` makes messages one at a time, without a limit.
+        """
+        stream = iter(AISGenerator(vessels=3))
+        self.assertEqual(len(list(itertools.islice(stream, 10000))), 10000)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
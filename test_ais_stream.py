@@ -0,0 +1,66 @@
+import io
+import json
+import unittest
+
+from ais_stream import iter_ais_messages, AISStreamError
+
+
+class AISStreamTest(unittest.TestCase):
+    messages = [{"Timestamp": "2020-11-18T00:00:00.000Z", "Class": "Class A", "MMSI": 304858000,
+                 "MsgType": "position_report",
+                 "Position": {"type": "Point", "coordinates": [55.218332, 13.371672]}, "SoG": 10.8},
+                {"Timestamp": "2020-11-18T00:00:00.000Z", "Class": "AtoN", "MMSI": 992111840,
+                 "MsgType": "static_data", "IMO": "Unknown", "Name": "WIND FARM BALTIC1NW", "Length": 60}]
+
+    def test_iter_ais_messages_1(self):
+        """
+        Function `iter_ais_messages` parses a JSON array read in chunks of any size.
+        """
+        text = json.dumps(self.messages)
+        for read_size in (1, 7, 65536):
+            self.assertEqual(list(iter_ais_messages(io.StringIO(text), read_size=read_size)), self.messages)
+            self.assertEqual(list(iter_ais_messages(io.BytesIO(text.encode()), read_size=read_size)), self.messages)
+
+    def test_iter_ais_messages_2(self):
+        """
+        Function `iter_ais_messages` parses NDJSON from a file object or from a list of lines, skipping blank lines.
+        """
+        lines = [json.dumps(msg) for msg in self.messages]
+        self.assertEqual(list(iter_ais_messages(io.StringIO("\n\n".join(lines) + "\n"), read_size=5)), self.messages)
+        self.assertEqual(list(iter_ais_messages(lines)), self.messages)
+
+    def test_iter_ais_messages_3(self):
+        """
+        Function `iter_ais_messages` does not mistake a number cut by a chunk boundary for a whole value.
+        """
+        source = io.BytesIO('[{"Name": "Øresund"}, 12 , 3.5, true]'.encode())
+        self.assertEqual(list(iter_ais_messages(source, read_size=1)), [{"Name": "Øresund"}, 12, 3.5, True])
+
+    def test_iter_ais_messages_4(self):
+        """
+        Function `iter_ais_messages` returns nothing for empty input.
+        """
+        self.assertEqual(list(iter_ais_messages(io.StringIO("  "))), [])
+        self.assertEqual(list(iter_ais_messages(io.StringIO(" [ ] "))), [])
+
+    def test_iter_ais_messages_5(self):
+        """
+        Function `iter_ais_messages` raises AISStreamError on malformed input, including bytes that are not UTF-8.
+        """
+        for text in ['[{"MMSI": 1},]', '[{"MMSI": 1} {"MMSI": 2}]', '[{"MMSI": 1}', '[{"MMSI": 1}] x',
+                     '{"MMSI": 1}\nNot JSON']:
+            with self.assertRaises(AISStreamError):
+                list(iter_ais_messages(io.StringIO(text), read_size=2))
+        with self.assertRaises(AISStreamError):
+            list(iter_ais_messages(io.BytesIO(b'{"Name": "\xff"}')))
+
+    def test_iter_ais_messages_6(self):
+        """
+        Function `iter_ais_messages` refuses a message longer than the maximum size instead of buffering the input.
+        """
+        with self.assertRaises(ValueError):
+            list(iter_ais_messages(io.StringIO('{"Name": "' + 'x' * 1000), read_size=10, max_message_size=100))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,67 @@
+import asyncio
+import json
+import threading
+import time
+import unittest
+
+from MySQL_DAO import MySQL_DAO
+from async_dao import AsyncMySQL_DAO
+
+
+class SleepingDAO:
+    """
+    Stands in for the DAO, blocking its thread for a while on every call.
+    """
+
+    def __init__(self):
+        self.threads = set()
+
+    def wait(self, seconds):
+        self.threads.add(threading.current_thread().name)
+        time.sleep(seconds)
+        return seconds
+
+
+class AsyncDAOTest(unittest.TestCase):
+    batch = json.dumps([{"Timestamp": "2020-11-18T00:00:00.000Z", "Class": "Class A", "MMSI": mmsi,
+                         "MsgType": "position_report",
+                         "Position": {"type": "Point", "coordinates": [55.218332, 13.371672]},
+                         "Status": "Under way using engine", "SoG": 10.8, "CoG": 94.3, "Heading": 97}
+                        for mmsi in range(7)])
+
+    def test_same_results(self):
+        """
+        Class `AsyncMySQL_DAO` returns what the methods of `MySQL_DAO` return, and passes other attributes through.
+        """
+        async def run():
+            async with AsyncMySQL_DAO(True, max_workers=2) as dao:
+                self.assertEqual(dao.is_stub, True)
+                self.assertEqual(dao.bulk_chunk_size, MySQL_DAO.bulk_chunk_size)
+                return await asyncio.gather(dao.insert_ais_batch(self.batch), dao.insert_ais_batch("Not JSON"),
+                                            dao.select_all_recent_in_tile(5037))
+
+        tmb = MySQL_DAO(True)
+        self.assertEqual(asyncio.run(run()), [tmb.insert_ais_batch(self.batch), -1,
+                                              tmb.select_all_recent_in_tile(5037)])
+
+    def test_concurrency(self):
+        """
+        Class `AsyncMySQL_DAO` runs up to `max_workers` blocking calls at once, and queues the others.
+        """
+        async def run(max_workers):
+            async with AsyncMySQL_DAO(True, max_workers=max_workers) as dao:
+                dao.dao = SleepingDAO()
+                start = time.monotonic()
+                await asyncio.gather(*[dao.wait(0.1) for _ in range(4)])
+                return time.monotonic() - start, len(dao.dao.threads)
+
+        duration, threads = asyncio.run(run(4))
+        self.assertTrue(duration < 0.3)
+        self.assertEqual(threads, 4)
+        duration, threads = asyncio.run(run(1))
+        self.assertTrue(duration >= 0.4)
+        self.assertEqual(threads, 1)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -1,16 +1,54 @@
 import base64
 import configparser
+import contextlib
+import io
 import os
 import unittest
 import json
 from decimal import Decimal
 
-from MySQL_DAO import MySQL_DAO, MySQLCursorManager, MySQLConnectionManager
+from MySQL_DAO import MySQL_DAO, MySQLCursorManager, MySQLConnectionManager, read_connection_config, \
+    get_connection_pool, parse_ais_timestamp, get_backend
+from sqlite_backend import get_sqlite_path, load_dump
+from instrumentation import count_queries
+import dateutil.parser
 import mysql.connector
 from mysql.connector import errorcode
 from datetime import datetime
 
 
+class InterleavedCursor:
+    """
+    Stands in for a cursor on a server in the given auto-increment lock mode, where the ids read back for a batch
+    marker can differ from a consecutive block.
+    """
+
+    def __init__(self, lock_mode, read_back):
+        self.lock_mode = lock_mode
+        self.read_back = read_back
+        self.lastrowid = None
+        self.result = None
+        self.rows = []
+        self.queries = []
+
+    def execute(self, operation, params=None):
+        self.queries.append((operation, params))
+        if '@@innodb_autoinc_lock_mode' in operation:
+            self.result = [(1, self.lock_mode)]
+        else:
+            self.result = [(row_id,) for row_id in self.read_back]
+
+    def executemany(self, operation, seq_params):
+        self.rows.extend(seq_params)
+        self.lastrowid = 11
+
+    def fetchone(self):
+        return self.result[0]
+
+    def fetchall(self):
+        return self.result
+
+
 class TMBTest(unittest.TestCase):
     batch = """[ {\"Timestamp\":\"2020-11-18T00:00:00.000Z\",\"Class\":\"Class A\",\"MMSI\":304858000,\"MsgType\":\"position_report\",\"Position\":{\"type\":\"Point\",\"coordinates\":[55.218332,13.371672]},\"Status\":\"Under way using engine\",\"SoG\":10.8,\"CoG\":94.3,\"Heading\":97},
                 {\"Timestamp\":\"2020-11-18T00:00:00.000Z\",\"Class\":\"AtoN\",\"MMSI\":992111840,\"MsgType\":\"static_data\",\"IMO\":\"Unknown\",\"Name\":\"WIND FARM BALTIC1NW\",\"VesselType\":\"Undefined\",\"Length\":60,\"Breadth\":60,\"A\":30,\"B\":30,\"C\":30,\"D\":30},
@@ -20,6 +58,17 @@ class TMBTest(unittest.TestCase):
                 {\"Timestamp\":\"2020-11-18T00:00:00.000Z\",\"Class\":\"Class A\",\"MMSI\":257385000,\"MsgType\":\"position_report\",\"Position\":{\"type\":\"Point\",\"coordinates\":[55.219403,13.127725]},\"Status\":\"Under way using engine\",\"RoT\":25.7,\"SoG\":12.3,\"CoG\":96.5,\"Heading\":101},
                 {\"Timestamp\":\"2020-11-18T00:00:00.000Z\",\"Class\":\"Class A\",\"MMSI\":376503000,\"MsgType\":\"position_report\",\"Position\":{\"type\":\"Point\",\"coordinates\":[54.519373,11.47914]},\"Status\":\"Under way using engine\",\"RoT\":0,\"SoG\":7.6,\"CoG\":294.4,\"Heading\":290} ]"""
 
+    @contextlib.contextmanager
+    def assertQueryBudget(self, statements, connections=1):
+        """
+        Fails if the block runs more statements, or checks out more connections, than its budget. Call the DAO method
+        once before, so that the one-off schema check and MAP_VIEW read are not counted.
+        """
+        with count_queries() as queries:
+            yield queries
+        self.assertLessEqual(len(queries), statements, queries.report())
+        self.assertLessEqual(queries.connections, connections, queries.report())
+
     def test_format_ais_message_1(self):
         """
         Function `format_ais_message` will format any dictionary to include the keys needed for an AIS Message.
@@ -49,6 +98,24 @@ class TMBTest(unittest.TestCase):
         ais_message_data = tmb.format_ais_message({"IMO": "Unknown"})
         self.assertTrue(ais_message_data['IMO'] is None)
 
+    def test_parse_ais_timestamp_1(self):
+        """
+        Function `parse_ais_timestamp` gives the same result as dateutil for regular and irregular timestamps.
+        """
+        for value in ["2020-11-18T00:00:00.000Z", "2020-11-18T00:00:00", "2026-10-17T12:34:56.123456",
+                      "2020-11-18T23:59:59+01:00", "2020-11-18T23:59:59-0530", "2020-11-18T24:00:00Z", "2020-11-18",
+                      "2020-11-18T10:00Z", "20201118T100000Z", "2020-02-29T00:00:00Z"]:
+            self.assertEqual(parse_ais_timestamp(value),
+                             dateutil.parser.isoparse(value).strftime("%Y-%m-%d %H:%M:%S"))
+
+    def test_parse_ais_timestamp_2(self):
+        """
+        Function `parse_ais_timestamp` raises ValueError on invalid timestamps, like dateutil.
+        """
+        for value in ["2020-13-18T00:00:00Z", "2021-02-29T00:00:00Z", "2020-11-18T00:00:60Z", "Not a date"]:
+            with self.assertRaises(ValueError):
+                parse_ais_timestamp(value)
+
     def test_format_position_report_1(self):
         """
         Function `format_position_report` will format any dictionary to include the keys needed for a Position Report.
@@ -151,7 +218,7 @@ class TMBTest(unittest.TestCase):
             with MySQLConnectionManager() as con:
                 with MySQLCursorManager(con) as cursor:
                     cursor.execute(
-                        """SELECT * FROM AIS_MESSAGE;""")
+                        """SELECT Id, Timestamp, MMSI, Class, Vessel_IMO FROM AIS_MESSAGE;""")
                     ais = cursor.fetchall()
                     cursor.execute(
                         """SELECT * FROM POSITION_REPORT;""")
@@ -171,6 +238,68 @@ class TMBTest(unittest.TestCase):
 
         self.assertTrue((ais == ais_actual and pos == pos_actual and stat == stat_actual))
 
+    def test_insert_ais_batch_actual_3(self):
+        """
+        Function `insert_ais_batch` writes the same rows in bulk mode as it does message by message.
+        """
+        tmb = MySQL_DAO()
+        tables = []
+        for bulk in (False, True):
+            tmb.delete_ais_messages()
+            inserted = json.loads(tmb.insert_ais_batch(self.batch, bulk=bulk))
+            self.assertEqual(inserted['inserts'], 7)
+            with MySQLConnectionManager() as con:
+                with MySQLCursorManager(con) as cursor:
+                    cursor.execute("""SELECT Id, Timestamp, MMSI, Class, Vessel_IMO FROM AIS_MESSAGE;""")
+                    ais = cursor.fetchall()
+                    cursor.execute("""SELECT * FROM POSITION_REPORT;""")
+                    pos = cursor.fetchall()
+                    cursor.execute("""SELECT * FROM STATIC_DATA;""")
+                    stat = cursor.fetchall()
+            tables.append((ais, pos, stat))
+        self.assertEqual(tables[0], tables[1])
+
+    def test_prepare_ais_messages(self):
+        """
+        Function `prepare_ais_messages` formats every message of a batch without changing the input dictionaries.
+        """
+        tmb = MySQL_DAO(True)
+        messages = json.loads(self.batch)
+        prepared = tmb.prepare_ais_messages(messages)
+        self.assertEqual(len(prepared), 7)
+        self.assertEqual(prepared[0]['ais'], ('2020-11-18 00:00:00', 304858000, 'Class A'))
+        self.assertEqual(prepared[0]['position'][1:3], (13.371672, 55.218332))
+        self.assertEqual(prepared[1]['static'][2], 'WIND FARM BALTIC1NW')
+        self.assertEqual(messages[0]['Timestamp'], "2020-11-18T00:00:00.000Z")
+
+    def test_insert_ais_stream_interface_1(self):
+        """
+        Function `insert_ais_stream` takes a file object holding a JSON array and returns the number of messages.
+        """
+        tmb = MySQL_DAO(True)
+        inserted = json.loads(tmb.insert_ais_stream(io.StringIO(self.batch), chunk_size=3))
+        self.assertEqual(inserted, {"inserts": 7})
+
+    def test_insert_ais_stream_interface_2(self):
+        """
+        Function `insert_ais_stream` takes NDJSON lines and returns -1 if a line is not parsable JSON.
+        """
+        tmb = MySQL_DAO(True)
+        lines = [json.dumps(msg) for msg in json.loads(self.batch)]
+        self.assertEqual(json.loads(tmb.insert_ais_stream(lines)), {"inserts": 7})
+        self.assertEqual(tmb.insert_ais_stream(lines + ["Not JSON"]), -1)
+
+    def test_insert_ais_stream_actual(self):
+        """
+        Function `insert_ais_stream` inserts every message of an NDJSON file.
+        """
+        tmb = MySQL_DAO()
+        tmb.delete_ais_messages()
+        ndjson = "\n".join(json.dumps(msg) for msg in json.loads(self.batch))
+        inserted = json.loads(tmb.insert_ais_stream(io.StringIO(ndjson), chunk_size=2))
+        self.assertEqual(inserted['inserts'], 7)
+        tmb.delete_ais_messages()
+
     def test_insert_ais_message_interface_1(self):
         """
         Function `insert_ais_message` exists, takes in a dictionary, and checks the type of message passed in.
@@ -221,7 +350,7 @@ class TMBTest(unittest.TestCase):
             with MySQLConnectionManager() as con:
                 with MySQLCursorManager(con) as cursor:
                     cursor.execute(
-                        """SELECT * FROM AIS_MESSAGE;""")
+                        """SELECT Id, Timestamp, MMSI, Class, Vessel_IMO FROM AIS_MESSAGE;""")
                     ais = cursor.fetchall()
                     cursor.execute(
                         """SELECT * FROM POSITION_REPORT;""")
@@ -254,7 +383,7 @@ class TMBTest(unittest.TestCase):
             with MySQLConnectionManager() as con:
                 with MySQLCursorManager(con) as cursor:
                     cursor.execute(
-                        """SELECT * FROM AIS_MESSAGE;""")
+                        """SELECT Id, Timestamp, MMSI, Class, Vessel_IMO FROM AIS_MESSAGE;""")
                     ais = cursor.fetchall()
                     cursor.execute(
                         """SELECT * FROM POSITION_REPORT;""")
@@ -273,6 +402,85 @@ class TMBTest(unittest.TestCase):
                 print(err)
         self.assertTrue(ais == ais_actual and stat == stat_actual and pos == [])
 
+    def test_insert_ais_message_actual_4(self):
+        """
+        Function `insert_ais_message` links a position report to the latest static data of its vessel.
+        """
+        tmb = MySQL_DAO()
+        tmb.delete_ais_messages()
+        tmb.insert_ais_batch(self.batch)
+        tmb.insert_ais_message(json.loads(
+            "{\"Timestamp\":\"2020-11-18T00:01:00.000Z\",\"Class\":\"Class A\",\"MMSI\":636092297,\"MsgType\":\"position_report\",\"Position\":{\"type\":\"Point\",\"coordinates\":[55.00316,12.809015]},\"Status\":\"Under way using engine\",\"RoT\":0,\"SoG\":0.2,\"CoG\":225.6,\"Heading\":240}"))
+        with MySQLConnectionManager() as con:
+            with MySQLCursorManager(con) as cursor:
+                cursor.execute("""SELECT LastStaticData_Id FROM POSITION_REPORT ORDER BY AISMessage_Id DESC LIMIT 1;""")
+                last_static = cursor.fetchone()[0]
+                cursor.execute("""SELECT AISMessage_Id FROM VESSEL_LAST_STATIC WHERE MMSI = 636092297;""")
+                pointer = cursor.fetchone()[0]
+        self.assertEqual(last_static, 5)
+        self.assertEqual(pointer, 5)
+
+    def test_insert_ais_message_after_retention_actual(self):
+        """
+        Function `insert_ais_message` does not link a position report to static data that retention has deleted.
+        """
+        tmb = MySQL_DAO()
+        tmb.delete_ais_messages()
+        tmb.insert_ais_batch(self.batch)
+        tmb.delete_old_ais_messages(chunk_size=100, pause=0)
+        result = tmb.insert_ais_message(json.loads(
+            "{\"Timestamp\":\"2020-11-18T00:01:00.000Z\",\"Class\":\"Class A\",\"MMSI\":636092297,\"MsgType\":\"position_report\",\"Position\":{\"type\":\"Point\",\"coordinates\":[55.00316,12.809015]},\"Status\":\"Under way using engine\",\"RoT\":0,\"SoG\":0.2,\"CoG\":225.6,\"Heading\":240}"))
+        with MySQLConnectionManager() as con:
+            with MySQLCursorManager(con) as cursor:
+                cursor.execute("""SELECT LastStaticData_Id FROM POSITION_REPORT;""")
+                links = cursor.fetchall()
+        tmb.delete_ais_messages()
+        self.assertEqual(json.loads(result), {"success": 1})
+        self.assertEqual(links, [(None,)])
+
+    def test_insert_ais_message_actual_5(self):
+        """
+        Function `insert_ais_message` keeps the latest position of a vessel in VESSEL_LATEST, even when an older
+        message arrives last.
+        """
+        tmb = MySQL_DAO()
+        tmb.delete_ais_messages()
+        message = "{\"Timestamp\":\"%s\",\"Class\":\"Class A\",\"MMSI\":636092297,\"MsgType\":\"position_report\",\"Position\":{\"type\":\"Point\",\"coordinates\":[%s,12.809015]},\"Status\":\"Under way using engine\",\"RoT\":0,\"SoG\":0.2,\"CoG\":225.6,\"Heading\":240}"
+        tmb.insert_ais_message(json.loads(message % ("2020-11-18T00:02:00.000Z", "55.00316")))
+        tmb.insert_ais_message(json.loads(message % ("2020-11-18T00:01:00.000Z", "55.244508")))
+        results = json.loads(tmb.select_most_recent_from_mmsi(636092297))
+        self.assertEqual(results, {"MMSI": 636092297, "lat": 55.00316, "long": 12.809015, "IMO": None})
+
+    def test_insert_many_interleaved(self):
+        """
+        Function `insert_many` works out the ids of a multi-row insert in the consecutive lock modes, and reads them back
+        by batch marker in the interleaved lock mode, raising if fewer ids than rows are read back.
+        """
+        tmb = MySQL_DAO()
+        saved = MySQL_DAO.auto_increment
+        stmt = """INSERT INTO AIS_MESSAGE(MMSI, Batch) VALUES(%s, %s);"""
+        try:
+            MySQL_DAO.auto_increment = None
+            cursor = InterleavedCursor(1, [])
+            self.assertEqual(tmb.insert_many(cursor, stmt, [(1,), (2,), (3,)], auto_ids=True), [11, 12, 13])
+            self.assertEqual(MySQL_DAO.auto_increment, (1, True))
+            self.assertEqual(cursor.rows, [(1, None), (2, None), (3, None)])
+            self.assertEqual(len(cursor.queries), 1)
+
+            MySQL_DAO.auto_increment = None
+            cursor = InterleavedCursor(2, [11, 13, 14])
+            self.assertEqual(tmb.insert_many(cursor, stmt, [(1,), (2,), (3,)], auto_ids=True), [11, 13, 14])
+            self.assertEqual(MySQL_DAO.auto_increment, (1, False))
+            batch = cursor.rows[0][1]
+            self.assertIsNotNone(batch)
+            self.assertEqual(cursor.rows, [(1, batch), (2, batch), (3, batch)])
+            self.assertEqual(cursor.queries[-1][1], (11, batch, 3))
+
+            self.assertRaises(mysql.connector.Error, tmb.insert_many, InterleavedCursor(2, [11, 13]), stmt,
+                              [(1,), (2,), (3,)], auto_ids=True)
+        finally:
+            MySQL_DAO.auto_increment = saved
+
     def test_delete_ais_messages_interface(self):
         """
         Function `delete_ais_messages` exists and returns a success message.
@@ -362,6 +570,19 @@ class TMBTest(unittest.TestCase):
         self.assertTrue(
             'deletions' in deletes and type(deletes['deletions']) is int and deletes['deletions'] == 7 and count == 1)
 
+    def test_delete_old_ais_messages_actual_3(self):
+        """
+        Function `delete_old_ais_messages` deletes in chunks, reporting the running count after each chunk.
+        """
+        tmb = MySQL_DAO()
+        tmb.delete_ais_messages()
+        tmb.insert_ais_batch(self.batch)
+        progress = []
+        deletes = json.loads(tmb.delete_old_ais_messages(chunk_size=3, pause=0, progress=progress.append))
+        self.assertEqual(deletes, {"deletions": 7})
+        self.assertEqual(progress, [3, 6, 7])
+        self.assertEqual(json.loads(tmb.select_all_recent_positions()), {"vessels": []})
+
     def test_create_vessel_document_1(self):
         """
         Function `create_vessel_document` exists and returns a vessel document based on a vessel array.
@@ -442,6 +663,19 @@ class TMBTest(unittest.TestCase):
         results = tmb.get_optional_vessel_data(636092297)
         self.assertEqual(results, ['Johann', 9534298])
 
+    def test_get_optional_vessel_data_many(self):
+        """
+        Function `get_optional_vessel_data_many` gives the same values as `get_optional_vessel_data` for every vessel.
+        """
+        tmb = MySQL_DAO()
+        tmb.delete_ais_messages()
+        tmb.insert_ais_batch(self.batch)
+        mmsis = [304858000, 219005465, 636092297, 257385000, 376503000, 333]
+        with MySQLConnectionManager() as con:
+            with MySQLCursorManager(con) as cursor:
+                results = tmb.get_optional_vessel_data_many(cursor, mmsis)
+        self.assertEqual(results, {mmsi: tmb.get_optional_vessel_data(mmsi) for mmsi in mmsis})
+
     def test_get_vessel_imo_1(self):
         """
         Function `get_vessel_imo` exists, takes in an MMSI, and returns an IMO.
@@ -1083,6 +1317,26 @@ class TMBTest(unittest.TestCase):
             file_data = base64.b64encode(f.read())
             self.assertEqual(results, file_data)
 
+    def test_given_tile_id_get_tile_raw_interface(self):
+        """
+        Function `given_tile_id_get_tile_raw` exists and takes in a tile Id.
+        """
+        tmb = MySQL_DAO(True)
+        results = tmb.given_tile_id_get_tile_raw(50361)
+        self.assertEqual(results['content_type'], "image/png")
+
+    def test_given_tile_id_get_tile_raw_actual(self):
+        """
+        Function `given_tile_id_get_tile_raw` returns the bytes of the map tile file with its ETag, or -1.
+        """
+        tmb = MySQL_DAO()
+        results = tmb.given_tile_id_get_tile_raw(50361)
+        path = os.path.abspath(os.path.join(os.path.dirname(__file__), 'data', 'denmark_tiles', '38F71.png'))
+        with open(path, 'rb') as f:
+            self.assertEqual(results['data'].tobytes(), f.read())
+        self.assertEqual(results['etag'], tmb.given_tile_id_get_tile_raw(50361)['etag'])
+        self.assertEqual(tmb.given_tile_id_get_tile_raw(8675309), -1)
+
     def test_get_tile_1(self):
         """
         Function `get_tile` returns the calculated boundaries of a tile at scale 1.
@@ -1113,6 +1367,113 @@ class TMBTest(unittest.TestCase):
 
         self.assertEqual(results, {'south': 54.5, 'north': 54.75, 'west': 11.0, 'east': 11.5})
 
+    def test_read_connection_config(self):
+        """
+        Function `read_connection_config` parses the config file only once per process.
+        """
+        config = read_connection_config(MySQLConnectionManager.config_file)
+        self.assertTrue(config is read_connection_config(MySQLConnectionManager.config_file))
+        self.assertEqual(config['SQL']['database'], 'milestone4')
+
+    def test_connection_pool_actual_1(self):
+        """
+        The connection pool reuses its connections across DAO calls instead of opening new ones.
+        """
+        tmb = MySQL_DAO()
+        tmb.get_vessel_name(636092297)
+        created = get_connection_pool().stats['created']
+        for _ in range(5):
+            tmb.get_vessel_name(636092297)
+        self.assertEqual(get_connection_pool().stats['created'], created)
+
+    def test_connection_pool_actual_2(self):
+        """
+        Nested checkouts in the same thread share one connection, so nested DAO calls cannot exhaust the pool.
+        """
+        with MySQLConnectionManager() as outer:
+            with MySQLConnectionManager() as inner:
+                self.assertTrue(outer is inner)
+
+
+    def test_insert_ais_batch_budget(self):
+        """
+        Function `insert_ais_batch` runs a fixed number of statements, however many messages are in the batch.
+        """
+        tmb = MySQL_DAO()
+        tmb.insert_ais_batch(self.batch)
+        tmb.delete_ais_messages()
+        with self.assertQueryBudget(9):
+            tmb.insert_ais_batch(self.batch)
+
+    def test_insert_ais_message_budget(self):
+        """
+        Function `insert_ais_message` runs at most 3 statements for a position report and 5 for static data of a
+        known vessel.
+        """
+        tmb = MySQL_DAO()
+        messages = json.loads(self.batch)
+        tmb.delete_ais_messages()
+        with self.assertQueryBudget(3):
+            tmb.insert_ais_message(messages[0])
+        with self.assertQueryBudget(5):
+            tmb.insert_ais_message(messages[4])
+
+    def test_delete_old_ais_messages_budget(self):
+        """
+        Function `delete_old_ais_messages` runs a fixed number of statements per chunk, not per message.
+        """
+        tmb = MySQL_DAO()
+        tmb.delete_ais_messages()
+        tmb.insert_ais_batch(self.batch)
+        with self.assertQueryBudget(10):
+            tmb.delete_old_ais_messages(chunk_size=100, pause=0)
+
+    def test_vessel_queries_budget(self):
+        """
+        Functions returning vessel documents look up the optional vessel data of all vessels at once, instead of
+        running queries for every vessel.
+        """
+        tmb = MySQL_DAO()
+        tmb.delete_ais_messages()
+        tmb.insert_ais_batch(self.batch)
+        tmb.select_all_recent_in_tile(5037)
+        with self.assertQueryBudget(3):
+            tmb.select_all_recent_positions()
+        with self.assertQueryBudget(3):
+            tmb.select_all_recent_in_tile(5037)
+        with self.assertQueryBudget(3):
+            tmb.recent_ships_positions_headed_to_given_portId(381)
+        with self.assertQueryBudget(4):
+            tmb.recent_ships_positions_headed_to_given_port("Nysted", "Denmark")
+        with self.assertQueryBudget(4):
+            tmb.read_ship_pos_in_ts3_given_port("Nysted", "Denmark")
+
+    def test_single_vessel_queries_budget(self):
+        """
+        Functions about one vessel run a fixed number of statements on one connection.
+        """
+        tmb = MySQL_DAO()
+        tmb.delete_ais_messages()
+        tmb.insert_ais_batch(self.batch)
+        with self.assertQueryBudget(1):
+            tmb.select_most_recent_from_mmsi(636092297)
+        with self.assertQueryBudget(5):
+            tmb.read_vessel_information(636092297)
+        with self.assertQueryBudget(2):
+            tmb.select_most_recent_5_ship_positions(636092297)
+        with self.assertQueryBudget(2):
+            tmb.create_vessel_document([636092297, 55.244508, 12.967945])
+
+    def test_tile_queries_budget(self):
+        """
+        Functions about tiles answer from the tile tree, without running any statement once it is loaded.
+        """
+        tmb = MySQL_DAO()
+        tmb.given_tile_find_contained_tiles(5036)
+        with self.assertQueryBudget(0, connections=0):
+            tmb.given_tile_find_contained_tiles(5036)
+            tmb.given_tile_id_get_tile(5036)
+
 
 if __name__ == '__main__':
     path = os.path.abspath(os.path.join(os.path.dirname(__file__), 'data', 'Milestone_4_Dump.mysql'))
@@ -1120,6 +1481,16 @@ if __name__ == '__main__':
     config = configparser.ConfigParser()
     config.read(config_file)
 
-    os.system('cat ' + path + ' | mysql -u ' + config['SQL']['user'] + ' --password=' + config['SQL']['password'])
+    # The test database is rebuilt from the dump before every run: into a new SQLite file with backend=sqlite, or
+    # else through the mysql client, with the user and password of the [SQL] section
+    if get_backend(config) == 'sqlite':
+        for suffix in ['', '-wal', '-shm']:
+            if os.path.exists(get_sqlite_path(config) + suffix):
+                os.remove(get_sqlite_path(config) + suffix)
+        with MySQLConnectionManager() as con:
+            with open(path, encoding='utf-8') as f:
+                load_dump(con, f)
+    else:
+        os.system('cat ' + path + ' | mysql -u ' + config['SQL']['user'] + ' --password=' + config['SQL']['password'])
 
     unittest.main(verbosity=2)
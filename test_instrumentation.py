@@ -0,0 +1,159 @@
+import json
+import os
+import tempfile
+import time
+import unittest
+
+from MySQL_DAO import MySQL_DAO
+from instrumentation import Instrumentation, InstrumentedCursor, Histogram, normalize_statement
+
+
+class QueryingDAO:
+    """
+    Stands in for the DAO, with methods that run statements through a cursor and call each other.
+    """
+
+    def __init__(self, cursor):
+        self.cursor = cursor
+
+    def outer(self):
+        self.cursor.execute("""SELECT MMSI FROM VESSEL WHERE IMO IN (%s, %s);""", (1, 2))
+        return self.inner() + 1
+
+    def inner(self):
+        self.cursor.execute("""SELECT MMSI
+                               FROM VESSEL WHERE IMO IN (%s);""", (3,))
+        return 1
+
+    def slow(self):
+        time.sleep(0.02)
+
+
+class RowsCursor:
+    """
+    Stands in for a cursor, returning two rows for every statement.
+    """
+    rowcount = -1
+
+    def execute(self, operation, params=None):
+        if 'FAIL' in operation:
+            raise ValueError("Bad statement")
+        self.rowcount = 2
+
+    def close(self):
+        pass
+
+
+class InstrumentationTest(unittest.TestCase):
+
+    def test_normalize_statement(self):
+        """
+        Function `normalize_statement` collapses whitespace and IN lists of any length.
+        """
+        self.assertEqual(normalize_statement("""SELECT a\n       FROM T WHERE b IN (%s, %s,%s) AND c = %s;"""),
+                         "SELECT a FROM T WHERE b IN (...) AND c = %s;")
+        self.assertEqual(normalize_statement("""DELETE FROM T WHERE b IN (%s);"""),
+                         "DELETE FROM T WHERE b IN (...);")
+
+    def test_histogram(self):
+        """
+        Class `Histogram` counts durations and estimates percentiles to within a bucket.
+        """
+        histogram = Histogram()
+        for ms in [0.05] * 90 + [3] * 9 + [20000]:
+            histogram.add(ms)
+        summary = histogram.summary()
+        self.assertEqual((summary['count'], summary['max_ms']), (100, 20000))
+        self.assertEqual((summary['p50_ms'], summary['p95_ms'], summary['p99_ms']), (0.1, 5, 5))
+        self.assertEqual(histogram.percentile(100), 20000)
+        self.assertEqual(Histogram().percentile(50), 0.0)
+
+    def test_methods_and_statements(self):
+        """
+        Class `Instrumentation` records methods with the statements they and the methods they call ran.
+        """
+        instrumentation = Instrumentation()
+        instrumentation.enable(QueryingDAO)
+        try:
+            dao = QueryingDAO(instrumentation.cursor(RowsCursor()))
+            self.assertEqual(dao.outer(), 2)
+        finally:
+            instrumentation.disable()
+        stats = instrumentation.get_stats()
+        self.assertEqual(stats['statements']["SELECT MMSI FROM VESSEL WHERE IMO IN (...);"]['count'], 2)
+        outer = stats['methods']['QueryingDAO.outer']
+        inner = stats['methods']['QueryingDAO.inner']
+        self.assertEqual((outer['count'], outer['rows'], outer['round_trips']), (1, 4, 2))
+        self.assertEqual((inner['count'], inner['rows'], inner['round_trips']), (1, 2, 1))
+        self.assertTrue(outer['db_ms'] >= inner['db_ms'])
+
+    def test_statement_errors(self):
+        """
+        Class `InstrumentedCursor` records a failed statement and lets its error through.
+        """
+        instrumentation = Instrumentation()
+        instrumentation.enable(QueryingDAO)
+        try:
+            cursor = InstrumentedCursor(RowsCursor(), instrumentation)
+            self.assertRaises(ValueError, cursor.execute, """SELECT FAIL;""")
+        finally:
+            instrumentation.disable()
+        self.assertEqual(instrumentation.get_stats()['statements']["SELECT FAIL;"]['errors'], 1)
+
+    def test_disabled(self):
+        """
+        Class `Instrumentation` leaves the DAO methods and cursors as they are while disabled.
+        """
+        original = MySQL_DAO.prepare_ais_messages
+        instrumentation = Instrumentation()
+        cursor = RowsCursor()
+        self.assertTrue(instrumentation.cursor(cursor) is cursor)
+        instrumentation.enable(MySQL_DAO)
+        try:
+            self.assertTrue(MySQL_DAO.prepare_ais_messages is not original)
+            MySQL_DAO(True).prepare_ais_messages([])
+        finally:
+            instrumentation.disable()
+        self.assertTrue(MySQL_DAO.prepare_ais_messages is original)
+        self.assertEqual(instrumentation.get_stats()['methods']['MySQL_DAO.prepare_ais_messages']['count'], 1)
+
+    def test_counting(self):
+        """
+        Function `counting` counts the statements and connections of a block, even while the instrumentation is
+        disabled, and stops counting when the block ends.
+        """
+        instrumentation = Instrumentation()
+        with instrumentation.counting() as queries:
+            dao = QueryingDAO(instrumentation.cursor(RowsCursor()))
+            instrumentation.record_connection(True)
+            instrumentation.record_connection(False)
+            dao.outer()
+        dao.outer()
+        self.assertEqual(len(queries), 2)
+        self.assertEqual((queries.connections, queries.created), (2, 1))
+        self.assertTrue("2 x SELECT MMSI FROM VESSEL WHERE IMO IN (...);" in queries.report())
+        self.assertTrue(isinstance(instrumentation.cursor(RowsCursor()), RowsCursor))
+        self.assertEqual(instrumentation.get_stats(), {"methods": {}, "statements": {}})
+
+    def test_slow_query_log(self):
+        """
+        Class `Instrumentation` writes the calls slower than the threshold to the slow query log.
+        """
+        path = os.path.join(tempfile.mkdtemp(), 'slow.log')
+        instrumentation = Instrumentation(slow_query_ms=10, slow_query_log=path)
+        instrumentation.enable(QueryingDAO)
+        try:
+            dao = QueryingDAO(instrumentation.cursor(RowsCursor()))
+            dao.outer()
+            dao.slow()
+        finally:
+            instrumentation.disable()
+        with open(path) as f:
+            lines = [json.loads(line) for line in f]
+        os.remove(path)
+        self.assertEqual([(line['kind'], line['name']) for line in lines], [('method', 'QueryingDAO.slow')])
+        self.assertTrue(lines[0]['ms'] >= 10)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
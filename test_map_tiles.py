@@ -0,0 +1,121 @@
+import random
+import unittest
+
+from MySQL_DAO import MySQL_DAO
+from map_tiles import load_map_view, get_map_view, TileResolver, get_tile_resolver, TileTree, np
+
+
+class MapTilesTest(unittest.TestCase):
+
+    def test_load_map_view(self):
+        """
+        Function `load_map_view` reads every tile from the MAP_VIEW JSON mirror.
+        """
+        tiles = load_map_view()
+        self.assertEqual(len(tiles), 171)
+        self.assertEqual(tiles[0]['filename'], 'ROOT.png')
+
+    def test_get_map_view(self):
+        """
+        Function `get_map_view` loads the tiles only once.
+        """
+        self.assertTrue(get_map_view() is get_map_view())
+
+    def test_tile_resolver_1(self):
+        """
+        Class `TileResolver` finds the tile ids of a position at every scale.
+        """
+        self.assertEqual(get_tile_resolver().resolve(54.519373, 11.47914), (1, 5428, 54283))
+
+    def test_tile_resolver_2(self):
+        """
+        Class `TileResolver` finds no tile at scales 2 and 3 for positions outside the map or on a tile edge.
+        """
+        resolver = get_tile_resolver()
+        self.assertEqual(resolver.resolve(55.218332, 13.371672), (1, None, None))
+        self.assertEqual(resolver.resolve(55.0, 11.47914), (1, None, None))
+        self.assertEqual(resolver.resolve(54.6, 11.5), (1, 5428, None))
+
+    def test_tile_resolver_3(self):
+        """
+        Class `TileResolver` gives the same ids as matching the boundaries from `get_tile` against MAP_VIEW.
+        """
+        tiles = load_map_view()
+        by_bounds = {(t['west'], t['east'], t['north'], t['south']): t['id'] for t in tiles}
+        resolver = TileResolver(tiles)
+        tmb = MySQL_DAO(True)
+        rng = random.Random(418)
+        for _ in range(2000):
+            lat, long = rng.uniform(54.0, 58.0), rng.uniform(6.5, 13.5)
+            expected = []
+            for scale in (1, 2, 3):
+                bounds = tmb.get_tile(scale, long, lat)
+                expected.append(by_bounds.get((bounds['west'], bounds['east'], bounds['north'], bounds['south'])))
+            self.assertEqual(resolver.resolve(lat, long), tuple(expected))
+
+    @unittest.skipIf(np is None, "NumPy is not installed")
+    def test_resolve_many_1(self):
+        """
+        Function `resolve_many` gives the same ids as `resolve`, using -1 where there is no tile.
+        """
+        resolver = get_tile_resolver()
+        rng = random.Random(418)
+        lats = [rng.uniform(54.0, 58.0) for _ in range(5000)] + [55.0, float('nan')]
+        longs = [rng.uniform(6.5, 13.5) for _ in range(5000)] + [11.47914, 11.0]
+        scale1, scale2, scale3 = resolver.resolve_many(np.array(lats), np.array(longs))
+        for i in range(len(lats)):
+            expected = resolver.resolve(lats[i], longs[i]) if lats[i] == lats[i] else (1, None, None)
+            actual = tuple(None if tile_id == -1 else tile_id for tile_id in (scale1[i], scale2[i], scale3[i]))
+            self.assertEqual(actual, expected)
+
+    def test_resolve_all(self):
+        """
+        Function `resolve_all` gives one tuple of tile ids per position, like `resolve`.
+        """
+        resolver = get_tile_resolver()
+        lats = [54.519373 + i * 0.01 for i in range(100)]
+        longs = [11.47914] * 100
+        self.assertEqual(resolver.resolve_all(lats, longs),
+                         [resolver.resolve(lat, long) for lat, long in zip(lats, longs)])
+
+    def test_tile_tree_1(self):
+        """
+        Class `TileTree` finds the children, parent, scale and bounds of a tile.
+        """
+        tree = TileTree.from_map_view(load_map_view())
+        self.assertEqual(len(tree), 171)
+        self.assertEqual([row[0] for row in tree.children('5036')], [50361, 50362, 50363, 50364])
+        self.assertEqual(tree.parent(50361)[0], 5036)
+        self.assertEqual(tree.parent(1), None)
+        self.assertEqual((tree.scale(1), tree.scale(5036), tree.scale(50361)), (1, 2, 3))
+        self.assertEqual(tree.bounds(50361), (7.0, 54.75, 7.5, 55.0))
+        self.assertEqual(tree.raster_file(50361), '38F71.png')
+
+    def test_tile_tree_2(self):
+        """
+        Class `TileTree` answers nothing for an unknown or malformed tile id.
+        """
+        tree = TileTree.from_map_view(load_map_view())
+        for tile_id in (9999999, 'abc', None):
+            self.assertEqual(tree.get(tile_id), None)
+            self.assertEqual(tree.children(tile_id), [])
+            self.assertEqual(tree.parent(tile_id), None)
+            self.assertEqual(tree.scale(tile_id), None)
+            self.assertEqual(tree.bounds(tile_id), None)
+
+    def test_tile_tree_3(self):
+        """
+        Class `TileTree` rows make the same tile documents as MAP_VIEW rows read from the database.
+        """
+        tmb = MySQL_DAO(True)
+        tree = TileTree.from_map_view(load_map_view())
+        self.assertEqual(tmb.create_tile_document(tree.children(5036)[0]), {
+            'Id': 50361, 'Name': '38F71', 'LongitudeW': 7.0, 'LatitudeS': 54.75, 'LongitudeE': 7.5, 'LatitudeN': 55.0,
+            'Scale': '3', 'RasterFile': '38F71.png', 'ImageWidth': 2000, 'ImageHeight': 2000, 'ActualLongitudeW': 7.0,
+            'ActualLatitudeS': 54.731097, 'ActualLongitudeE': 7.5, 'ActualLatitudeN': 55.018777,
+            'ContainerMapView_Id': 5036})
+        self.assertEqual(tmb.create_tile_document(tree.get(1))['Name'], None)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
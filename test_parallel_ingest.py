@@ -0,0 +1,86 @@
+import io
+import itertools
+import json
+import unittest
+
+from MySQL_DAO import MySQL_DAO, MySQLConnectionManager, MySQLCursorManager
+from parallel_ingest import ParallelIngest, shard_messages, shard_of, prepare_shard
+
+
+class ParallelIngestTest(unittest.TestCase):
+    messages = [{"Timestamp": "2020-11-18T00:00:%02d.000Z" % i, "Class": "Class A", "MMSI": 219005465 + i % 5,
+                 "MsgType": "position_report",
+                 "Position": {"type": "Point", "coordinates": [54.519373, 11.47914]},
+                 "Status": "Under way using engine", "SoG": 10.8, "CoG": 94.3, "Heading": 97}
+                for i in range(40)]
+
+    def test_shard_messages(self):
+        """
+        Function `shard_messages` puts every message of a vessel in the same shard, in their original order.
+        """
+        shards = shard_messages(self.messages + [{"MsgType": "position_report"}], 3)
+        self.assertEqual(sum(len(shard) for shard in shards), 41)
+        for index, shard in enumerate(shards):
+            for msg in shard:
+                self.assertEqual(shard_of(msg, 3), index)
+            for mmsi in {msg.get('MMSI') for msg in shard}:
+                vessel = [msg for msg in shard if msg.get('MMSI') == mmsi]
+                self.assertEqual(vessel, [msg for msg in self.messages + [{"MsgType": "position_report"}]
+                                          if msg.get('MMSI') == mmsi])
+
+    def test_prepare_shard(self):
+        """
+        Function `prepare_shard` formats messages the same way as `prepare_ais_messages`.
+        """
+        self.assertEqual(prepare_shard(self.messages), MySQL_DAO(True).prepare_ais_messages(self.messages))
+
+    def test_insert_ais_batch_interface(self):
+        """
+        Function `insert_ais_batch` counts the messages formatted by the workers, and returns -1 for bad JSON.
+        """
+        with ParallelIngest(MySQL_DAO(True), processes=2, writers=2, chunk_size=7) as ingest:
+            self.assertEqual(json.loads(ingest.insert_ais_batch(json.dumps(self.messages))), {"inserts": 40})
+            self.assertEqual(ingest.insert_ais_batch("Not JSON"), -1)
+            self.assertEqual(ingest.insert_ais_batch(json.dumps(self.messages[0])), -1)
+
+    def test_insert_ais_stream_interface(self):
+        """
+        Function `insert_ais_stream` reads NDJSON and returns -1 if a line is not parsable JSON, but raises the errors
+        of messages that cannot be formatted.
+        """
+        lines = [json.dumps(msg) for msg in self.messages]
+        with ParallelIngest(MySQL_DAO(True), processes=2, writers=3, chunk_size=10) as ingest:
+            self.assertEqual(json.loads(ingest.insert_ais_stream(io.StringIO("\n".join(lines)))), {"inserts": 40})
+            self.assertEqual(ingest.insert_ais_stream(lines + ["Not JSON"]), -1)
+            bad = dict(self.messages[0], Timestamp="Not a timestamp")
+            self.assertRaises(ValueError, ingest.insert_ais_stream, lines + [json.dumps(bad)])
+
+    def test_insert_ais_messages_error(self):
+        """
+        Function `insert_ais_messages` stops reading messages once a chunk fails, and raises the error.
+        """
+        bad = dict(self.messages[0], Timestamp="Not a timestamp")
+        with ParallelIngest(MySQL_DAO(True), processes=2, writers=2, chunk_size=7) as ingest:
+            # The input never ends, so this only returns if reading stops
+            self.assertRaises(ValueError, ingest.insert_ais_messages, itertools.repeat(bad))
+
+    def test_insert_ais_messages_actual(self):
+        """
+        Function `insert_ais_messages` writes every message to the database, like `MySQL_DAO.insert_ais_messages`.
+        """
+        tmb = MySQL_DAO()
+        tmb.delete_ais_messages()
+        with ParallelIngest(tmb, processes=2, writers=2, chunk_size=7) as ingest:
+            self.assertEqual(ingest.insert_ais_messages(self.messages), 40)
+        self.assertEqual(json.loads(tmb.select_most_recent_from_mmsi(219005465)),
+                         {"MMSI": 219005465, "lat": 54.519373, "long": 11.47914, "IMO": None})
+        with MySQLConnectionManager() as con:
+            with MySQLCursorManager(con) as cursor:
+                cursor.execute("""SELECT COUNT(*), MAX(Timestamp) FROM AIS_MESSAGE WHERE MMSI = 219005465;""")
+                count, timestamp = cursor.fetchone()
+        self.assertEqual((count, str(timestamp)), (8, "2020-11-18 00:00:35"))
+        tmb.delete_ais_messages()
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,48 @@
+import json
+import unittest
+from datetime import datetime
+
+from MySQL_DAO import MySQL_DAO, MySQLConnectionManager, MySQLCursorManager
+from partitions import is_partitioned, get_partitions, enable_partitioning, add_partitions, drop_expired_partitions
+
+
+class PartitionsTest(unittest.TestCase):
+
+    message = "{\"Timestamp\":\"%s\",\"Class\":\"Class A\",\"MMSI\":%d,\"MsgType\":\"position_report\",\"Position\":{\"type\":\"Point\",\"coordinates\":[55.218332,13.371672]},\"Status\":\"Under way using engine\",\"RoT\":25.7,\"SoG\":10.8,\"CoG\":94.3,\"Heading\":97}"
+
+    def test_get_partition_size(self):
+        """
+        Function `get_partition_size` is None unless partitioned storage is configured.
+        """
+        self.assertEqual(MySQL_DAO(True).get_partition_size(), None)
+
+    def test_drop_expired_partitions_actual(self):
+        """
+        Function `drop_expired_partitions` drops the old partitions only, and the DAO keeps working on the rest.
+        """
+        tmb = MySQL_DAO()
+        tmb.delete_ais_messages()
+        messages = [json.loads(self.message % ("2020-11-18T00:00:00.000Z", mmsi)) for mmsi in range(10)] + \
+                   [json.loads(self.message % (datetime.now().isoformat(), mmsi)) for mmsi in range(10, 30)]
+        tmb.insert_ais_messages(messages)
+        with MySQLConnectionManager() as con:
+            with MySQLCursorManager(con) as cursor:
+                if not is_partitioned(cursor):
+                    enable_partitioning(cursor, 10)
+                add_partitions(cursor, 10)
+                self.assertTrue(is_partitioned(cursor))
+                cursor.execute("""SELECT CURRENT_TIMESTAMP - INTERVAL 5 MINUTE;""")
+                deletions = drop_expired_partitions(cursor, cursor.fetchone()[0], 10)
+                names = [partition[0] for partition in get_partitions(cursor)]
+                cursor.execute("""SELECT COUNT(*) FROM AIS_MESSAGE;""")
+                count = cursor.fetchone()[0]
+        # Ids 1 to 9 fill p10 and are all old, while p20 holds the last old message and new ones
+        self.assertEqual(deletions, 9)
+        self.assertNotIn('p10', names)
+        self.assertIn('p20', names)
+        self.assertEqual(count, 21)
+        self.assertEqual(len(json.loads(tmb.select_all_recent_positions())['vessels']), 21)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,149 @@
+import unittest
+
+import mysql.connector
+from mysql.connector import errorcode
+
+from MySQL_DAO import MySQLConnectionManager, MySQLCursorManager
+from prepared_statements import StatementCache, PreparedCursor, get_statement_cache
+
+
+class RecordingCursor:
+    """
+    Stands in for a MySQL cursor, recording the statements it runs and returning one row for a SELECT.
+    """
+
+    def __init__(self, prepared, unsupported=()):
+        self.prepared = prepared
+        self.unsupported = unsupported
+        self.executed = []
+        self.closed = False
+        self.with_rows = False
+        self.rowcount = -1
+        self.lastrowid = None
+
+    def execute(self, operation, params=None):
+        if self.prepared and operation in self.unsupported:
+            raise mysql.connector.Error(errno=errorcode.ER_UNSUPPORTED_PS)
+        self.executed.append((operation, params))
+        self.with_rows = operation.startswith('SELECT')
+        self.rowcount = 1
+        self.lastrowid = 7
+
+    def executemany(self, operation, seq_params):
+        self.executed.append((operation, list(seq_params)))
+        self.with_rows = False
+        self.rowcount = len(seq_params)
+
+    def fetchall(self):
+        return [(1, 'a'), (2, 'b')]
+
+    def close(self):
+        self.closed = True
+
+
+class RecordingConnection:
+    """
+    Stands in for a MySQL connection, keeping every cursor it makes.
+    """
+
+    def __init__(self, unsupported=()):
+        self.unsupported = unsupported
+        self.cursors = []
+
+    def cursor(self, buffered=False, prepared=False):
+        cursor = RecordingCursor(prepared, self.unsupported)
+        self.cursors.append(cursor)
+        return cursor
+
+
+class PreparedStatementsTest(unittest.TestCase):
+
+    def test_statement_cache(self):
+        """
+        Class `StatementCache` prepares a statement once and reuses it, deallocating the least recently used ones.
+        """
+        cache = StatementCache(RecordingConnection(), max_size=2)
+        first, operation = cache.get("SELECT 1 FROM T WHERE A = %s;")
+        self.assertTrue(cache.get("".join(["SELECT 1 FROM T ", "WHERE A = %s;"]))[1] is operation)
+        cache.get("SELECT 2 FROM T WHERE A = %s;")
+        cache.get("SELECT 3 FROM T WHERE A = %s;")
+        self.assertTrue(first.closed)
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.stats, {"hits": 1, "misses": 3, "evictions": 1})
+
+    def test_get_statement_cache(self):
+        """
+        Function `get_statement_cache` gives every connection its own cache.
+        """
+        cnx = RecordingConnection()
+        self.assertTrue(get_statement_cache(cnx) is get_statement_cache(cnx))
+        self.assertTrue(get_statement_cache(cnx) is not get_statement_cache(RecordingConnection()))
+
+    def test_prepared_cursor_1(self):
+        """
+        Class `PreparedCursor` runs queries and DML prepared, and other statements and `executemany` as text.
+        """
+        cnx = RecordingConnection()
+        cursor = PreparedCursor(cnx)
+        for mmsi in (1, 2):
+            cursor.execute("""SELECT MMSI, Name FROM VESSEL WHERE MMSI = %s;""", (mmsi,))
+        cursor.execute("""  select * from VESSEL;""")
+        cursor.execute("""COMMIT;""")
+        cursor.executemany("""INSERT INTO T(A) VALUES(%s);""", [(1,), (2,)])
+        prepared = [c for c in cnx.cursors if c.prepared]
+        text = [c for c in cnx.cursors if not c.prepared]
+        self.assertEqual(len(prepared), 2)
+        self.assertEqual([params for operation, params in prepared[0].executed], [(1,), (2,)])
+        self.assertEqual(len(text), 1)
+        self.assertEqual([operation for operation, params in text[0].executed],
+                         ["""COMMIT;""", """INSERT INTO T(A) VALUES(%s);"""])
+        self.assertEqual(cursor.rowcount, 2)
+        cursor.close()
+        self.assertTrue(text[0].closed and not prepared[0].closed and not prepared[1].closed)
+
+    def test_prepared_cursor_2(self):
+        """
+        Class `PreparedCursor` reads the whole result on `execute`, like a buffered cursor.
+        """
+        cursor = PreparedCursor(RecordingConnection())
+        cursor.execute("""SELECT MMSI, Name FROM VESSEL WHERE MMSI > %s;""", (0,))
+        self.assertEqual(cursor.fetchone(), (1, 'a'))
+        self.assertEqual(cursor.fetchall(), [(2, 'b')])
+        self.assertEqual(cursor.fetchone(), None)
+        cursor.execute("""DELETE FROM VESSEL WHERE MMSI = %s;""", (1,))
+        self.assertEqual((cursor.fetchall(), cursor.rowcount, cursor.lastrowid), ([], 1, 7))
+
+    def test_prepared_cursor_3(self):
+        """
+        Class `PreparedCursor` falls back to the text protocol for statements the server cannot prepare.
+        """
+        statement = """SELECT * FROM INFORMATION_SCHEMA.TABLES WHERE TABLE_NAME = %s;"""
+        cnx = RecordingConnection(unsupported=(statement,))
+        cursor = PreparedCursor(cnx)
+        cursor.execute(statement, ('VESSEL',))
+        cursor.execute(statement, ('PORT',))
+        prepared = [c for c in cnx.cursors if c.prepared]
+        text = [c for c in cnx.cursors if not c.prepared]
+        self.assertEqual(len(prepared), 1)
+        self.assertTrue(prepared[0].closed)
+        self.assertEqual(len(text[0].executed), 2)
+
+    def test_prepared_cursor_actual(self):
+        """
+        Class `MySQLCursorManager` prepares a statement once per pooled connection and gives the same results as the
+        text protocol.
+        """
+        statement = """SELECT Id, Name FROM MAP_VIEW WHERE Id = %s;"""
+        with MySQLConnectionManager() as con:
+            with MySQLCursorManager(con, prepared=False) as cursor:
+                cursor.execute(statement, (5036,))
+                expected = cursor.fetchall()
+            for _ in range(3):
+                with MySQLCursorManager(con, prepared=True) as cursor:
+                    cursor.execute(statement, (5036,))
+                    self.assertEqual(cursor.fetchall(), expected)
+            self.assertTrue(get_statement_cache(con).stats["hits"] >= 2)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,104 @@
+import configparser
+import json
+import time
+import unittest
+
+from MySQL_DAO import MySQL_DAO
+from retention import RetentionScheduler, scheduler_from_config
+
+
+class CountingDAO:
+    """
+    Stands in for the DAO, recording the retention calls it gets.
+    """
+    retention_window = 300
+    retention_chunk_size = 1000
+    retention_pause = 0.05
+
+    def __init__(self, fail=False):
+        self.calls = []
+        self.fail = fail
+
+    def expire_ais_messages(self, window=None, chunk_size=None, pause=None, progress=None, budget=None):
+        self.calls.append({"window": window, "chunk_size": chunk_size, "pause": pause, "budget": budget})
+        if self.fail:
+            raise RuntimeError("Lost connection")
+        return 3, budget is None
+
+
+class RetentionTest(unittest.TestCase):
+    batch = json.dumps([{"Timestamp": "2020-11-18T00:00:00.000Z", "Class": "Class A", "MMSI": mmsi,
+                         "MsgType": "position_report",
+                         "Position": {"type": "Point", "coordinates": [55.218332, 13.371672]},
+                         "Status": "Under way using engine", "SoG": 10.8, "CoG": 94.3, "Heading": 97}
+                        for mmsi in range(7)])
+
+    def test_run_once(self):
+        """
+        Function `run_once` passes the settings to the DAO and records the run in the stats.
+        """
+        dao = CountingDAO()
+        scheduler = RetentionScheduler(dao, window=60, budget=0.5, chunk_size=10, pause=0)
+        run = scheduler.run_once()
+        scheduler.run_once()
+        self.assertEqual(dao.calls[0], {"window": 60, "chunk_size": 10, "pause": 0, "budget": 0.5})
+        self.assertEqual((run['deletions'], run['complete'], run['error']), (3, False, None))
+        stats = scheduler.get_stats()
+        self.assertEqual((stats['runs'], stats['deletions'], stats['errors']), (2, 6, 0))
+
+    def test_run_once_error(self):
+        """
+        Function `run_once` records a failed run instead of raising.
+        """
+        scheduler = RetentionScheduler(CountingDAO(fail=True))
+        run = scheduler.run_once()
+        self.assertEqual(run['error'], "Lost connection")
+        self.assertEqual(scheduler.get_stats()['errors'], 1)
+
+    def test_next_delay(self):
+        """
+        Function `next_delay` stays within the jitter around the interval.
+        """
+        scheduler = RetentionScheduler(CountingDAO(), interval=1.0, jitter=0.25)
+        for _ in range(100):
+            self.assertTrue(0.75 <= scheduler.next_delay() <= 1.25)
+        self.assertTrue(RetentionScheduler(CountingDAO(), interval=0.1, jitter=1.0).next_delay() >= 0)
+
+    def test_start_stop(self):
+        """
+        The scheduler runs in the background until stopped.
+        """
+        dao = CountingDAO()
+        scheduler = RetentionScheduler(dao, interval=0.01)
+        scheduler.start()
+        self.assertTrue(scheduler.is_running())
+        deadline = time.monotonic() + 5
+        while len(dao.calls) < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        scheduler.stop()
+        self.assertFalse(scheduler.is_running())
+        self.assertTrue(len(dao.calls) >= 2)
+
+    def test_scheduler_from_config(self):
+        """
+        Function `scheduler_from_config` reads the [RETENTION] section, falling back to the DAO defaults.
+        """
+        config = configparser.ConfigParser()
+        config.read_string("[RETENTION]\ninterval=5\nwindow=120\nbudget=0\n")
+        scheduler = scheduler_from_config(CountingDAO(), config)
+        self.assertEqual((scheduler.interval, scheduler.window, scheduler.budget, scheduler.chunk_size),
+                         (5.0, 120.0, None, 1000))
+
+    def test_expire_ais_messages_actual(self):
+        """
+        Function `expire_ais_messages` stops starting chunks once its budget is spent.
+        """
+        tmb = MySQL_DAO()
+        tmb.delete_ais_messages()
+        tmb.insert_ais_batch(self.batch)
+        self.assertEqual(tmb.expire_ais_messages(chunk_size=1, pause=0, budget=0), (0, False))
+        self.assertEqual(tmb.expire_ais_messages(chunk_size=1, pause=0), (7, True))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,98 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from MySQL_DAO import MySQL_DAO, MySQLConnectionManager, MySQLCursorManager
+from schema import TABLES, INDEXES, MIGRATIONS, migrate, verify_indexes, ensure_schema
+from sqlite_backend import SQLiteConnection
+import test_dao
+
+
+class SchemaTest(unittest.TestCase):
+
+    def test_indexes_on_known_tables(self):
+        """
+        Every index in `INDEXES` belongs to a table created by `TABLES`.
+        """
+        tables = {name for name, ddl in TABLES}
+        for table, name, columns in INDEXES:
+            self.assertIn(table, tables)
+            self.assertIn(table + '_', name)
+
+    def test_migration_versions(self):
+        """
+        The versions in `MIGRATIONS` are unique and in increasing order.
+        """
+        versions = [version for version, description, step in MIGRATIONS]
+        self.assertEqual(versions, sorted(set(versions)))
+
+    def test_ensure_schema(self):
+        """
+        Function `ensure_schema` returns the migrations it applied and the missing indexes it created again.
+        """
+        directory = tempfile.mkdtemp()
+        cnx = SQLiteConnection(os.path.join(directory, 'schema.sqlite'), [])
+        try:
+            cursor = cnx.cursor()
+            self.assertEqual(ensure_schema(cursor), ([version for version, description, step in MIGRATIONS], []))
+            table, name, columns = INDEXES[0]
+            cursor.execute("""DROP INDEX {};""".format(name))
+            self.assertEqual(ensure_schema(cursor), ([], [INDEXES[0]]))
+            self.assertEqual(ensure_schema(cursor), ([], []))
+        finally:
+            cnx.close()
+            shutil.rmtree(directory)
+
+    def test_migrate_actual(self):
+        """
+        Function `migrate` applies every migration once only.
+        """
+        with MySQLConnectionManager() as con:
+            with MySQLCursorManager(con) as cursor:
+                ensure_schema(cursor)
+                self.assertEqual(migrate(cursor), [])
+                cursor.execute("""SELECT Version FROM SCHEMA_MIGRATIONS ORDER BY Version;""")
+                versions = [row[0] for row in cursor.fetchall()]
+        self.assertEqual(versions, [version for version, description, step in MIGRATIONS])
+
+    def test_fill_side_tables_actual(self):
+        """
+        Migration 2 fills VESSEL_LAST_STATIC and VESSEL_LATEST from the AIS messages already in the database.
+        """
+        tmb = MySQL_DAO()
+        tmb.delete_ais_messages()
+        tmb.insert_ais_batch(test_dao.TMBTest.batch)
+        with MySQLConnectionManager() as con:
+            with MySQLCursorManager(con) as cursor:
+                cursor.execute("""DELETE FROM VESSEL_LAST_STATIC;""")
+                cursor.execute("""DELETE FROM VESSEL_LATEST;""")
+                cursor.execute("""DELETE FROM SCHEMA_MIGRATIONS WHERE Version = 2;""")
+                con.commit()
+                self.assertEqual(migrate(cursor), [2])
+                cursor.execute("""SELECT MMSI, AISMessage_Id FROM VESSEL_LAST_STATIC ORDER BY MMSI;""")
+                last_static = cursor.fetchall()
+                cursor.execute("""SELECT MMSI, Latitude, Longitude, Name, Vessel_IMO FROM VESSEL_LATEST ORDER BY MMSI;""")
+                latest = [(row[0], None if row[1] is None else float(row[1]), None if row[2] is None else float(row[2]),
+                           row[3], row[4]) for row in cursor.fetchall()]
+        tmb.delete_ais_messages()
+        self.assertEqual(last_static, [(636092297, 5), (992111840, 2)])
+        self.assertEqual(latest, [(219005465, 54.572602, 11.929218, None, None),
+                                  (257385000, 55.219403, 13.127725, None, None),
+                                  (304858000, 55.218332, 13.371672, None, None),
+                                  (376503000, 54.519373, 11.47914, None, None),
+                                  (636092297, 55.00316, 12.809015, 'Johann', 9534298),
+                                  (992111840, None, None, 'WIND FARM BALTIC1NW', None)])
+
+    def test_verify_indexes_actual(self):
+        """
+        Function `verify_indexes` finds no missing index once the schema is up to date.
+        """
+        with MySQLConnectionManager() as con:
+            with MySQLCursorManager(con) as cursor:
+                ensure_schema(cursor)
+                self.assertEqual(verify_indexes(cursor), [])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,190 @@
+import datetime
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from decimal import Decimal
+
+import mysql.connector
+
+import MySQL_DAO as mysql_dao
+from MySQL_DAO import MySQL_DAO, MySQLConnectionManager
+from schema import LATEST_POSITION_UPDATE
+from sqlite_backend import SQLiteConnection, translate, mysql_literals_to_sqlite, load_dump
+import test_dao
+
+DUMP = """-- MySQL dump
+DROP TABLE IF EXISTS `PORT`;
+CREATE TABLE `PORT` (`Id` int NOT NULL) ENGINE=InnoDB;
+INSERT INTO `PORT` VALUES (381,'DKNBG','Nyborg','Denmark',10.810833,55.298889,NULL,1,5331,53312),(382,NULL,'St. Peter\\'s','Denmark',10.0,55.0,'http://x\\\\y',1,NULL,NULL);
+INSERT INTO `VESSEL` VALUES (9534298,'Antigua','Johann',2009,'V2DN9',87,12,2000,636092297,'General Cargo','Active','Owner');
+INSERT INTO `OTHER` VALUES (1);
+"""
+
+
+class SQLiteBackendTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cnx = SQLiteConnection(os.path.join(self.directory, 'test.sqlite'), [('journal_mode', 'WAL')])
+        self.cursor = self.cnx.cursor()
+
+    def tearDown(self):
+        self.cnx.close()
+        shutil.rmtree(self.directory)
+
+    def test_translate_upsert(self):
+        """
+        Function `translate` turns ON DUPLICATE KEY UPDATE into an SQLite upsert, with VALUES(x) as the new row.
+        """
+        self.assertEqual(translate("""INSERT INTO T(a, b) VALUES(%s, %s) ON DUPLICATE KEY UPDATE b = GREATEST(b, VALUES(b));"""),
+                         """INSERT INTO T(a, b) VALUES(?, ?) ON CONFLICT DO UPDATE SET b = MAX(b, excluded.b);""")
+        self.assertTrue("IIF(PositionTimestamp IS NULL OR excluded.PositionTimestamp >= PositionTimestamp" in
+                        translate("""INSERT INTO VESSEL_LATEST(MMSI) VALUES(%s) """ + LATEST_POSITION_UPDATE))
+
+    def test_translate_mysql_only(self):
+        """
+        Function `translate` rewrites the MySQL-only DDL and statements of the DAO.
+        """
+        self.assertEqual(translate("""CREATE TABLE T(Id INT NOT NULL AUTO_INCREMENT PRIMARY KEY, S ENUM('1', '2'));"""),
+                         """CREATE TABLE T(Id INTEGER NOT NULL PRIMARY KEY AUTOINCREMENT, S VARCHAR(10));""")
+        self.assertEqual(translate("""ALTER TABLE AIS_MESSAGE AUTO_INCREMENT = 1;"""),
+                         """DELETE FROM sqlite_sequence WHERE name = 'AIS_MESSAGE';""")
+        self.assertEqual(translate("""SELECT @@auto_increment_increment, @@innodb_autoinc_lock_mode;"""),
+                         """SELECT 1, 0;""")
+        self.assertEqual(translate("""SELECT CURRENT_TIMESTAMP - INTERVAL %s SECOND;"""),
+                         """SELECT datetime(CURRENT_TIMESTAMP, '-' || ? || ' seconds');""")
+
+    def test_mysql_literals_to_sqlite(self):
+        """
+        Function `mysql_literals_to_sqlite` rewrites the backslash escapes of MySQL string literals.
+        """
+        self.assertEqual(mysql_literals_to_sqlite("""VALUES ('St. Peter\\'s','a\\\\b','\\n',5)"""),
+                         """VALUES ('St. Peter''s','a\\b','\n',5)""")
+        self.assertEqual(mysql_literals_to_sqlite("""VALUES ('plain')"""), """VALUES ('plain')""")
+
+    def test_cursor_rows(self):
+        """
+        Class `SQLiteCursor` reads results in full, giving the row count of a SELECT like the buffered MySQL cursor,
+        and returns DATETIME and DECIMAL columns as MySQL does.
+        """
+        self.cursor.execute("""CREATE TABLE T(Id INT NOT NULL AUTO_INCREMENT PRIMARY KEY, At DATETIME NOT NULL,
+                                              Lat DECIMAL(8, 6) NULL);""")
+        self.cursor.execute("""INSERT INTO T(At, Lat) VALUES(%s, %s);""", ('2020-11-18 00:00:00', 55.218332))
+        self.assertEqual(self.cursor.lastrowid, 1)
+        self.cursor.execute("""SELECT Id, At, Lat FROM T WHERE Id = %s;""", (1,))
+        self.assertEqual(self.cursor.rowcount, 1)
+        self.assertEqual(self.cursor.fetchone(), (1, datetime.datetime(2020, 11, 18), Decimal('55.218332')))
+        self.assertEqual(self.cursor.fetchone(), None)
+
+    def test_cursor_executemany(self):
+        """
+        Class `SQLiteCursor` runs executemany() of an INSERT as multi-row INSERTs, giving the id of the first row.
+        """
+        self.cursor.execute("""CREATE TABLE T(Id INT NOT NULL AUTO_INCREMENT PRIMARY KEY, V INT NOT NULL);""")
+        self.cursor.execute("""INSERT INTO T(V) VALUES(%s);""", (0,))
+        self.cursor.executemany("""INSERT INTO T(V) VALUES(%s);""", [(i,) for i in range(1, 40000)])
+        self.assertEqual((self.cursor.rowcount, self.cursor.lastrowid), (39999, 2))
+        self.cursor.execute("""SELECT COUNT(*), MAX(Id) FROM T;""")
+        self.assertEqual(self.cursor.fetchall(), [(40000, 40000)])
+
+    def test_cursor_errors(self):
+        """
+        Class `SQLiteCursor` raises mysql.connector errors, so the DAO handles them as on MySQL.
+        """
+        self.cursor.execute("""CREATE TABLE T(Id INT NOT NULL PRIMARY KEY);""")
+        self.cursor.execute("""INSERT INTO T(Id) VALUES(%s);""", (1,))
+        self.assertRaises(mysql.connector.errors.IntegrityError, self.cursor.execute,
+                          """INSERT INTO T(Id) VALUES(%s);""", (1,))
+        self.assertRaises(mysql.connector.Error, self.cursor.execute, """SELECT * FROM MISSING;""")
+
+    def test_latest_positions(self):
+        """
+        Function `upsert_latest_positions` keeps the most recent position of every vessel on SQLite, whatever the
+        order the positions come in.
+        """
+        tmb = MySQL_DAO(True)
+        self.cursor.execute("""CREATE TABLE IF NOT EXISTS VESSEL_LATEST(MMSI INT NOT NULL PRIMARY KEY,
+                                   PositionMessage_Id INT NULL, PositionTimestamp DATETIME NULL,
+                                   Latitude DECIMAL(8, 6) NULL, Longitude DECIMAL(9, 6) NULL, MapView1_Id INT NULL,
+                                   MapView2_Id INT NULL, MapView3_Id INT NULL);""")
+        tmb.upsert_latest_positions(self.cursor, [(1, 2, '2020-11-18 00:00:02', 55.0, 12.0, 1, None, None),
+                                                  (1, 1, '2020-11-18 00:00:01', 54.0, 11.0, 1, None, None)])
+        tmb.upsert_latest_positions(self.cursor, [(1, 3, '2020-11-18 00:00:00', 56.0, 10.0, 1, None, None)])
+        self.cursor.execute("""SELECT PositionMessage_Id, Latitude FROM VESSEL_LATEST WHERE MMSI = %s;""", (1,))
+        self.assertEqual(self.cursor.fetchall(), [(2, Decimal('55'))])
+
+    def test_load_dump(self):
+        """
+        Function `load_dump` loads the rows of the known tables of a mysqldump file and brings the schema up to date.
+        """
+        loaded = load_dump(self.cnx, io.StringIO(DUMP))
+        self.assertEqual(loaded, {"PORT": 2, "VESSEL": 1})
+        self.cursor.execute("""SELECT Name, Website FROM PORT WHERE Id = %s;""", (382,))
+        self.assertEqual(self.cursor.fetchall(), [("St. Peter's", "http://x\\y")])
+        self.cursor.execute("""SELECT COUNT(*) FROM SCHEMA_MIGRATIONS;""")
+        self.assertEqual(self.cursor.fetchone()[0], 4)
+
+
+class SQLiteDAOTest(unittest.TestCase):
+    """
+    Runs the DAO on an SQLite file, through a config with "backend = sqlite".
+    """
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        config_file = os.path.join(self.directory, 'connection_data.conf')
+        with open(config_file, 'w') as f:
+            # The test data has no MAP_VIEW rows for the position reports to refer to
+            f.write("[SQL]\nbackend=sqlite\n\n[SQLITE]\npath=%s\nforeign_keys=no\n" %
+                    os.path.join(self.directory, 'milestone4.sqlite'))
+        self.saved = (MySQLConnectionManager.config_file, mysql_dao._pool, MySQL_DAO.schema_ready,
+                      MySQL_DAO.tile_tree, MySQL_DAO.auto_increment)
+        MySQLConnectionManager.config_file = config_file
+        mysql_dao._pool = None
+        MySQL_DAO.schema_ready = False
+        MySQL_DAO.tile_tree = None
+        MySQL_DAO.auto_increment = None
+        with MySQLConnectionManager() as con:
+            load_dump(con, io.StringIO(DUMP))
+
+    def tearDown(self):
+        mysql_dao.get_connection_pool().close_all()
+        MySQLConnectionManager.config_file, mysql_dao._pool, MySQL_DAO.schema_ready, MySQL_DAO.tile_tree, \
+            MySQL_DAO.auto_increment = self.saved
+        shutil.rmtree(self.directory)
+
+    def test_queries(self):
+        """
+        Class `MySQL_DAO` inserts and queries AIS messages on the SQLite backend as it does on MySQL.
+        """
+        tmb = MySQL_DAO()
+        self.assertEqual(json.loads(tmb.insert_ais_batch(test_dao.TMBTest.batch)), {"inserts": 7})
+        self.assertEqual(json.loads(tmb.select_most_recent_from_mmsi(636092297)),
+                         {"MMSI": 636092297, "lat": 55.00316, "long": 12.809015, "IMO": 9534298})
+        self.assertEqual(json.loads(tmb.select_most_recent_5_ship_positions(636092297)),
+                         {"MMSI": 636092297, "Positions": [{"lat": 55.00316, "long": 12.809015}], "IMO": 9534298})
+        vessels = json.loads(tmb.select_all_recent_positions())['vessels']
+        self.assertEqual([vessel['MMSI'] for vessel in vessels],
+                         [304858000, 219005465, 636092297, 257385000, 376503000])
+        self.assertEqual(vessels[2]['Name'], "Johann")
+        ports = json.loads(tmb.read_all_matching_ports("Nyborg", "Denmark"))['ports']
+        self.assertEqual([port['Id'] for port in ports], [381])
+
+    def test_single_messages_and_retention(self):
+        """
+        Class `MySQL_DAO` inserts messages one at a time and deletes old messages on the SQLite backend.
+        """
+        tmb = MySQL_DAO()
+        for msg in json.loads(test_dao.TMBTest.batch):
+            self.assertEqual(json.loads(tmb.insert_ais_message(msg)), {"success": 1})
+        self.assertEqual(json.loads(tmb.read_vessel_information(636092297)),
+                         {"MMSI": 636092297, "lat": 55.00316, "long": 12.809015, "IMO": 9534298, "Name": "Johann"})
+        self.assertEqual(json.loads(tmb.delete_old_ais_messages(chunk_size=3, pause=0)), {"deletions": 7})
+        self.assertEqual(json.loads(tmb.select_all_recent_positions()), {"vessels": []})
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
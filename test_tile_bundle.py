@@ -0,0 +1,84 @@
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from map_tiles import load_map_view
+from tile_bundle import build_bundle, get_tile_bundle, TileBundle
+from tile_store import TILE_DIRECTORY
+
+
+class TileBundleTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.tiles = os.path.join(self.directory, 'tiles')
+        os.mkdir(self.tiles)
+        self.map_view = [tile for tile in load_map_view() if tile['filename'] in ('ROOT.png', '43F9.png')]
+        self.map_view_file = os.path.join(self.directory, 'MAP_VIEW.json')
+        with open(self.map_view_file, 'w') as f:
+            for tile in self.map_view:
+                f.write(json.dumps(tile) + '\n')
+        for tile in self.map_view:
+            shutil.copy(os.path.join(TILE_DIRECTORY, tile['filename']), self.tiles)
+        self.path = os.path.join(self.directory, 'tiles.bundle')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def build(self):
+        return build_bundle(self.path, self.tiles, self.map_view_file)
+
+    def test_build_bundle(self):
+        """
+        Function `build_bundle` packs every tile, and `TileBundle` slices back the same bytes by file name and id.
+        """
+        self.assertEqual(self.build(), 2)
+        bundle = TileBundle(self.path)
+        self.assertEqual(bundle.map_view, self.map_view)
+        for tile in self.map_view:
+            with open(os.path.join(self.tiles, tile['filename']), 'rb') as f:
+                raw = f.read()
+            self.assertEqual(bundle.get(tile['filename']), raw)
+            self.assertEqual(bundle.get_by_id(str(tile['id'])), raw)
+        self.assertEqual(bundle.get('missing.png'), None)
+        self.assertEqual(bundle.get_by_id(0), None)
+        self.assertEqual(bundle.get_by_id('abc'), None)
+
+    def test_verify(self):
+        """
+        Function `verify` finds no problem in a fresh bundle, and names the tiles changed or added since the build.
+        """
+        self.build()
+        self.assertEqual(TileBundle(self.path).verify(self.tiles), [])
+        with open(os.path.join(self.tiles, 'ROOT.png'), 'ab') as f:
+            f.write(b'\0')
+        shutil.copy(os.path.join(self.tiles, '43F9.png'), os.path.join(self.tiles, 'extra.png'))
+        self.assertEqual(TileBundle(self.path).verify(self.tiles), ['ROOT.png', 'extra.png'])
+
+    def test_not_a_bundle(self):
+        """
+        Class `TileBundle` refuses a file that is not a bundle.
+        """
+        with open(self.path, 'wb') as f:
+            f.write(b'not a tile bundle at all')
+        self.assertRaises(ValueError, TileBundle, self.path)
+
+    def test_get_tile_bundle(self):
+        """
+        Function `get_tile_bundle` maps a bundle once, and again once it is rebuilt.
+        """
+        self.assertEqual(get_tile_bundle(self.path), None)
+        self.build()
+        bundle = get_tile_bundle(self.path)
+        self.assertTrue(get_tile_bundle(self.path) is bundle)
+        time.sleep(0.01)
+        self.build()
+        os.utime(self.path, ns=(bundle.mtime_ns + 1, bundle.mtime_ns + 1))
+        self.assertTrue(get_tile_bundle(self.path) is not bundle)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+import base64
+import hashlib
+import mmap
+import os
+import shutil
+import tempfile
+import unittest
+
+from tile_store import TileCache, TILE_DIRECTORY
+
+
+class TileStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        self.path = os.path.join(TILE_DIRECTORY, 'ROOT.png')
+        with open(self.path, 'rb') as f:
+            self.raw = f.read()
+
+    def test_tile_cache_load(self):
+        """
+        Function `load` reads the raw and base64 bytes of a tile, and `get` then serves them from memory.
+        """
+        cache = TileCache()
+        self.assertEqual(cache.get(1), None)
+        entry = cache.load(1, self.path)
+        self.assertEqual(entry.raw, self.raw)
+        self.assertEqual(entry.encoded, base64.b64encode(self.raw))
+        self.assertTrue(cache.get('1') is entry)
+        stats = cache.get_stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['tiles']), (1, 1, 1))
+        self.assertEqual(stats['bytes'], entry.size())
+
+    def test_tile_cache_eviction(self):
+        """
+        Class `TileCache` evicts the least recently used tile once it holds more bytes than allowed.
+        """
+        size = len(self.raw) + len(base64.b64encode(self.raw))
+        cache = TileCache(max_bytes=2 * size)
+        cache.load(1, self.path)
+        cache.load(2, self.path)
+        cache.get(1)
+        cache.load(3, self.path)
+        self.assertEqual(cache.get(2), None)
+        self.assertTrue(cache.get(1) is not None and cache.get(3) is not None)
+        self.assertEqual(cache.get_stats()['evictions'], 1)
+        self.assertTrue(cache.get_stats()['bytes'] <= 2 * size)
+
+    def test_tile_cache_too_large(self):
+        """
+        Function `load` returns a tile larger than the whole cache without caching it.
+        """
+        cache = TileCache(max_bytes=10)
+        self.assertEqual(cache.load(1, self.path).raw, self.raw)
+        self.assertEqual(cache.get_stats()['tiles'], 0)
+
+    def test_tile_cache_invalidation(self):
+        """
+        Function `get` drops a tile whose file was modified after it was read.
+        """
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, 'tile.png')
+            shutil.copyfile(self.path, path)
+            cache = TileCache()
+            entry = cache.load(1, path)
+            os.utime(path, ns=(entry.mtime_ns + 10 ** 9, entry.mtime_ns + 10 ** 9))
+            self.assertEqual(cache.get(1), None)
+            self.assertEqual(cache.get_stats()['invalidations'], 1)
+            os.remove(path)
+            cache.load(2, self.path)
+            self.assertEqual(cache.get_stats()['tiles'], 1)
+        finally:
+            shutil.rmtree(directory)
+
+
+    def test_tile_entry_view(self):
+        """
+        Function `view` gives the raw bytes without copying, with an ETag that changes with the bytes.
+        """
+        entry = TileCache().load(1, self.path)
+        view = entry.view()
+        self.assertTrue(view.readonly)
+        self.assertTrue(view.obj is entry.raw)
+        self.assertEqual(view.tobytes(), self.raw)
+        self.assertEqual(entry.etag, '"%s"' % hashlib.sha256(self.raw).hexdigest())
+        self.assertNotEqual(entry.etag, TileCache().load(2, os.path.join(TILE_DIRECTORY, '38F7.png')).etag)
+
+    def test_tile_cache_mmap(self):
+        """
+        Class `TileCache` with `use_mmap` maps the tile files and serves the same bytes.
+        """
+        entry = TileCache(use_mmap=True).load(1, self.path)
+        self.assertTrue(isinstance(entry.raw, mmap.mmap))
+        self.assertEqual(entry.view().tobytes(), self.raw)
+        self.assertEqual(entry.encoded, base64.b64encode(self.raw))
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
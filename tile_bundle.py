@@ -0,0 +1,184 @@
+"""
+Packs the map tiles and their MAP_VIEW metadata into a single bundle file, so that they can be served from one
+memory map instead of one file per tile.
+
+The bundle starts with a header (the MAGIC bytes, a version and the length of the index), followed by the index as
+UTF-8 JSON and then the PNG files back to back. The index gives the offset, length and SHA-256 of every file, the
+offsets counting from the start of the file data, and holds the MAP_VIEW tiles as found in MAP_VIEW.json.
+
+To build the bundle, or check it against the tile files, run from the base project directory:
+`python -m tile_bundle build` or `python -m tile_bundle verify`
+"""
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import struct
+import threading
+
+from map_tiles import MAP_VIEW_FILE, load_map_view
+from tile_store import TILE_DIRECTORY
+
+BUNDLE_FILE = os.path.abspath(os.path.join(os.path.dirname(__file__), 'data', 'denmark_tiles.bundle'))
+MAGIC = b'TILEBNDL'
+VERSION = 1
+_HEADER = struct.Struct('<8sIQ')
+
+_bundles = {}
+_bundles_lock = threading.Lock()
+
+
+def build_bundle(path=BUNDLE_FILE, tile_directory=TILE_DIRECTORY, map_view_file=MAP_VIEW_FILE):
+    """
+    Writes a bundle of every PNG file of a directory with the MAP_VIEW metadata. The bundle is written next to its
+    final path and renamed over it, so a running reader never sees a half written file.
+
+    :param path: Optional, path of the bundle to write
+    :type path: str
+    :param tile_directory: Optional, directory of the PNG files
+    :type tile_directory: str
+    :param map_view_file: Optional, path of the MAP_VIEW JSON mirror
+    :type map_view_file: str
+    :return: The number of tiles written
+    :rtype: int
+    """
+    names = sorted(name for name in os.listdir(tile_directory) if name.endswith('.png'))
+    files = {}
+    offset = 0
+    for name in names:
+        with open(os.path.join(tile_directory, name), 'rb') as f:
+            data = f.read()
+        files[name] = {"offset": offset, "length": len(data), "sha256": hashlib.sha256(data).hexdigest()}
+        offset += len(data)
+    index = json.dumps({"files": files, "map_view": load_map_view(map_view_file)}).encode('utf-8')
+    temporary = path + '.tmp'
+    with open(temporary, 'wb') as out:
+        out.write(_HEADER.pack(MAGIC, VERSION, len(index)))
+        out.write(index)
+        for name in names:
+            with open(os.path.join(tile_directory, name), 'rb') as f:
+                out.write(f.read())
+    os.replace(temporary, path)
+    return len(names)
+
+
+class TileBundle:
+    """
+    Class TileBundle
+    Read-only access to a tile bundle through a single memory map. Tiles are handed out as views into the map, so
+    reading one copies nothing and opens no file.
+
+    :param path: Path of the bundle
+    :type path: str
+    :raises [ValueError]: If the file is not a bundle of a supported version
+    """
+
+    def __init__(self, path=BUNDLE_FILE):
+        self.path = path
+        with open(path, 'rb') as f:
+            self.mtime_ns = os.fstat(f.fileno()).st_mtime_ns
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._map) < _HEADER.size:
+            raise ValueError("%s is not a tile bundle" % path)
+        magic, version, index_length = _HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("%s is not a version %d tile bundle" % (path, VERSION))
+        index = json.loads(self._map[_HEADER.size:_HEADER.size + index_length].decode('utf-8'))
+        self._data_start = _HEADER.size + index_length
+        self.files = index['files']
+        self.map_view = index['map_view']
+        self.filenames = {tile['id']: tile['filename'] for tile in self.map_view}
+
+    def get(self, filename):
+        """
+        Returns the bytes of a tile file.
+
+        :param filename: The file name, i.e. the RasterFile of the tile
+        :type filename: str
+        :return: A read-only view into the bundle, or None if the bundle has no such file
+        :rtype: memoryview
+        """
+        entry = self.files.get(filename)
+        if entry is None:
+            return None
+        start = self._data_start + entry['offset']
+        return memoryview(self._map)[start:start + entry['length']]
+
+    def get_by_id(self, tile_id):
+        """
+        Returns the bytes of a tile, found by its MAP_VIEW id.
+
+        :param tile_id: The Id of a map tile
+        :type tile_id: int
+        :return: A read-only view into the bundle, or None if the bundle has no such tile
+        :rtype: memoryview
+        """
+        try:
+            filename = self.filenames.get(int(tile_id))
+        except ValueError:
+            return None
+        if filename is None:
+            return None
+        return self.get(filename)
+
+    def verify(self, tile_directory=TILE_DIRECTORY):
+        """
+        Checks the bundle against the tile files: every file must be in the bundle with the same bytes, and every
+        file in the bundle must match the SHA-256 recorded in its index.
+
+        :param tile_directory: Optional, directory of the PNG files
+        :type tile_directory: str
+        :return: The names of the files that are missing, extra or different, empty if the bundle is correct
+        :rtype: list
+        """
+        problems = []
+        names = {name for name in os.listdir(tile_directory) if name.endswith('.png')}
+        for name in sorted(names | set(self.files)):
+            data = self.get(name)
+            if name not in names or data is None:
+                problems.append(name)
+                continue
+            with open(os.path.join(tile_directory, name), 'rb') as f:
+                source = f.read()
+            if data != source or hashlib.sha256(data).hexdigest() != self.files[name]['sha256']:
+                problems.append(name)
+        return problems
+
+
+def get_tile_bundle(path=BUNDLE_FILE):
+    """
+    Returns the bundle at a path, mapping it on first use and again whenever the file is replaced.
+
+    :param path: Optional, path of the bundle
+    :type path: str
+    :return: The bundle, or None if there is no file at the path
+    :rtype: TileBundle
+    """
+    try:
+        mtime_ns = os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+    bundle = _bundles.get(path)
+    if bundle is None or bundle.mtime_ns != mtime_ns:
+        with _bundles_lock:
+            bundle = _bundles.get(path)
+            if bundle is None or bundle.mtime_ns != mtime_ns:
+                bundle = TileBundle(path)
+                _bundles[path] = bundle
+    return bundle
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('command', choices=['build', 'verify'])
+    parser.add_argument('--bundle', default=BUNDLE_FILE)
+    args = parser.parse_args()
+    if args.command == 'build':
+        print("Packed %d tiles into %s" % (build_bundle(args.bundle), args.bundle))
+    else:
+        problems = TileBundle(args.bundle).verify()
+        if problems:
+            print("Bundle does not match the tile files: " + ", ".join(problems))
+            raise SystemExit(1)
+        print("Bundle matches the tile files")
@@ -0,0 +1,175 @@
+import base64
+import collections
+import hashlib
+import mmap
+import os
+import threading
+
+TILE_DIRECTORY = os.path.abspath(os.path.join(os.path.dirname(__file__), 'data', 'denmark_tiles'))
+
+
+class TileEntry:
+    """
+    Class TileEntry
+    The bytes of one tile file, as read at a given modification time, with a strong ETag made from their SHA-256.
+
+    :param path: Path of the PNG file, or of the tile bundle holding it
+    :type path: str
+    :param mtime_ns: Modification time of the file when it was read, in nanoseconds
+    :type mtime_ns: int
+    :param raw: The PNG bytes, a read-only memory map of the file, or a view into a mapped tile bundle
+    :type raw: bytes or mmap.mmap or memoryview
+    """
+
+    def __init__(self, path, mtime_ns, raw):
+        self.path = path
+        self.mtime_ns = mtime_ns
+        self.raw = raw
+        self.encoded = base64.b64encode(raw)
+        self.etag = '"%s"' % hashlib.sha256(raw).hexdigest()
+
+    def view(self):
+        """
+        Returns the PNG bytes without copying them.
+
+        :return: A read-only view of the raw bytes
+        :rtype: memoryview
+        """
+        return memoryview(self.raw).toreadonly()
+
+    def size(self):
+        """
+        Returns the number of bytes the entry holds.
+
+        :return: The size of the raw and encoded bytes together
+        :rtype: int
+        """
+        return len(self.raw) + len(self.encoded)
+
+
+class TileCache:
+    """
+    Class TileCache
+    Least recently used cache of tile files, raw and base64-encoded, keyed by tile id and bounded in bytes.
+    A cached tile is read again once its file's modification time changes.
+    With use_mmap, the raw bytes of a tile are a memory map of its file instead of a copy on the heap. Tile files
+    should then be replaced (written elsewhere and renamed over) rather than rewritten in place, as a mapping sees
+    in-place writes before the modification time check does.
+
+    :param max_bytes: Optional, the most bytes kept, counting both the raw and encoded copies
+    :type max_bytes: int
+    :param use_mmap: Optional, whether to memory map the tile files instead of reading them
+    :type use_mmap: bool
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024, use_mmap=False):
+        self.max_bytes = max_bytes
+        self.use_mmap = use_mmap
+        self.size = 0
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, tile_id):
+        """
+        Returns the cached tile, provided its file has not changed since it was read.
+
+        :param tile_id: The Id of a map tile
+        :type tile_id: int
+        :return: The tile, or None if it has to be loaded
+        :rtype: TileEntry
+        """
+        key = str(tile_id)
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None:
+            try:
+                current = os.stat(entry.path).st_mtime_ns == entry.mtime_ns
+            except OSError:
+                current = False
+            with self._lock:
+                if current:
+                    if key in self._entries:
+                        self._entries.move_to_end(key)
+                    self.stats['hits'] += 1
+                    return entry
+                if self._entries.get(key) is entry:
+                    del self._entries[key]
+                    self.size -= entry.size()
+                self.stats['invalidations'] += 1
+        with self._lock:
+            self.stats['misses'] += 1
+        return None
+
+    def load(self, tile_id, path):
+        """
+        Reads a tile file and caches it, evicting the least recently used tiles if needed.
+        A tile larger than the whole cache is returned without being cached.
+
+        :param tile_id: The Id of a map tile
+        :type tile_id: int
+        :param path: Path of the PNG file
+        :type path: str
+        :raises [OSError]: If the file cannot be read
+        :return: The tile
+        :rtype: TileEntry
+        """
+        with open(path, 'rb') as f:
+            stat = os.fstat(f.fileno())
+            if self.use_mmap and stat.st_size > 0:
+                # The mapping stays valid after the file is closed
+                raw = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            else:
+                raw = f.read()
+            entry = TileEntry(path, stat.st_mtime_ns, raw)
+        return self.put(tile_id, entry)
+
+    def put(self, tile_id, entry):
+        """
+        Caches a tile read elsewhere, evicting the least recently used tiles if needed. The entry's path and
+        modification time are checked by get() like those of a loaded tile.
+        A tile larger than the whole cache is returned without being cached.
+
+        :param tile_id: The Id of a map tile
+        :type tile_id: int
+        :param entry: The tile
+        :type entry: TileEntry
+        :return: The tile
+        :rtype: TileEntry
+        """
+        key = str(tile_id)
+        if entry.size() > self.max_bytes:
+            return entry
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size -= old.size()
+            self._entries[key] = entry
+            self.size += entry.size()
+            while self.size > self.max_bytes:
+                evicted_key, evicted = self._entries.popitem(last=False)
+                self.size -= evicted.size()
+                self.stats['evictions'] += 1
+        return entry
+
+    def get_stats(self):
+        """
+        Returns a copy of the counters, with the number of tiles and bytes cached.
+
+        :return: Object {'hits': ..., 'misses': ..., 'evictions': ..., 'invalidations': ..., 'tiles': ...,
+            'bytes': ...}
+        :rtype: dict
+        """
+        with self._lock:
+            stats = dict(self.stats)
+            stats['tiles'] = len(self._entries)
+            stats['bytes'] = self.size
+        return stats
+
+    def clear(self):
+        """
+        Empties the cache.
+        """
+        with self._lock:
+            self._entries.clear()
+            self.size = 0